@@ -0,0 +1,125 @@
+"""
+Benchmark: page render latency, separate client calls versus one aggregated call
+
+Renders a customer page (one customer and N products) repeatedly, three ways:
+
+    sequential  GET /customers/{id}, then GET /products/{id} for each product, one after another
+    parallel    the same calls issued at once by the client
+    aggregated  GET /aggregate/customers/{id}?product_ids=... (one call; the
+                aggregation service fans out to both services)
+
+The client keeps its connections alive, as a browser would. Against the
+gateway every call also pays JWT verification and routing; --target direct
+calls the services on their published ports instead.
+
+Usage:
+    docker-compose up -d
+    python benchmarks/aggregation_latency.py --products-per-page 5 --pages 500
+    python benchmarks/aggregation_latency.py --target direct
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import Dict, List
+
+import httpx
+
+TOKEN_URL = "http://localhost:8180/realms/api-gateway-poc/protocol/openid-connect/token"
+MODES = ("sequential", "parallel", "aggregated")
+
+
+def get_token() -> str:
+    response = httpx.post(TOKEN_URL, data={
+        "client_id": "test-client",
+        "username": "testuser",
+        "password": "testpass",
+        "grant_type": "password",
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+async def check(response_future) -> None:
+    response = await response_future
+    response.raise_for_status()
+
+
+async def render(mode: str, client: httpx.AsyncClient, urls: Dict[str, str], customer_id: int,
+                 product_ids: List[int]) -> None:
+    if mode == "sequential":
+        await check(client.get(f"{urls['customers']}/customers/{customer_id}"))
+        for product_id in product_ids:
+            await check(client.get(f"{urls['products']}/products/{product_id}"))
+    elif mode == "parallel":
+        await asyncio.gather(
+            check(client.get(f"{urls['customers']}/customers/{customer_id}")),
+            *(check(client.get(f"{urls['products']}/products/{product_id}")) for product_id in product_ids),
+        )
+    else:
+        response = await client.get(f"{urls['aggregate']}/aggregate/customers/{customer_id}",
+                                    params={"product_ids": ",".join(map(str, product_ids))})
+        response.raise_for_status()
+        if response.json()["errors"]:
+            raise RuntimeError(f"Partial document: {response.json()['errors']}")
+
+
+async def run(args, urls: Dict[str, str], headers: Dict[str, str]) -> None:
+    rng = random.Random(args.seed)
+    pages = [(rng.randint(1, args.customers), rng.sample(range(1, args.products + 1), args.products_per_page))
+             for _ in range(args.pages)]
+    limits = httpx.Limits(max_connections=args.products_per_page + 1, keepalive_expiry=30)
+    print(f"{args.pages} pages of 1 customer + {args.products_per_page} products, target {args.target}")
+    print(f"\n{'mode':<12} {'calls':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=10) as client:
+        for mode in args.modes:
+            # Warm up connections and the services' caches
+            for customer_id, product_ids in pages[:20]:
+                await render(mode, client, urls, customer_id, product_ids)
+            latencies = []
+            for customer_id, product_ids in pages:
+                start = time.perf_counter()
+                await render(mode, client, urls, customer_id, product_ids)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            calls = 1 if mode == "aggregated" else args.products_per_page + 1
+            print(f"{mode:<12} {calls:>6} {sum(latencies) / len(latencies) * 1000:>8.2f} "
+                  f"{percentile(latencies, 0.50) * 1000:>8.2f} {percentile(latencies, 0.95) * 1000:>8.2f} "
+                  f"{percentile(latencies, 0.99) * 1000:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", choices=["gateway", "direct"], default="gateway")
+    parser.add_argument("--gateway-url", default=os.getenv("GATEWAY_BASE_URL", "http://localhost:8080"))
+    parser.add_argument("--customers-url", default="http://localhost:8001", help="Direct customer service URL")
+    parser.add_argument("--products-url", default="http://localhost:8002", help="Direct product service URL")
+    parser.add_argument("--aggregate-url", default="http://localhost:8003", help="Direct aggregation service URL")
+    parser.add_argument("--token", default=os.getenv("BENCH_TOKEN"),
+                        help="Bearer token for the gateway (default: fetched from Keycloak)")
+    parser.add_argument("--customers", type=int, default=5, help="Pick customers from ids 1..N")
+    parser.add_argument("--products", type=int, default=5, help="Pick products from ids 1..N")
+    parser.add_argument("--products-per-page", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.products_per_page > args.products:
+        parser.error("--products-per-page cannot exceed --products")
+
+    if args.target == "gateway":
+        urls = dict.fromkeys(("customers", "products", "aggregate"), args.gateway_url)
+        headers = {"Authorization": f"Bearer {args.token or get_token()}"}
+    else:
+        urls = {"customers": args.customers_url, "products": args.products_url, "aggregate": args.aggregate_url}
+        headers = {}
+    asyncio.run(run(args, urls, headers))
+
+
+if __name__ == "__main__":
+    main()
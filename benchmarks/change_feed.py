@@ -0,0 +1,87 @@
+"""
+Benchmark: change-feed polls versus re-reading the full catalog
+
+Builds a ProductRepository of N products, applies K stock updates and
+times what a consumer pays to pick them up: one /products/changes poll
+(read the log, look up and encode the changed products) against encoding
+every product, which is what re-polling /products in full costs. Runs each
+catalog size in its own interpreter.
+
+Usage:
+    python benchmarks/change_feed.py
+    python benchmarks/change_feed.py --counts 100000 1000000 --changes 10 100 1000
+"""
+import argparse
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return median(samples) * 1000
+
+
+def run(count: int, changes: list, repeat: int) -> None:
+    sys.path.insert(0, str(ROOT / "services"))
+    sys.path.insert(0, str(ROOT / "services" / "product-service"))
+    from models.product import Product
+    from repository import ProductRepository
+    from shared.changes import change_page
+    from shared.responses import dumps
+
+    now = datetime.now()
+    start = time.perf_counter()
+    repository = ProductRepository()
+    repository.upsert_many([
+        Product.model_construct(
+            id=i, name=f"Product {i}", description=f"Description for product {i}",
+            price=Decimal("9.99"), category="Bench", stock_quantity=10, created_at=now,
+        )
+        for i in range(1, count + 1)
+    ])
+    print(f"\nproducts: {count}  (built in {time.perf_counter() - start:.1f}s, "
+          f"{len(repository.changes)} changes retained)")
+
+    full = timed(lambda: dumps(repository.list()), max(1, repeat // 10))
+    rng = random.Random(42)
+    print(f"{'changes':>8} {'poll ms':>9} {'full read ms':>13}")
+    for k in changes:
+        since = repository.changes.head
+        for product_id in rng.sample(range(1, count + 1), k):
+            repository.set_stock(product_id, rng.randint(0, 20))
+        poll = timed(lambda: dumps(change_page(repository.changes, since, k, repository.get)), repeat)
+        print(f"{k:>8} {poll:>9.3f} {full:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--changes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--count", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.count:
+        run(args.count, args.changes, args.repeat)
+        return
+    for count in args.counts:
+        subprocess.run(
+            [sys.executable, __file__, "--count", str(count), "--repeat", str(args.repeat),
+             "--changes", *map(str, args.changes)],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
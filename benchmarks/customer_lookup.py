@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: customer lookup latency, linear scan vs CustomerRepository
+
+Usage:
+    python benchmarks/customer_lookup.py
+    python benchmarks/customer_lookup.py --sizes 10 10000 --lookups 5000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "services"))
+sys.path.insert(0, str(ROOT / "services" / "customer-service"))
+
+from models.customer import Customer  # noqa: E402
+from repository import CustomerRepository  # noqa: E402
+
+
+def build_customers(count: int):
+    """Build a synthetic customer list"""
+    now = datetime.now()
+    return [
+        Customer(
+            id=i,
+            name=f"Customer {i}",
+            email=f"customer{i}@example.com",
+            phone=f"+1{i:010d}",
+            created_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def time_per_call(func, keys) -> float:
+    """Return mean microseconds per call of func over keys"""
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def run(sizes, lookups: int, seed: int):
+    rng = random.Random(seed)
+    print(f"{'customers':>10} {'scan (us)':>12} {'by id (us)':>12} {'by email (us)':>14}")
+    for size in sizes:
+        customers = build_customers(size)
+        repository = CustomerRepository(customers)
+        ids = [rng.randint(1, size) for _ in range(lookups)]
+        emails = [f"customer{i}@example.com" for i in ids]
+        # The linear scan gets expensive quickly; cap its sample count
+        scan_ids = ids[:max(1, min(lookups, 10_000_000 // size))]
+
+        scan = time_per_call(
+            lambda cid: next((c for c in customers if c.id == cid), None), scan_ids
+        )
+        by_id = time_per_call(repository.get, ids)
+        by_email = time_per_call(repository.get_by_email, emails)
+        print(f"{size:>10} {scan:>12.2f} {by_id:>12.3f} {by_email:>14.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 10_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.sizes, args.lookups, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Replay a catalog read load through the gateway cache harness
+
+Seeds the product service with a catalog, then replays a skewed read trace
+(popular products, category listings, first pages, batch lookups) through
+Envoy. It reports the gateway hit ratio (responses carrying an Age header)
+and the upstream request reduction, measured as the product service's own
+request counters against the number of requests sent.
+
+Usage:
+    docker compose -f benchmarks/gateway_cache/docker-compose.yml up --build -d
+    python benchmarks/gateway_cache/replay.py --requests 20000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from decimal import Decimal
+from typing import List
+
+import httpx
+
+CATEGORIES = ["Electronics", "Appliances", "Books", "Garden", "Toys", "Sports"]
+# GET requests counted by the service, excluding health probes and metrics scrapes
+REQUEST_LINE = re.compile(r'^http_requests_total\{[^}]*method="GET",route="(/products[^"]*)"[^}]*\} (\d+)$')
+UNCOUNTED_ROUTES = {"/products/metrics", "/products/health", "/products/health/live", "/products/health/ready"}
+
+
+def seed_catalog(service_url: str, products: int) -> None:
+    rows = [
+        {
+            "name": f"Product {i}",
+            "description": f"Catalog item {i}",
+            "price": str(Decimal(random.randint(100, 100_000)) / 100),
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "stock_quantity": random.randint(0, 500),
+        }
+        for i in range(products)
+    ]
+    response = httpx.post(f"{service_url}/products/bulk", json=rows, timeout=60)
+    response.raise_for_status()
+
+
+def upstream_requests(service_url: str) -> int:
+    text = httpx.get(f"{service_url}/products/metrics").text
+    total = 0
+    for line in text.splitlines():
+        match = REQUEST_LINE.match(line)
+        if match and match.group(1) not in UNCOUNTED_ROUTES:
+            total += int(match.group(2))
+    return total
+
+
+def build_trace(requests: int, product_ids: List[int], seed: int) -> List[str]:
+    """Read trace with a Zipf-like skew toward popular products"""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(product_ids) + 1)]
+    trace = []
+    for _ in range(requests):
+        kind = rng.random()
+        if kind < 0.6:
+            trace.append(f"/products/{rng.choices(product_ids, weights)[0]}")
+        elif kind < 0.8:
+            trace.append(f"/products/category/{rng.choice(CATEGORIES).lower()}")
+        elif kind < 0.9:
+            trace.append("/products?limit=50&fields=id,name,price")
+        elif kind < 0.97:
+            ids = sorted(rng.sample(product_ids[:200], 20))
+            trace.append(f"/products?ids={','.join(map(str, ids))}")
+        else:
+            trace.append("/products/categories")
+    return trace
+
+
+async def replay(gateway_url: str, trace: List[str], concurrency: int):
+    latencies: List[float] = []
+    hits = 0
+    errors = 0
+    queue = iter(trace)
+
+    async with httpx.AsyncClient(base_url=gateway_url, timeout=10) as client:
+        async def worker():
+            nonlocal hits, errors
+            for path in queue:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+                elif "age" in response.headers:
+                    hits += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    return hits, errors, latencies
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--gateway", default="http://localhost:18080")
+    parser.add_argument("--service", default="http://localhost:18002", help="Direct product service URL")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--products", type=int, default=1_000, help="Products to seed before replaying")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    seed_catalog(args.service, args.products)
+    product_ids = [p["id"] for p in httpx.get(f"{args.service}/products?fields=id").json()]
+    trace = build_trace(args.requests, product_ids, args.seed)
+
+    before = upstream_requests(args.service)
+    start = time.perf_counter()
+    hits, errors, latencies = asyncio.run(replay(args.gateway, trace, args.concurrency))
+    elapsed = time.perf_counter() - start
+    upstream = upstream_requests(args.service) - before
+
+    print(json.dumps({
+        "requests": len(trace),
+        "errors": errors,
+        "gateway_hits": hits,
+        "hit_ratio": hits / len(trace),
+        "upstream_requests": upstream,
+        "upstream_reduction": 1 - upstream / len(trace),
+        "requests_per_sec": len(trace) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
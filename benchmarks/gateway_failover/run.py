@@ -0,0 +1,143 @@
+"""
+Load test: kill one product-service replica under load and watch tail latency
+
+Renders the production gateway config without JWT verification, starts Envoy
+in front of two product-service replicas, drives GET /products/{product_id}
+at a fixed concurrency, and kills one replica partway through. Latency is
+reported per phase (before the kill, the 10 seconds after it, and the rest).
+Retries on other hosts and outlier ejection should keep the p99 bounded and
+the error count near zero.
+
+Usage:
+    python benchmarks/gateway_failover/run.py --duration 40 --kill-after 15
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+import yaml
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent.parent
+COMPOSE = ["docker", "compose", "-f", str(HERE / "docker-compose.yml")]
+GATEWAY_URL = "http://localhost:18080"
+# Seconds after the kill reported separately
+RECOVERY_WINDOW = 10.0
+
+
+def render_envoy_config() -> None:
+    """Copy the production envoy.yaml without the JWT filter and Keycloak"""
+    config = yaml.safe_load((ROOT / "services" / "gateway" / "envoy.yaml").read_text())
+    resources = config["static_resources"]
+    for listener in resources["listeners"]:
+        for chain in listener["filter_chains"]:
+            for network_filter in chain["filters"]:
+                manager = network_filter["typed_config"]
+                manager["http_filters"] = [
+                    f for f in manager["http_filters"] if f["name"] != "envoy.filters.http.jwt_authn"
+                ]
+                for host in manager["route_config"]["virtual_hosts"]:
+                    host["routes"] = [r for r in host["routes"] if r["route"]["cluster"] != "keycloak_cluster"]
+    resources["clusters"] = [c for c in resources["clusters"] if c["name"] != "keycloak_cluster"]
+    (HERE / "envoy.generated.yaml").write_text(yaml.safe_dump(config, sort_keys=False))
+
+
+def compose(*args: str, capture: bool = False) -> str:
+    result = subprocess.run([*COMPOSE, *args], check=True, capture_output=capture, text=True)
+    return result.stdout if capture else ""
+
+
+def wait_ready(timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{GATEWAY_URL}/products/1", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(1)
+    raise RuntimeError("Gateway did not become ready")
+
+
+async def drive(duration: float, concurrency: int, kill_after: float) -> Tuple[List[Tuple[float, float, bool]], float]:
+    """Return (offset, latency, ok) samples and the offset at which a replica was killed"""
+    samples: List[Tuple[float, float, bool]] = []
+    start = time.monotonic()
+    deadline = start + duration
+    killed_at = -1.0
+
+    async def kill_replica():
+        nonlocal killed_at
+        await asyncio.sleep(kill_after)
+        container = compose("ps", "-q", "product-service", capture=True).split()[0]
+        await asyncio.to_thread(subprocess.run, ["docker", "kill", container], check=True, capture_output=True)
+        killed_at = time.monotonic() - start
+
+    async with httpx.AsyncClient(base_url=GATEWAY_URL, timeout=10) as client:
+        async def worker(offset: int):
+            i = offset
+            while time.monotonic() < deadline:
+                sent = time.monotonic()
+                try:
+                    ok = (await client.get(f"/products/{i % 3 + 1}")).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                samples.append((sent - start, time.monotonic() - sent, ok))
+                i += 1
+
+        await asyncio.gather(kill_replica(), *(worker(i) for i in range(concurrency)))
+    return samples, killed_at
+
+
+def summarize(samples: List[Tuple[float, float, bool]]) -> Dict[str, float]:
+    if not samples:
+        return {"requests": 0}
+    latencies = sorted(latency for _, latency, _ in samples)
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=40.0, help="Seconds of load")
+    parser.add_argument("--kill-after", type=float, default=15.0, help="Seconds before killing a replica")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--keep", action="store_true", help="Leave the containers running")
+    args = parser.parse_args()
+
+    render_envoy_config()
+    compose("up", "--build", "-d", "--scale", "product-service=2")
+    try:
+        wait_ready()
+        samples, killed_at = asyncio.run(drive(args.duration, args.concurrency, args.kill_after))
+    finally:
+        if not args.keep:
+            compose("down")
+
+    phases = {
+        "before_kill": [s for s in samples if s[0] < killed_at],
+        "after_kill": [s for s in samples if killed_at <= s[0] < killed_at + RECOVERY_WINDOW],
+        "recovered": [s for s in samples if s[0] >= killed_at + RECOVERY_WINDOW],
+    }
+    print(json.dumps({
+        "killed_at_s": killed_at,
+        **{name: summarize(phase) for name, phase in phases.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: response serialization, FastAPI default path vs ORJSONResponse
+
+Builds two small FastAPI apps over the same product models:
+
+    default  handler returns models; FastAPI re-validates them against the
+             response_model, serializes in JSON mode and renders JSONResponse
+    orjson   handler returns ORJSONResponse(models) directly
+
+and drives a single-item and a list endpoint through ASGI in-process.
+
+Usage:
+    python benchmarks/json_serialization.py --requests 5000 --list-size 100
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "services"))
+sys.path.insert(0, str(ROOT / "services" / "product-service"))
+
+from fastapi import FastAPI  # noqa: E402
+
+from models.product import Product, ProductResponse  # noqa: E402
+from shared.responses import ORJSONResponse  # noqa: E402
+
+
+def build_apps(products: List[Product]):
+    default_app = FastAPI()
+    orjson_app = FastAPI(default_response_class=ORJSONResponse)
+    first = products[0]
+
+    @default_app.get("/item", response_model=ProductResponse)
+    async def default_item():
+        return first
+
+    @default_app.get("/list", response_model=List[ProductResponse])
+    async def default_list():
+        return products
+
+    @orjson_app.get("/item", response_model=ProductResponse)
+    async def orjson_item():
+        return ORJSONResponse(first)
+
+    @orjson_app.get("/list", response_model=List[ProductResponse])
+    async def orjson_list():
+        return ORJSONResponse(products)
+
+    return {"default": default_app, "orjson": orjson_app}
+
+
+async def drive(app, path: str, requests: int) -> float:
+    """Return requests/sec for GET path against the ASGI app"""
+    body = bytearray()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 12345), "server": ("testserver", 80),
+    }
+    start = time.perf_counter()
+    for _ in range(requests):
+        body.clear()
+        await app(dict(scope), receive, send)
+    return requests / (time.perf_counter() - start)
+
+
+async def main_async(requests: int, list_size: int):
+    products = [
+        Product(
+            id=i,
+            name=f"Product {i}",
+            description="High-performance laptop for professionals",
+            price=Decimal("999.99"),
+            category="Electronics",
+            stock_quantity=i,
+            created_at=datetime.now(),
+        )
+        for i in range(1, list_size + 1)
+    ]
+    apps = build_apps(products)
+    print(f"{'endpoint':>10} {'default':>10} {'orjson':>10} {'speedup':>8}   (req/sec)")
+    for path, count in (("/item", requests), ("/list", max(1, requests // 10))):
+        rates = {name: await drive(app, path, count) for name, app in apps.items()}
+        print(f"{path:>10} {rates['default']:>10.0f} {rates['orjson']:>10.0f} "
+              f"{rates['orjson'] / rates['default']:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--list-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.requests, args.list_size))
+
+
+if __name__ == "__main__":
+    main()
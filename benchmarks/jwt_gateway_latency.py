@@ -0,0 +1,99 @@
+"""
+Benchmark: gateway latency with a cold versus warm JWKS and token cache
+
+Runs against the docker compose stack (gateway, Keycloak, services):
+
+    cold      first authenticated request after restarting the gateway
+    warm      steady state, the same token every request (verified-token cache hit)
+    distinct  steady state, each token used once (signature verified every time)
+
+Usage:
+    docker-compose up -d
+    python benchmarks/jwt_gateway_latency.py --cold-runs 5 --requests 2000
+"""
+import argparse
+import json
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+GATEWAY_URL = "http://localhost:8080"
+ADMIN_URL = "http://localhost:9901"
+TOKEN_URL = "http://localhost:8180/realms/api-gateway-poc/protocol/openid-connect/token"
+PATH = "/products/1"
+
+
+def get_token(client: httpx.Client) -> str:
+    response = client.post(TOKEN_URL, data={
+        "client_id": "test-client",
+        "username": "testuser",
+        "password": "testpass",
+        "grant_type": "password",
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def timed_get(client: httpx.Client, token: str) -> float:
+    start = time.perf_counter()
+    response = client.get(f"{GATEWAY_URL}{PATH}", headers={"Authorization": f"Bearer {token}"})
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return elapsed
+
+
+def wait_gateway_ready(timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{ADMIN_URL}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("Gateway did not become ready")
+
+
+def cold_latencies(client: httpx.Client, token: str, runs: int) -> List[float]:
+    latencies = []
+    for _ in range(runs):
+        subprocess.run(["docker-compose", "restart", "gateway"], cwd=ROOT, check=True, capture_output=True)
+        wait_gateway_ready()
+        latencies.append(timed_get(client, token))
+    return latencies
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cold-runs", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--tokens", type=int, default=200, help="Tokens to fetch; all but one are used once")
+    args = parser.parse_args()
+
+    with httpx.Client(timeout=30) as client:
+        tokens = [get_token(client) for _ in range(args.tokens)]
+        results = {"cold": summarize(cold_latencies(client, tokens[0], args.cold_runs))}
+
+        # Prime the connection and the token cache
+        timed_get(client, tokens[0])
+        results["warm"] = summarize([timed_get(client, tokens[0]) for _ in range(args.requests)])
+        results["distinct"] = summarize([timed_get(client, token) for token in tokens[1:]])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
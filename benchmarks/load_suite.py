@@ -0,0 +1,259 @@
+"""
+Load-test suite: throughput and latency percentiles through the gateway and direct
+
+Seeds a synthetic catalog and customer base of configurable size (upserted
+with fixed ids, so reruns with the same seed reuse the same data), then
+drives each scenario at a fixed concurrency for a fixed time against each
+target:
+
+    products_page       GET /products?limit=100
+    product_by_id       GET /products/{product_id}
+    products_category   GET /products/category/{category}
+    customer_by_id      GET /customers/{customer_id}
+
+    gateway   Envoy (default http://localhost:8080) with a Keycloak token
+    direct    the services (default http://localhost:8002 and :8001)
+
+The JSON report records the commit, settings and per-scenario throughput,
+p50/p95/p99 and status counts, so runs can be compared across commits
+(--baseline prints the change against an earlier report). Set
+RATE_LIMIT_PER_SUBJECT=0 on the services when benchmarking through the
+gateway, or per-caller limiting will answer most requests with 429.
+
+Usage:
+    python benchmarks/load_suite.py --products 10000 --customers 5000 --concurrency 64 --duration 15
+    python benchmarks/load_suite.py --smoke
+    python benchmarks/load_suite.py --baseline benchmarks/results/previous.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+TOKEN_URL = "http://localhost:8180/realms/api-gateway-poc/protocol/openid-connect/token"
+CATEGORIES = ["Electronics", "Appliances", "Books", "Garden", "Toys", "Sports", "Office", "Outdoor"]
+# Synthetic rows use ids from here up, away from the services' sample data
+ID_OFFSET = 1_000_000
+BULK_CHUNK = 5_000
+REPORT_VERSION = 1
+
+
+class Target:
+    def __init__(self, name: str, products_url: str, customers_url: str, headers: Dict[str, str]):
+        self.name = name
+        self.products_url = products_url
+        self.customers_url = customers_url
+        self.headers = headers
+
+
+def synthetic_products(count: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": ID_OFFSET + i,
+            "name": f"Bench product {i}",
+            "description": f"Synthetic product {i} for load testing",
+            "price": f"{rng.randint(100, 500_000) / 100:.2f}",
+            "category": CATEGORIES[rng.randrange(len(CATEGORIES))],
+            "stock_quantity": rng.randint(0, 1_000),
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_customers(count: int, seed: int) -> List[dict]:
+    rng = random.Random(seed + 1)
+    return [
+        {
+            "id": ID_OFFSET + i,
+            "name": f"Bench customer {i}",
+            "email": f"bench.customer.{i}@example.com",
+            "phone": f"+1555{rng.randint(0, 9_999_999):07d}",
+        }
+        for i in range(count)
+    ]
+
+
+def seed_data(products_url: str, customers_url: str, products: int, customers: int, seed: int) -> None:
+    """Upsert the synthetic dataset straight into the services"""
+    with httpx.Client(timeout=120) as client:
+        for url, rows in ((f"{products_url}/products/bulk", synthetic_products(products, seed)),
+                          (f"{customers_url}/customers/bulk", synthetic_customers(customers, seed))):
+            for start in range(0, len(rows), BULK_CHUNK):
+                response = client.post(url, json=rows[start:start + BULK_CHUNK])
+                response.raise_for_status()
+
+
+def scenarios(products: int, customers: int) -> Dict[str, Callable[[Target, random.Random], str]]:
+    return {
+        "products_page": lambda t, rng: f"{t.products_url}/products?limit=100",
+        "product_by_id": lambda t, rng: f"{t.products_url}/products/{ID_OFFSET + rng.randrange(products)}",
+        "products_category": lambda t, rng: f"{t.products_url}/products/category/{rng.choice(CATEGORIES)}",
+        "customer_by_id": lambda t, rng: f"{t.customers_url}/customers/{ID_OFFSET + rng.randrange(customers)}",
+    }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run_scenario(target: Target, next_url: Callable[[Target, random.Random], str],
+                       concurrency: int, duration: float, seed: int) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(headers=target.headers, limits=limits, timeout=30) as client:
+        # Warm connections and caches before measuring
+        warm_rng = random.Random(seed)
+        await asyncio.gather(*(client.get(next_url(target, warm_rng)) for _ in range(concurrency)))
+
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def worker(index: int):
+            rng = random.Random(seed * 1_000 + index)
+            while time.perf_counter() < deadline:
+                sent = time.perf_counter()
+                try:
+                    status = str((await client.get(next_url(target, rng))).status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - sent)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status != "200"),
+        "statuses": statuses,
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def get_token() -> str:
+    response = httpx.post(TOKEN_URL, data={
+        "client_id": "test-client",
+        "username": "testuser",
+        "password": "testpass",
+        "grant_type": "password",
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def print_table(report: dict, baseline: Optional[dict]) -> None:
+    previous = {}
+    if baseline:
+        previous = {(r["target"], r["scenario"]): r for r in baseline["results"]}
+    print(f"{'target':<8} {'scenario':<18} {'req/sec':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+          + ("  req/sec vs baseline" if baseline else ""))
+    for r in report["results"]:
+        line = (f"{r['target']:<8} {r['scenario']:<18} {r['requests_per_sec']:>9.0f} {r['p50_ms']:>8.2f} "
+                f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>7}")
+        old = previous.get((r["target"], r["scenario"]))
+        if old and old["requests_per_sec"]:
+            line += f"  {(r['requests_per_sec'] / old['requests_per_sec'] - 1) * 100:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--targets", nargs="+", choices=["gateway", "direct"], default=["gateway", "direct"])
+    parser.add_argument("--gateway-url", default=os.getenv("GATEWAY_BASE_URL", "http://localhost:8080"))
+    parser.add_argument("--products-url", default="http://localhost:8002", help="Direct product service URL")
+    parser.add_argument("--customers-url", default="http://localhost:8001", help="Direct customer service URL")
+    parser.add_argument("--token", default=os.getenv("BENCH_TOKEN"),
+                        help="Bearer token for the gateway (default: fetched from Keycloak)")
+    parser.add_argument("--scenarios", nargs="+", help="Scenarios to run (default: all)")
+    parser.add_argument("--products", type=int, default=10_000, help="Synthetic products to seed")
+    parser.add_argument("--customers", type=int, default=5_000, help="Synthetic customers to seed")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and target")
+    parser.add_argument("--no-seed", action="store_true", help="Skip seeding (data already loaded)")
+    parser.add_argument("--smoke", action="store_true",
+                        help="Small dataset, short runs; exit non-zero on any error")
+    parser.add_argument("--output", type=Path, help="Report path (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--baseline", type=Path, help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    if args.smoke:
+        args.products, args.customers = 50, 20
+        args.concurrency, args.duration = 4, 2.0
+
+    if not args.no_seed:
+        seed_data(args.products_url, args.customers_url, args.products, args.customers, args.seed)
+
+    targets = []
+    if "gateway" in args.targets:
+        token = args.token or get_token()
+        targets.append(Target("gateway", args.gateway_url, args.gateway_url, {"Authorization": f"Bearer {token}"}))
+    if "direct" in args.targets:
+        targets.append(Target("direct", args.products_url, args.customers_url, {}))
+
+    all_scenarios = scenarios(args.products, args.customers)
+    selected = args.scenarios or list(all_scenarios)
+    results = []
+    for target in targets:
+        for name in selected:
+            result = asyncio.run(run_scenario(target, all_scenarios[name], args.concurrency, args.duration, args.seed))
+            results.append({"target": target.name, "scenario": name, **result})
+
+    report = {
+        "version": REPORT_VERSION,
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {
+            "products": args.products,
+            "customers": args.customers,
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "smoke": args.smoke,
+        },
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_table(report, baseline)
+    print(f"\nReport written to {output}")
+
+    if args.smoke and any(r["errors"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: product service request throughput with logging on vs off
+
+Drives GET /products/{product_id} through the ASGI app in-process. Each mode
+runs in its own interpreter with the service's stdout sent to /dev/null:
+
+    off      LOG_LEVEL=WARNING (per-lookup INFO lines disabled)
+    sync     INFO, with a plain StreamHandler writing from the request path (old setup)
+    queued   INFO, through the QueueHandler/QueueListener pipeline
+    sampled  INFO, queued, with LOG_SAMPLE_EVERY=100
+
+Usage:
+    python benchmarks/logging_throughput.py --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PRODUCT_SERVICE = ROOT / "services" / "product-service"
+
+MODES = {
+    "off": {"LOG_LEVEL": "WARNING"},
+    "sync": {"LOG_LEVEL": "INFO"},
+    "queued": {"LOG_LEVEL": "INFO"},
+    "sampled": {"LOG_LEVEL": "INFO", "LOG_SAMPLE_EVERY": "100"},
+}
+
+
+async def drive(app, requests: int) -> float:
+    """Issue GET /products/{id} requests directly against the ASGI app; return requests/sec"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200
+
+    start = time.perf_counter()
+    for i in range(requests):
+        path = f"/products/{i % 3 + 1}"
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "root_path": "", "headers": [],
+            "client": ("127.0.0.1", 12345), "server": ("testserver", 80),
+        }
+        await app(scope, receive, send)
+    return requests / (time.perf_counter() - start)
+
+
+def run_mode(mode: str, requests: int):
+    sys.path.insert(0, str(ROOT / "services"))
+    sys.path.insert(0, str(PRODUCT_SERVICE))
+    import main
+
+    if mode == "sync":
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s - product-service - %(levelname)s - %(message)s"
+        ))
+        logging.getLogger().handlers = [handler]
+
+    rate = asyncio.run(drive(main.app, requests))
+    print(json.dumps({"mode": mode, "requests_per_sec": rate}), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--mode", choices=MODES)
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(args.mode, args.requests)
+        return
+
+    print(f"{'mode':>8} {'req/sec':>10}")
+    for mode, env in MODES.items():
+        result = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--requests", str(args.requests)],
+            cwd=PRODUCT_SERVICE,
+            env={**os.environ, **env},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True
+        )
+        rate = json.loads(result.stderr.strip().splitlines()[-1])["requests_per_sec"]
+        print(f"{mode:>8} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: SQLite backend throughput under concurrency by pool size
+
+For each pool size, runs concurrent workers issuing small upsert batches and
+pings through the pool while a ticker task measures event-loop lag.
+High lag would mean database work is blocking the loop; it should stay near
+the ticker interval regardless of pool size.
+
+Usage:
+    python benchmarks/persistence_pool.py
+    python benchmarks/persistence_pool.py --pool-sizes 1 4 --concurrency 64 --ops 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "services"))
+sys.path.insert(0, str(ROOT / "services" / "product-service"))
+
+from models.product import Product  # noqa: E402
+from repository import PRODUCTS_TABLE  # noqa: E402
+from shared.persistence import SQLiteBackend  # noqa: E402
+
+TICK_SECONDS = 0.001
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list):
+    """Record how late each short sleep wakes up"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(loop.time() - start - TICK_SECONDS)
+
+
+async def worker(backend: SQLiteBackend, worker_id: int, ops: int, batch: int):
+    now = datetime.now()
+    for op in range(ops):
+        if op % 2:
+            await backend.ping()
+        else:
+            base = (worker_id * ops + op) * batch
+            await backend.upsert_many(PRODUCTS_TABLE, [
+                Product(
+                    id=base + i,
+                    name=f"Product {base + i}",
+                    description="Benchmark product",
+                    price=Decimal("9.99"),
+                    category="Bench",
+                    stock_quantity=1,
+                    created_at=now,
+                )
+                for i in range(batch)
+            ])
+
+
+async def run_one(path: str, pool_size: int, concurrency: int, ops: int, batch: int):
+    backend = SQLiteBackend(path, pool_size=pool_size, acquire_timeout=60)
+    await backend.connect()
+    await backend.ensure_table(PRODUCTS_TABLE)
+
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(backend, w, ops, batch) for w in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    await backend.close()
+
+    lags.sort()
+    p99_lag = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+    total_ops = concurrency * ops
+    print(
+        f"{pool_size:>9} {total_ops / elapsed:>10.0f} {backend.max_in_use:>11} "
+        f"{p99_lag * 1000:>12.2f} {max(lags, default=0) * 1000:>12.2f}"
+    )
+
+
+async def main_async(args):
+    print(f"concurrency={args.concurrency} ops/worker={args.ops} upsert batch={args.batch}")
+    print(f"{'pool size':>9} {'ops/sec':>10} {'max in use':>11} {'p99 lag ms':>12} {'max lag ms':>12}")
+    for pool_size in args.pool_sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            await run_one(os.path.join(tmp, "bench.db"), pool_size,
+                          args.concurrency, args.ops, args.batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=10)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
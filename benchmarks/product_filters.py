@@ -0,0 +1,106 @@
+"""
+Benchmark: indexed product filters versus a list-comprehension filter
+
+Times ProductRepository.find() for storefront-style queries (category,
+price range, in stock, sorted by price) against filtering every product
+in a list comprehension, which is what clients did after downloading all
+of /products. Runs each catalog size in its own interpreter.
+
+Usage:
+    python benchmarks/product_filters.py
+    python benchmarks/product_filters.py --counts 100000 1000000 --repeat 20
+"""
+import argparse
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).resolve().parent.parent
+CATEGORIES = [f"Category {i}" for i in range(50)]
+
+QUERIES = {
+    "category, under $500, in stock": dict(category="Category 7", max_price=Decimal("500"), in_stock=True),
+    "price $100-$101": dict(min_price=Decimal("100"), max_price=Decimal("101")),
+    "in stock by price, first 50": dict(in_stock=True, sort="price", limit=50),
+    "category by price, first 50": dict(category="Category 7", sort="price", limit=50),
+}
+
+
+def naive(products, category=None, min_price=None, max_price=None, in_stock=None, sort="id", limit=None):
+    found = [
+        p for p in products
+        if (category is None or p.category == category)
+        and (min_price is None or p.price >= min_price)
+        and (max_price is None or p.price <= max_price)
+        and (in_stock is None or (p.stock_quantity > 0) == in_stock)
+    ]
+    if sort == "price":
+        found.sort(key=lambda p: (p.price, p.id))
+    return found[:limit]
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return median(samples) * 1000
+
+
+def run(count: int, repeat: int) -> None:
+    sys.path.insert(0, str(ROOT / "services"))
+    sys.path.insert(0, str(ROOT / "services" / "product-service"))
+    from models.product import Product
+    from repository import ProductRepository
+
+    rng = random.Random(42)
+    now = datetime.now()
+    repository = ProductRepository(
+        Product.model_construct(
+            id=i,
+            name=f"Product {i}",
+            description=f"Description for product {i}",
+            price=Decimal(rng.randint(100, 200_000)) / 100,
+            category=rng.choice(CATEGORIES),
+            stock_quantity=rng.choice([0, rng.randint(1, 500)]),
+            created_at=now,
+        )
+        for i in range(1, count + 1)
+    )
+    products = repository.list()
+
+    start = time.perf_counter()
+    repository.find(min_price=Decimal("0"))
+    print(f"\nproducts: {count}  (price index built in {(time.perf_counter() - start) * 1000:.0f} ms)")
+    print(f"{'query':<34} {'matches':>8} {'indexed ms':>11} {'naive ms':>9}")
+    for name, query in QUERIES.items():
+        matches = len(repository.find(**{**query, "limit": None})[0])
+        indexed = timed(lambda: repository.find(**query), repeat)
+        scanned = timed(lambda: naive(products, **query), max(1, repeat // 5))
+        print(f"{name:<34} {matches:>8} {indexed:>11.2f} {scanned:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--count", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.count:
+        run(args.count, args.repeat)
+        return
+    for count in args.counts:
+        subprocess.run(
+            [sys.executable, __file__, "--count", str(count), "--repeat", str(args.repeat)],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
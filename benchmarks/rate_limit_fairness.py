@@ -0,0 +1,190 @@
+"""
+Load generator: fair sharing between a batch client and an interactive client
+
+A batch client hammers GET /products/{product_id} with many concurrent
+loops while an interactive client sends a steady trickle. Each identifies
+itself with the x-jwt-sub header the gateway sets from the token subject.
+Reports served and rate-limited requests per client and the interactive
+client's latency, with per-subject limiting off and on.
+
+By default each mode starts its own product service (one worker) on a local
+port and the clients call it directly; run the clients on other cores than
+the service or they become the bottleneck. With --gateway, the same load
+goes through Envoy with real Keycloak tokens for testuser (batch) and
+adminuser (interactive) against a running stack.
+
+Usage:
+    python benchmarks/rate_limit_fairness.py --duration 10
+    python benchmarks/rate_limit_fairness.py --gateway http://localhost:8080
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+PRODUCT_SERVICE = ROOT / "services" / "product-service"
+TOKEN_URL = "http://localhost:8180/realms/api-gateway-poc/protocol/openid-connect/token"
+
+MODES = {
+    "unlimited": {"RATE_LIMIT_PER_SUBJECT": "0"},
+    "per-subject": {"RATE_LIMIT_PER_SUBJECT": "100", "RATE_LIMIT_BURST": "100"},
+}
+
+
+class ClientStats:
+    def __init__(self):
+        self.ok = 0
+        self.limited = 0
+        self.other = 0
+        self.latencies: List[float] = []
+
+    def record(self, status: int, latency: float) -> None:
+        if status == 200:
+            self.ok += 1
+        elif status == 429:
+            self.limited += 1
+        else:
+            self.other += 1
+        self.latencies.append(latency)
+
+    def summary(self, duration: float) -> Dict[str, float]:
+        ordered = sorted(self.latencies) or [0.0]
+        return {
+            "served_per_sec": self.ok / duration,
+            "limited": self.limited,
+            "other_errors": self.other,
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        }
+
+
+async def run_load(client: httpx.AsyncClient, batch_headers: Dict[str, str],
+                   interactive_headers: Dict[str, str], duration: float,
+                   batch_concurrency: int, interactive_rate: float) -> Dict[str, Dict[str, float]]:
+    batch, interactive = ClientStats(), ClientStats()
+    deadline = time.monotonic() + duration
+
+    async def request(stats: ClientStats, headers: Dict[str, str], path: str):
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        stats.record(response.status_code, time.perf_counter() - start)
+
+    async def batch_loop(offset: int):
+        i = offset
+        while time.monotonic() < deadline:
+            await request(batch, batch_headers, f"/products/{i % 3 + 1}")
+            i += 1
+
+    async def interactive_loop():
+        interval = 1 / interactive_rate
+        while time.monotonic() < deadline:
+            next_send = time.monotonic() + interval
+            await request(interactive, interactive_headers, "/products/1")
+            await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+
+    await asyncio.gather(interactive_loop(), *(batch_loop(i) for i in range(batch_concurrency)))
+    return {"batch": batch.summary(duration), "interactive": interactive.summary(duration)}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Service did not become ready: {url}")
+
+
+def run_local(mode: str, args) -> Dict[str, Dict[str, float]]:
+    """Start a product service with the mode's settings and drive it directly"""
+    port = free_port()
+    env = {
+        **os.environ,
+        **MODES[mode],
+        "WORKERS": "1",
+        "SERVICE_PORT": str(port),
+        "LOG_LEVEL": "WARNING",
+        "UVICORN_ACCESS_LOG": "false",
+        "PYTHONPATH": str(ROOT / "services"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=PRODUCT_SERVICE, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_ready(f"{base_url}/products/health/live")
+
+        async def drive():
+            limits = httpx.Limits(max_connections=args.batch_concurrency + 4)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=10) as client:
+                return await run_load(
+                    client, {"x-jwt-sub": "batch-client"}, {"x-jwt-sub": "interactive-client"},
+                    args.duration, args.batch_concurrency, args.interactive_rate
+                )
+
+        return asyncio.run(drive())
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def get_token(username: str, password: str) -> str:
+    response = httpx.post(TOKEN_URL, data={
+        "client_id": "test-client",
+        "username": username,
+        "password": password,
+        "grant_type": "password",
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def run_gateway(args) -> None:
+    batch_headers = {"Authorization": f"Bearer {get_token('testuser', 'testpass')}"}
+    interactive_headers = {"Authorization": f"Bearer {get_token('adminuser', 'adminpass')}"}
+
+    async def drive():
+        limits = httpx.Limits(max_connections=args.batch_concurrency + 4)
+        async with httpx.AsyncClient(base_url=args.gateway, limits=limits, timeout=10) as client:
+            return await run_load(
+                client, batch_headers, interactive_headers,
+                args.duration, args.batch_concurrency, args.interactive_rate
+            )
+
+    print(json.dumps(asyncio.run(drive()), indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch-concurrency", type=int, default=32)
+    parser.add_argument("--interactive-rate", type=float, default=20.0, help="Interactive requests/sec")
+    parser.add_argument("--gateway", help="Run through a running gateway instead of a local service")
+    args = parser.parse_args()
+    if args.gateway:
+        run_gateway(args)
+        return
+    print(json.dumps({mode: run_local(mode, args) for mode in MODES}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Memory benchmark: bytes per record for Pydantic models vs compact records
+
+Measures traced allocations for N synthetic records held three ways:
+a plain list of Pydantic models (the original storage), the repository in
+its default mode, and the repository with compact=True (indexes included).
+
+Usage:
+    python benchmarks/record_memory.py
+    python benchmarks/record_memory.py --count 1000000 --service product
+"""
+import argparse
+import gc
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVICES = ("product", "customer")
+
+
+def synthetic_rows(service: str, count: int):
+    """Yield model kwargs for synthetic records; batch rows share one timestamp like bulk writes do"""
+    now = datetime.now()
+    for i in range(1, count + 1):
+        if service == "product":
+            yield dict(
+                id=i,
+                name=f"Product {i}",
+                description=f"Description for product {i}",
+                price=Decimal(f"{i % 1000}.{i % 100:02d}"),
+                category=f"Category {i % 50}",
+                stock_quantity=i % 500,
+                created_at=now,
+            )
+        else:
+            yield dict(
+                id=i,
+                name=f"Customer {i}",
+                email=f"customer{i}@example.com",
+                phone=f"+1{i:010d}",
+                created_at=now,
+            )
+
+
+def measure(build) -> int:
+    """Traced bytes still allocated by the object build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    gc.collect()
+    return after - before
+
+
+def run_service(service: str, count: int):
+    sys.path.insert(0, str(ROOT / "services"))
+    sys.path.insert(0, str(ROOT / "services" / f"{service}-service"))
+    if service == "product":
+        from models.product import Product as Model
+        from repository import ProductRepository as Repository
+    else:
+        from models.customer import Customer as Model
+        from repository import CustomerRepository as Repository
+
+    def models():
+        return (Model(**row) for row in synthetic_rows(service, count))
+
+    results = {
+        "pydantic list": measure(lambda: list(models())),
+        "repository": measure(lambda: Repository(models())),
+        "repository compact": measure(lambda: Repository(models(), compact=True)),
+    }
+
+    print(f"\n{service} records: {count}")
+    print(f"{'storage':>20} {'bytes/record':>14} {'total MiB':>10}")
+    for name, total in results.items():
+        print(f"{name:>20} {total / count:>14.0f} {total / 2**20:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--service", choices=SERVICES)
+    args = parser.parse_args()
+    if args.service:
+        run_service(args.service, args.count)
+        return
+    # Each service has its own models/repository modules; run them in separate interpreters
+    for service in SERVICES:
+        subprocess.run(
+            [sys.executable, __file__, "--service", service, "--count", str(args.count)],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
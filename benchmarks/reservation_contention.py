@@ -0,0 +1,113 @@
+"""
+Benchmark: stock reservation throughput under concurrency, striped versus global lock
+
+Runs N concurrent checkouts in-process against a ReservationManager whose
+database write takes a fixed latency, once with the default lock stripes
+and once with a single stripe (one global lock, as a naive implementation
+would have). With stripes, checkouts of different products overlap their
+writes and throughput grows with concurrency; with one lock it stays flat
+at about 1 / latency. Also checks that no product was oversold.
+
+Usage:
+    python benchmarks/reservation_contention.py
+    python benchmarks/reservation_contention.py --concurrency 1 8 64 --latency-ms 2 --products 1000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "services"))
+sys.path.insert(0, str(ROOT / "services" / "product-service"))
+
+from models.product import Product  # noqa: E402
+from repository import ProductRepository  # noqa: E402
+from reservations import LOCK_STRIPES, InsufficientStock, ReservationManager  # noqa: E402
+from shared.persistence import ConditionFailed  # noqa: E402
+
+
+async def run(products: int, stock: int, stripes: int, concurrency: int, requests: int,
+              latency: float, seed: int) -> dict:
+    now = datetime.now()
+    repository = ProductRepository(
+        Product.model_construct(
+            id=i, name=f"Product {i}", description="", price=Decimal("1.00"),
+            category="Bench", stock_quantity=stock, created_at=now,
+        )
+        for i in range(1, products + 1)
+    )
+
+    stored = {product.id: stock for product in repository}
+
+    async def persist(amounts):
+        # The database's conditional decrement, after the write latency
+        await asyncio.sleep(latency)
+        for product_id, amount in amounts.items():
+            if stored[product_id] < amount:
+                raise ConditionFailed(product_id, stored[product_id])
+        for product_id, amount in amounts.items():
+            stored[product_id] -= amount
+        return {product_id: stored[product_id] for product_id in amounts}
+    reservations = ReservationManager(repository, persist, stripes=stripes)
+    rng = random.Random(seed)
+    batches = [
+        {product_id: 1 for product_id in rng.sample(range(1, products + 1), rng.randint(1, 3))}
+        for _ in range(requests)
+    ]
+    made = []
+    rejected = 0
+
+    async def worker(offset: int):
+        nonlocal rejected
+        for items in batches[offset::concurrency]:
+            try:
+                made.append(await reservations.reserve(items))
+            except InsufficientStock:
+                rejected += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reserved = {}
+    for reservation in made:
+        for product_id, quantity in reservation.items.items():
+            reserved[product_id] = reserved.get(product_id, 0) + quantity
+    oversold = sum(
+        1 for product in repository
+        if product.stock_quantity < 0 or product.stock_quantity + reserved.get(product.id, 0) != stock
+    )
+    return {"rps": requests / elapsed, "rejected": rejected, "oversold": oversold}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--requests", type=int, default=2_000, help="Checkouts per run")
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated database write latency")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{args.requests} checkouts of 1-3 of {args.products} products, {args.latency_ms} ms write latency")
+    print(f"\n{'concurrency':>11} {'striped rps':>12} {'global rps':>11} {'speedup':>8} {'oversold':>9}")
+    for concurrency in args.concurrency:
+        results = {
+            stripes: asyncio.run(run(args.products, args.stock, stripes, concurrency, args.requests,
+                                     args.latency_ms / 1000, args.seed))
+            for stripes in (LOCK_STRIPES, 1)
+        }
+        striped, single = results[LOCK_STRIPES], results[1]
+        oversold = striped["oversold"] + single["oversold"]
+        print(f"{concurrency:>11} {striped['rps']:>12.0f} {single['rps']:>11.0f} "
+              f"{striped['rps'] / single['rps']:>7.1f}x {oversold:>9}")
+
+
+if __name__ == "__main__":
+    main()
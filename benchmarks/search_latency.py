@@ -0,0 +1,112 @@
+"""
+Benchmark: product search latency on the inverted index versus a full scan
+
+Builds a ProductRepository of N synthetic products whose names and
+descriptions draw words from a Zipf-like vocabulary (a few very common
+words, a long tail of rare ones), then times repository.search() for
+rare, common, multi-word and prefix queries against a substring scan of
+every product, which is what finding a product by name took before.
+
+Usage:
+    python benchmarks/search_latency.py
+    python benchmarks/search_latency.py --count 1000000 --queries 200
+"""
+import argparse
+import random
+import resource
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from itertools import accumulate
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "services"))
+sys.path.insert(0, str(ROOT / "services" / "product-service"))
+
+from models.product import Product  # noqa: E402
+from repository import ProductRepository  # noqa: E402
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa", "qui", "dor", "ban", "fel", "gri"]
+
+
+def vocabulary(size: int, rng: random.Random) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def synthetic_products(count: int, words: List[str], rng: random.Random):
+    # Zipf-like: the word at rank r is drawn with weight 1/r
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    now = datetime.now()
+    for i in range(1, count + 1):
+        yield Product.model_construct(
+            id=i,
+            name=" ".join(rng.choices(words, cum_weights=cum_weights, k=3)),
+            description=" ".join(rng.choices(words, cum_weights=cum_weights, k=8)),
+            price=Decimal("9.99"),
+            category="Bench",
+            stock_quantity=1,
+            created_at=now,
+        )
+
+
+def rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def time_queries(search: Callable[[str], object], queries: List[str]) -> Dict[str, float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per kind")
+    parser.add_argument("--scan-queries", type=int, default=3, help="Queries per kind for the full scan")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = vocabulary(args.vocabulary, rng)
+    rss_before = rss_mib()
+    start = time.perf_counter()
+    repository = ProductRepository(synthetic_products(args.count, words, rng))
+    build_s = time.perf_counter() - start
+    print(f"Indexed {len(repository)} products in {build_s:.1f}s, peak RSS +{rss_mib() - rss_before:.0f} MiB")
+
+    common, rare = words[:50], words[-2_000:]
+    kinds = {
+        "common word": [rng.choice(common) for _ in range(args.queries)],
+        "rare word": [rng.choice(rare) for _ in range(args.queries)],
+        "two words": [f"{rng.choice(words[:2_000])} {rng.choice(rare)}" for _ in range(args.queries)],
+        "prefix (3 chars)": [rng.choice(words)[:3] for _ in range(args.queries)],
+    }
+
+    def scan(query: str):
+        needle = query.casefold()
+        return [p for p in repository if needle in p.name.casefold() or needle in p.description.casefold()][:20]
+
+    print(f"\n{'query kind':<18} {'index p50 ms':>13} {'index p99 ms':>13} {'scan p50 ms':>12}")
+    for kind, queries in kinds.items():
+        indexed = time_queries(lambda q: repository.search(q, 20), queries)
+        scanned = time_queries(scan, queries[:args.scan_queries])
+        print(f"{kind:<18} {indexed['p50_ms']:>13.2f} {indexed['p99_ms']:>13.2f} {scanned['p50_ms']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark: warm start from a memory-mapped snapshot versus building models
+
+Starts worker processes (spawned, like uvicorn workers) that each load a
+catalog of N synthetic records one of three ways: validating a Pydantic
+model per record into the repository (what loading from the database
+does), the same with compact=True, or opening a snapshot file written
+beforehand. Reports per worker the load time, the time of a first read,
+the RSS the data added (over the interpreter and imports) and the PSS with
+all workers alive, then the time of build_indexes() and the RSS after it.
+For a snapshot the services do that work in a background thread while
+they serve lookups by id. PSS divides
+shared pages between the processes mapping them, so it shows the
+snapshot's page cache being shared.
+
+Usage:
+    python benchmarks/snapshot_startup.py
+    python benchmarks/snapshot_startup.py --service customer --count 1000000 --workers 2 --modes snapshot
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODES = ("models", "compact", "snapshot")
+
+
+def setup_path(service: str) -> None:
+    sys.path.insert(0, str(ROOT / "services"))
+    sys.path.insert(0, str(ROOT / "services" / f"{service}-service"))
+
+
+def synthetic_rows(service: str, count: int):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    for i in range(1, count + 1):
+        if service == "product":
+            yield dict(
+                id=i, name=f"Product {i}", description=f"Description for product {i}",
+                price=Decimal(rng.randint(100, 200_000)).scaleb(-2), category=f"Category {i % 50}",
+                stock_quantity=rng.randint(0, 500), created_at=start + timedelta(seconds=i),
+            )
+        else:
+            yield dict(
+                id=i, name=f"Customer {i}", email=f"customer{i}@example.com",
+                phone=None if i % 3 else f"+1-555-{i % 10_000:04d}", created_at=start + timedelta(seconds=i),
+            )
+
+
+def memory_kib():
+    """(RSS, PSS) of this process in KiB"""
+    values = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def worker(service: str, mode: str, count: int, path: str, barrier, results) -> None:
+    setup_path(service)
+    from shared.snapshot import Snapshot
+    if service == "product":
+        from models.product import Product as Model
+        from repository import PRODUCTS_TABLE as TABLE, ProductRepository as Repository
+    else:
+        from models.customer import Customer as Model
+        from repository import CUSTOMERS_TABLE as TABLE, CustomerRepository as Repository
+    report = {}
+    rss_before, _ = memory_kib()
+
+    start = time.perf_counter()
+    if mode == "snapshot":
+        repository = Repository.from_snapshot(Snapshot(path, TABLE))
+    else:
+        repository = Repository((Model(**row) for row in synthetic_rows(service, count)), compact=mode == "compact")
+    report["load_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    repository.get(count // 2)
+    repository.page(after_id=count // 3, limit=100)
+    report["first_read_ms"] = (time.perf_counter() - start) * 1000
+    # Read a sample of records, as serving traffic would
+    rng = random.Random(os.getpid())
+    for _ in range(10_000):
+        repository.get(rng.randint(1, count))
+    barrier.wait()
+    rss, pss = memory_kib()
+    report["data_mib"] = (rss - rss_before) / 1024
+    report["pss_mib"] = pss / 1024
+
+    start = time.perf_counter()
+    repository.build_indexes()
+    report["index_s"] = time.perf_counter() - start
+    barrier.wait()
+    rss, pss = memory_kib()
+    report["indexed_mib"] = (rss - rss_before) / 1024
+    results.put(report)
+    barrier.wait()
+
+
+def run(service: str, mode: str, count: int, workers: int, path: str) -> list:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(service, mode, count, path, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--service", choices=("product", "customer"), default="product")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    setup_path(args.service)
+    from shared.snapshot import write_snapshot
+    if args.service == "product":
+        from models.product import Product as Model
+        from repository import PRODUCTS_TABLE as TABLE
+    else:
+        from models.customer import Customer as Model
+        from repository import CUSTOMERS_TABLE as TABLE
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"{args.service}.snap")
+        start = time.perf_counter()
+        write_snapshot(path, TABLE, (Model.model_construct(**row) for row in synthetic_rows(args.service, args.count)))
+        print(f"{args.count} {args.service}s: snapshot written in {time.perf_counter() - start:.1f}s, "
+              f"{os.path.getsize(path) / 2**20:.0f} MiB; {args.workers} workers per mode")
+        print(f"\n{'mode':<9} {'load s':>7} {'1st read ms':>12} {'data RSS MiB':>13} {'PSS MiB':>8} "
+              f"{'index s':>13} {'indexed RSS MiB':>16}   (per worker, mean)")
+        for mode in args.modes:
+            reports = run(args.service, mode, args.count, args.workers, path)
+
+            def mean(key):
+                return sum(report[key] for report in reports) / len(reports)
+            print(f"{mode:<9} {mean('load_s'):>7.2f} {mean('first_read_ms'):>12.2f} {mean('data_mib'):>13.0f} "
+                  f"{mean('pss_mib'):>8.0f} {mean('index_s'):>13.2f} {mean('indexed_mib'):>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
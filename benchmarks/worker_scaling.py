@@ -0,0 +1,144 @@
+"""
+Load test: product service throughput by uvicorn worker count
+
+Starts the product service through shared.server with WORKERS=1, 2, 4, ...
+up to the CPU count, and drives GET /products/{product_id} from several
+client processes over keep-alive connections. With one worker per core the
+requests/sec should grow close to linearly until the clients or the cores
+run out (run the clients on another machine for a clean measurement).
+
+Usage:
+    python benchmarks/worker_scaling.py --duration 10 --clients 4 --connections 32
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+PRODUCT_SERVICE = ROOT / "services" / "product-service"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Service did not become ready: {url}")
+
+
+async def client_loop(base_url: str, connections: int, duration: float) -> int:
+    """Run `connections` concurrent request loops; return completed requests"""
+    completed = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        async def loop(offset: int):
+            nonlocal completed
+            i = offset
+            while time.monotonic() < deadline:
+                response = await client.get(f"/products/{i % 3 + 1}")
+                assert response.status_code == 200
+                completed += 1
+                i += 1
+
+        await asyncio.gather(*(loop(i) for i in range(connections)))
+    return completed
+
+
+def client_process(base_url: str, connections: int, duration: float, results) -> None:
+    results.put(asyncio.run(client_loop(base_url, connections, duration)))
+
+
+def measure(workers: int, clients: int, connections: int, duration: float) -> float:
+    port = free_port()
+    env = {
+        **os.environ,
+        "WORKERS": str(workers),
+        "SERVICE_PORT": str(port),
+        "LOG_LEVEL": "WARNING",
+        "UVICORN_ACCESS_LOG": "false",
+        "PYTHONPATH": str(ROOT / "services"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=PRODUCT_SERVICE, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_ready(f"{base_url}/products/health/live")
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=client_process, args=(base_url, connections, duration, results))
+            for _ in range(clients)
+        ]
+        start = time.perf_counter()
+        for proc in procs:
+            proc.start()
+        total = sum(results.get() for _ in procs)
+        elapsed = time.perf_counter() - start
+        for proc in procs:
+            proc.join()
+        return total / elapsed
+    finally:
+        # SIGTERM exercises the graceful shutdown path
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="*",
+                        help="Worker counts to test (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Client processes")
+    parser.add_argument("--connections", type=int, default=32, help="Connections per client process")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    workers = args.workers
+    if not workers:
+        cpus = os.cpu_count() or 1
+        workers = [1]
+        while workers[-1] * 2 <= cpus:
+            workers.append(workers[-1] * 2)
+
+    results = []
+    for count in workers:
+        rate = measure(count, args.clients, args.connections, args.duration)
+        results.append({
+            "workers": count,
+            "requests_per_sec": rate,
+            "speedup": rate / results[0]["requests_per_sec"] if results else 1.0,
+        })
+
+    if args.json:
+        print(json.dumps({"cpus": os.cpu_count(), "results": results}, indent=2))
+        return
+    print(f"cpus: {os.cpu_count()}")
+    print(f"{'workers':>8} {'req/sec':>10} {'speedup':>8}")
+    for row in results:
+        print(f"{row['workers']:>8} {row['requests_per_sec']:>10.0f} {row['speedup']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
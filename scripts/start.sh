@@ -44,6 +44,13 @@ else
     echo "? Product Service - Not ready"
 fi
 
+echo "Checking Aggregation Service..."
+if curl -s http://localhost:8003/aggregate/health/live >/dev/null 2>&1; then
+    echo "? Aggregation Service - Ready"
+else
+    echo "? Aggregation Service - Not ready"
+fi
+
 echo ""
 echo "Available Endpoints:"
 echo "==================="
@@ -51,6 +58,7 @@ echo "?? API Gateway: http://localhost:8080"
 echo "?? Envoy Admin: http://localhost:9901"
 echo "?? Customer Service (direct): http://localhost:8001"
 echo "?? Product Service (direct): http://localhost:8002"
+echo "?? Aggregation Service (direct): http://localhost:8003"
 echo ""
 echo "Example API calls through gateway:"
 echo " GET http://localhost:8080/customers"
@@ -27,9 +27,20 @@ echo "============================="
 # Run tests with verbose output
 python -m pytest tests/ -v --tb=short
 
+# Optional load-suite smoke run: ./scripts/test.sh --bench-smoke
+if [ "$1" = "--bench-smoke" ]; then
+    echo ""
+    echo "Running load suite (smoke mode)..."
+    echo "=================================="
+    python benchmarks/load_suite.py --smoke
+fi
+
 echo ""
 echo "Test run completed!"
 echo ""
 echo "To run specific test file:"
 echo "pytest tests/test_customer_service.py -v"
-echo "pytest tests/test_product_service.py -v"
\ No newline at end of file
+echo "pytest tests/test_product_service.py -v"
+echo ""
+echo "To include a load-suite smoke run:"
+echo "./scripts/test.sh --bench-smoke"
\ No newline at end of file
@@ -0,0 +1,134 @@
+from fastapi import FastAPI, HTTPException, Request, Response
+from typing import Optional
+from contextlib import asynccontextmanager
+import os
+import sys
+sys.path.append('/app')
+
+from models.view import CustomerView
+from shared.common import setup_logging, create_sampled_logger
+from shared.health import HealthProbes
+from shared.metrics import METRICS_MEDIA_TYPE, setup_metrics
+from shared.ratelimit import setup_rate_limit
+from shared.responses import ORJSONResponse, dumps
+from shared.batch import parse_ids
+from shared.upstream import Upstream, fan_out, forwarded_headers
+
+# Setup logging
+logger = setup_logging("aggregation-service")
+# Per-request lookup lines are sampled (LOG_SAMPLE_EVERY) to keep log volume down under load
+lookup_logger = create_sampled_logger(logger)
+
+# Services are called directly over pooled keep-alive connections, not back through the gateway
+customer_service = Upstream(
+    "customer-service",
+    os.getenv("CUSTOMER_SERVICE_URL", "http://customer-service:8000"),
+    float(os.getenv("CUSTOMER_SERVICE_TIMEOUT", 1.0))
+)
+product_service = Upstream(
+    "product-service",
+    os.getenv("PRODUCT_SERVICE_URL", "http://product-service:8000"),
+    float(os.getenv("PRODUCT_SERVICE_TIMEOUT", 1.0))
+)
+
+# Product batch for a view that asks for no products
+NO_PRODUCTS = b'{"items":[],"missing":[]}'
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the upstream connection pools on shutdown"""
+    yield
+    await customer_service.aclose()
+    await product_service.aclose()
+
+app = FastAPI(
+    title="Aggregation Service",
+    description="Composes documents from the customer and product services in one call",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+# Per-caller token buckets keyed on the gateway's x-jwt-sub header
+rate_limiter = setup_rate_limit(app)
+
+# Per-route request metrics, exposed at /aggregate/metrics (outermost, so 429s are counted)
+metrics = setup_metrics(app, "aggregation-service")
+
+async def check_ready():
+    """Readiness details; upstreams are not probed, so one slow service does not eject this one"""
+    return {"upstreams": {
+        customer_service.name: customer_service.base_url,
+        product_service.name: product_service.base_url,
+    }}
+
+health = HealthProbes("aggregation-service", check_ready)
+
+@app.get("/aggregate/health")
+async def health_check():
+    """Health check endpoint (same as readiness)"""
+    return await health.ready()
+
+@app.get("/aggregate/health/live")
+async def liveness_check():
+    """Liveness probe: static payload, no logging"""
+    return health.live()
+
+@app.get("/aggregate/health/ready")
+async def readiness_check():
+    """Readiness probe, cached for HEALTH_READY_TTL seconds"""
+    return await health.ready()
+
+@app.get("/aggregate/metrics")
+async def get_metrics():
+    """Prometheus metrics for this worker"""
+    return Response(content=metrics.render(), media_type=METRICS_MEDIA_TYPE)
+
+@app.get("/aggregate/customers/{customer_id}", response_model=CustomerView)
+async def get_customer_view(request: Request, customer_id: int, product_ids: Optional[str] = None):
+    """
+    Get a customer and the products with product_ids in one document.
+
+    The customer and product services are called concurrently, each with
+    its own timeout. If one of them fails, its part is null and the failure
+    is listed in errors; 404 if the customer does not exist and 502 if no
+    upstream answered.
+    """
+    try:
+        ids = parse_ids(product_ids) if product_ids else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lookup_logger.info("Composing customer %s with %d products", customer_id, len(ids))
+
+    headers = forwarded_headers(request.headers)
+    calls = {"customer": customer_service.get(f"/customers/{customer_id}", headers=headers, expect=(200, 404))}
+    if ids:
+        calls["products"] = product_service.get(
+            "/products", params={"ids": ",".join(map(str, ids))}, headers=headers
+        )
+    results, errors = await fan_out(calls)
+
+    customer = results.get("customer")
+    if customer is not None and customer.status_code == 404:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    failures = [error.to_dict() for error in errors.values()]
+    for error in errors.values():
+        logger.warning("Customer view %s: %s", customer_id, error)
+    if not results:
+        raise HTTPException(status_code=502, detail={"message": "No upstream answered", "errors": failures})
+
+    if not ids:
+        products = NO_PRODUCTS
+    else:
+        products = results["products"].content if "products" in results else b"null"
+    # The upstream bodies are JSON already; splice them in rather than parse and re-encode
+    body = b"".join((
+        b'{"customer":', customer.content if customer is not None else b"null",
+        b',"products":', products,
+        b',"errors":', dumps(failures), b"}",
+    ))
+    return Response(content=body, media_type="application/json")
+
+if __name__ == "__main__":
+    from shared.server import run
+    run("main:app", instance=app)
@@ -0,0 +1 @@
+# Aggregation models package
\ No newline at end of file
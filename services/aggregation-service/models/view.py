@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+# Documents are composed from the upstream bodies as returned; these models
+# describe them for the OpenAPI schema
+
+class UpstreamFailure(BaseModel):
+    upstream: str
+    error: str
+    # Status the upstream returned, if it answered at all
+    status: Optional[int] = None
+
+class ProductBatch(BaseModel):
+    items: List[Dict[str, Any]]
+    # Requested ids that do not exist
+    missing: List[int]
+
+class CustomerView(BaseModel):
+    # None when the customer service failed
+    customer: Optional[Dict[str, Any]]
+    # None when the product service failed
+    products: Optional[ProductBatch]
+    errors: List[UpstreamFailure]
@@ -1,24 +1,108 @@
-from fastapi import FastAPI, HTTPException
-from typing import List
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from typing import List, Optional, Union
+from contextlib import asynccontextmanager, suppress
+from pydantic import TypeAdapter
+import asyncio
 from datetime import datetime
 import os
 import sys
 sys.path.append('/app')
 
-from models.customer import Customer, CustomerCreate, CustomerResponse
-from shared.common import setup_logging, create_health_response
+from models.customer import CustomerBatch, Customer, CustomerBulkItem, CustomerResponse
+from repository import CustomerRepository, CUSTOMERS_TABLE
+from shared.common import setup_logging, create_sampled_logger
+from shared.health import HealthProbes
+from shared.bulk import BulkResult, read_bulk_rows, validate_bulk_rows, bulk_errors, reject_bulk_errors
+from shared.cache import ResponseCache
+from shared.metrics import METRICS_MEDIA_TYPE, setup_metrics
+from shared.ratelimit import setup_rate_limit
+from shared.streaming import ndjson_response
+from shared.persistence import create_backend, load_repository
+from shared.responses import ORJSONResponse
+from shared.batch import BatchRequest, batch_response, parse_ids
+from shared.snapshot import IndexesNotReady, index_in_background, open_snapshot, write_snapshot
+from shared.changes import ChangePage, ChangesExpired, change_page, change_stream
+from shared.pagination import MAX_PAGE_SIZE, decode_cursor, parse_fields, page_response
 
 # Setup logging
 logger = setup_logging("customer-service")
+# Per-request lookup lines are sampled (LOG_SAMPLE_EVERY) to keep log volume down under load
+lookup_logger = create_sampled_logger(logger)
+
+# Optional durable store behind customers_db (in-memory only when DATABASE_URL is unset)
+database = create_backend(os.getenv("DATABASE_URL"), int(os.getenv("DB_POOL_SIZE", 5)))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load customers_db (or index its snapshot) on startup and release the pool on shutdown"""
+    global snapshot
+    watermark = None
+    if database:
+        await database.connect()
+        if snapshot is not None:
+            # Writes since the snapshot was taken bumped the data version: it is stale
+            await database.ensure_table(CUSTOMERS_TABLE)
+            if snapshot.watermark != await database.data_version(CUSTOMERS_TABLE):
+                logger.info("Snapshot %s is behind the database; reloading", SNAPSHOT_PATH)
+                snapshot = None
+        if snapshot is None:
+            watermark = await load_repository(database, CUSTOMERS_TABLE, customers_db)
+            logger.info("Loaded %d customers from database", len(customers_db))
+    if SNAPSHOT_PATH and snapshot is None:
+        count = write_snapshot(SNAPSHOT_PATH, CUSTOMERS_TABLE, customers_db, watermark)
+        logger.info("Wrote %d customers to snapshot %s", count, SNAPSHOT_PATH)
+    # Indexed in a thread while lookups by id are served; readiness reports 503 until it is done
+    indexer = asyncio.create_task(index_in_background(customers_db, logger)) if snapshot is not None else None
+    yield
+    if indexer is not None:
+        indexer.cancel()
+        with suppress(asyncio.CancelledError):
+            await indexer
+    if database:
+        await database.close()
 
 app = FastAPI(
     title="Customer Service",
     description="Microservice for managing customers",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Per-caller token buckets keyed on the gateway's x-jwt-sub header
+rate_limiter = setup_rate_limit(app)
+
+# Per-route request metrics, exposed at /customers/metrics (outermost, so 429s are counted)
+metrics = setup_metrics(app, "customer-service")
+
+@app.exception_handler(IndexesNotReady)
+async def indexes_not_ready(request: Request, exc: IndexesNotReady):
+    """Email lookups, searches and writes while the snapshot is being indexed"""
+    return ORJSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "5"})
+
+async def check_ready():
+    """Readiness details; raises if the database is unreachable or the snapshot is still being indexed"""
+    if not customers_db.indexes_ready:
+        raise IndexesNotReady("Customer indexes are still being built")
+    details = {"customers": len(customers_db)}
+    if database:
+        details["database"] = await database.ping()
+    return details
+
+health = HealthProbes("customer-service", check_ready)
+
+# Encoded list responses, invalidated whenever customers_db changes
+response_cache = ResponseCache()
+
+# Serializes writers so id assignment and persistence happen in one step
+write_lock = asyncio.Lock()
+customer_bulk_adapter = TypeAdapter(List[CustomerBulkItem])
+
+# Store customers as compact __slots__ records instead of Pydantic models
+COMPACT_STORAGE = os.getenv("COMPACT_STORAGE", "false").lower() == "true"
+
 # Mock data for now (will be replaced with database)
-customers_db = [
+customers_db = CustomerRepository([
     Customer(
         id=1,
         name="Test User",
@@ -68,32 +152,216 @@ customers_db = [
         phone="+1234567896",
         created_at=datetime.now()
     )
-]
+], compact=COMPACT_STORAGE)
+
+# Warm start: with SNAPSHOT_PATH set, customers are served from a memory-mapped snapshot
+# (written on the first start) instead of the data above or the database
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+snapshot = open_snapshot(SNAPSHOT_PATH, CUSTOMERS_TABLE) if SNAPSHOT_PATH else None
+if snapshot is not None:
+    customers_db = CustomerRepository.from_snapshot(snapshot)
+    logger.info("Opened snapshot %s with %d customers", SNAPSHOT_PATH, len(customers_db))
 
 @app.get("/customers/health")
-def health_check():
-    """Health check endpoint"""
-    logger.info("Health check requested")
-    return create_health_response("customer-service")
+async def health_check():
+    """Health check endpoint (same as readiness)"""
+    return await health.ready()
+
+@app.get("/customers/health/live")
+async def liveness_check():
+    """Liveness probe: static payload, no logging"""
+    return health.live()
+
+@app.get("/customers/health/ready")
+async def readiness_check():
+    """Readiness probe: checks the database, cached for HEALTH_READY_TTL seconds"""
+    return await health.ready()
+
+@app.get("/customers/metrics")
+async def get_metrics():
+    """Prometheus metrics for this worker"""
+    return Response(content=metrics.render(), media_type=METRICS_MEDIA_TYPE)
+
+@app.get("/customers", response_model=Union[List[CustomerResponse], CustomerBatch])
+async def get_customers(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    ids: Optional[str] = None,
+):
+    """
+    Get all customers, optionally paginated by cursor and projected to fields.
+
+    With ids=1,2,3 returns {"items": [...], "missing": [...]} for just those customers,
+    in request order.
+    """
+    try:
+        after_id = decode_cursor(cursor) if cursor else None
+        include = parse_fields(fields, CustomerResponse.model_fields)
+        batch_ids = parse_ids(ids) if ids is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if batch_ids is not None:
+        if limit is not None or cursor:
+            raise HTTPException(status_code=400, detail="ids cannot be combined with limit or cursor")
+        lookup_logger.info("Fetching %d customers by ID", len(batch_ids))
+
+        def build():
+            return batch_response(customers_db.get_many, batch_ids, include)
+    else:
+        lookup_logger.info("Fetching all customers. Count: %d", len(customers_db))
+
+        def build():
+            customers, has_more = customers_db.page(after_id, limit)
+            return page_response(customers, limit, has_more, include)
 
-@app.get("/customers", response_model=List[CustomerResponse])
-def get_customers():
-    """Get all customers"""
-    logger.info(f"Fetching all customers. Count: {len(customers_db)}")
-    return customers_db
+    return response_cache.respond(request, customers_db.version, build)
+
+@app.post("/customers/batch", response_model=CustomerBatch)
+async def batch_get_customers(batch: BatchRequest, fields: Optional[str] = None):
+    """Get customers by ID for id sets too large for a query string"""
+    try:
+        include = parse_fields(fields, CustomerResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lookup_logger.info("Fetching %d customers by ID", len(batch.ids))
+    return batch_response(customers_db.get_many, batch.ids, include)
+
+@app.get("/customers/search", response_model=List[CustomerResponse])
+async def search_customers(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    prefix: bool = True,
+    fields: Optional[str] = None,
+):
+    """
+    Search customers by name and email, best matches first.
+
+    Every word must match; with prefix=true (the default) the last word may be
+    the start of a longer one, for typeahead.
+    """
+    try:
+        include = parse_fields(fields, CustomerResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lookup_logger.info("Searching customers: %s", q)
+
+    def build():
+        return page_response(customers_db.search(q, limit, prefix), None, False, include)
+
+    return response_cache.respond(request, customers_db.version, build)
+
+@app.get("/customers/export")
+async def export_customers():
+    """Stream all customers as NDJSON, one customer per line"""
+    logger.info("Exporting customers. Count: %d", len(customers_db))
+    return ndjson_response(customers_db.page)
+
+@app.get("/customers/changes", response_model=ChangePage)
+async def get_customer_changes(
+    since: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """
+    Get the customers changed after since (the next value of the previous poll), oldest first.
+
+    Without since, returns no items and the position to poll from after a
+    full export. Returns 410 if changes after since are no longer retained
+    or since was issued by another worker or run.
+    """
+    try:
+        page = change_page(customers_db.changes, since, limit, customers_db.get)
+    except ChangesExpired as e:
+        logger.warning("Change poll too old: %s", e)
+        raise HTTPException(status_code=410, detail=str(e))
+    return ORJSONResponse(page, headers={"Cache-Control": "no-store"})
+
+@app.get("/customers/changes/stream")
+async def stream_customer_changes(since: Optional[str] = None, last_event_id: Optional[str] = Header(None)):
+    """Follow customer changes as Server-Sent Events, resuming from Last-Event-ID on reconnect"""
+    try:
+        return change_stream(customers_db.changes, last_event_id if since is None else since, customers_db.get)
+    except ChangesExpired as e:
+        logger.warning("Change stream too old: %s", e)
+        raise HTTPException(status_code=410, detail=str(e))
 
 @app.get("/customers/{customer_id}", response_model=CustomerResponse)
-def get_customer(customer_id: int):
+async def get_customer(customer_id: int):
     """Get a specific customer by ID"""
-    logger.info(f"Fetching customer with ID: {customer_id}")
-    customer = next((c for c in customers_db if c.id == customer_id), None)
+    lookup_logger.info("Fetching customer with ID: %s", customer_id)
+    customer = customers_db.get(customer_id)
     if not customer:
-        logger.warning(f"Customer not found with ID: {customer_id}")
+        logger.warning("Customer not found with ID: %s", customer_id)
         raise HTTPException(status_code=404, detail="Customer not found")
-    return customer
+    return ORJSONResponse(customer)
+
+@app.get("/customers/by-email/{email}", response_model=CustomerResponse)
+async def get_customer_by_email(email: str):
+    """Get a specific customer by email address"""
+    lookup_logger.info("Fetching customer with email: %s", email)
+    customer = customers_db.get_by_email(email)
+    if not customer:
+        logger.warning("Customer not found with email: %s", email)
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return ORJSONResponse(customer)
+
+@app.post("/customers/bulk", response_model=BulkResult)
+async def bulk_upsert_customers(request: Request, partial: bool = False):
+    """
+    Create or update customers from a JSON array or NDJSON body.
+
+    Rows are validated in one batched pass and applied atomically. With
+    partial=true, invalid rows are reported and the valid rows are applied.
+    """
+    rows, errors = await read_bulk_rows(request)
+    logger.info("Bulk upsert of %d customers (partial=%s)", len(rows), partial)
+    items = validate_bulk_rows(customer_bulk_adapter, rows, errors)
+
+    async with write_lock:
+        now = datetime.now()
+        next_id = max([customers_db.next_id()] + [item.id + 1 for _, item in items if item.id is not None])
+        seen_ids = set()
+        customers = []
+        row_indices = []
+        for index, item in items:
+            customer_id = item.id
+            if customer_id is None:
+                customer_id = next_id
+                next_id += 1
+            elif customer_id in seen_ids:
+                errors[index] = f"Duplicate customer ID {customer_id} in batch"
+                continue
+            seen_ids.add(customer_id)
+            existing = customers_db.get(customer_id)
+            customers.append(Customer.model_construct(
+                **item.model_dump(exclude={"id"}),
+                id=customer_id,
+                created_at=existing.created_at if existing else now
+            ))
+            row_indices.append(index)
+
+        conflicts = customers_db.email_conflicts(customers)
+        for position, message in conflicts.items():
+            errors[row_indices[position]] = message
+        customers = [c for position, c in enumerate(customers) if position not in conflicts]
+        if not partial:
+            reject_bulk_errors(errors)
+
+        if database:
+            await database.upsert_many(CUSTOMERS_TABLE, customers)
+        created = customers_db.upsert_many(customers)
+
+    logger.info("Bulk upsert applied %d customers, rejected %d", len(customers), len(errors))
+    return BulkResult(
+        created=created,
+        updated=len(customers) - created,
+        failed=len(errors),
+        errors=bulk_errors(errors)
+    )
 
 if __name__ == "__main__":
-    import uvicorn
-    port = int(os.getenv("SERVICE_PORT", 8000))
-    logger.info(f"Starting customer service on port {port}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    from shared.server import run
+    run("main:app", instance=app)
\ No newline at end of file
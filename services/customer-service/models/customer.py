@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class Customer(BaseModel):
@@ -14,9 +14,18 @@ class CustomerCreate(BaseModel):
     email: str
     phone: Optional[str] = None
     
+class CustomerBulkItem(CustomerCreate):
+    # Existing customer to update; a new id is assigned when omitted
+    id: Optional[int] = None
+    
 class CustomerResponse(BaseModel):
     id: int
     name: str
     email: str
     phone: Optional[str] = None
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+    
+class CustomerBatch(BaseModel):
+    items: List[CustomerResponse]
+    # Requested ids that do not exist
+    missing: List[int]
@@ -0,0 +1,349 @@
+"""
+In-memory customer repository with hash indexes
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.customer import Customer
+from shared.changes import ChangeLog
+from shared.persistence import Column, Table
+from shared.search import SearchIndex
+from shared.snapshot import IndexesNotReady, Snapshot, SnapshotRecords
+
+
+CUSTOMERS_TABLE = Table(
+    name="customers",
+    model=Customer,
+    columns=(
+        Column("id", "INTEGER"),
+        Column("name", "TEXT"),
+        Column("email", "TEXT"),
+        Column("phone", "TEXT", nullable=True),
+        Column("created_at", "TIMESTAMP"),
+    ),
+    indexes=(("email", True),),
+)
+
+
+class CustomerRecord:
+    """
+    Compact stored form of a Customer.
+
+    A __slots__ object without Pydantic's per-instance dict and field-set
+    bookkeeping; Customer models are only built when a record is read.
+    """
+    __slots__ = ("id", "name", "email", "phone", "created_at")
+
+    def __init__(self, id: int, name: str, email: str, phone: Optional[str], created_at: datetime):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.phone = phone
+        self.created_at = created_at
+
+    @classmethod
+    def from_model(cls, customer: Customer) -> "CustomerRecord":
+        return cls(customer.id, customer.name, customer.email, customer.phone, customer.created_at)
+
+    def to_model(self) -> Customer:
+        return Customer.model_construct(
+            id=self.id,
+            name=self.name,
+            email=self.email,
+            phone=self.phone,
+            created_at=self.created_at
+        )
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class CustomerRepository:
+    """
+    Customer store indexed by id with a secondary unique index on email and
+    a full-text index over name and email.
+    Every write is logged to `changes` for the change feed.
+
+    With compact=True customers are stored as CustomerRecord objects and
+    materialized as Customer models only when read. from_snapshot() opens a
+    repository over a memory-mapped snapshot instead.
+    """
+
+    def __init__(self, customers: Iterable[Customer] = (), compact: bool = False):
+        self.compact = compact
+        self._encode = CustomerRecord.from_model if compact else _identity
+        self._decode = CustomerRecord.to_model if compact else _identity
+        # Bumped on every write so derived caches can detect staleness
+        self.version = 0
+        # Ids of changed records for the change feed
+        self.changes = ChangeLog()
+        self._by_id: Dict[int, Any] = {}
+        # Sorted ids for keyset pagination
+        self._ids: List[int] = []
+        self._by_email: Dict[str, int] = {}
+        self._search = SearchIndex()
+        # False until the email and search indexes cover every customer
+        self._indexed = True
+        # True while begin_indexing()'s build runs
+        self._indexing = False
+        for customer in customers:
+            self.add(customer)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot) -> "CustomerRepository":
+        """
+        Open a repository over a snapshot of customers.
+
+        Customers stay in the mapped file and are decoded when read; writes
+        are kept in memory on top of it. The email and search indexes are
+        built in the background (begin_indexing()), by build_indexes() or on
+        first use (an email lookup, a search or a write).
+        """
+        repository = cls()
+        repository._by_id = SnapshotRecords(snapshot)
+        repository._ids = snapshot.id_array()
+        repository._indexed = False
+        return repository
+
+    @property
+    def indexes_ready(self) -> bool:
+        """Whether email lookups, searches and writes can be served"""
+        return self._indexed
+
+    def _index_attributes(self, customer: Customer) -> None:
+        self._by_email[self._email_key(customer.email)] = customer.id
+        self._search.add(customer.id, self._search_text(customer))
+
+    def _ensure_indexed(self) -> None:
+        """Build the email and search indexes of a snapshot-backed repository"""
+        if not self._indexed:
+            if self._indexing:
+                raise IndexesNotReady("Customer indexes are still being built")
+            for stored in self._by_id.values():
+                self._index_attributes(self._decode(stored))
+            self._indexed = True
+
+    def build_indexes(self) -> None:
+        """
+        Build the email and search indexes now.
+
+        Decodes every record of a snapshot-backed repository, which takes
+        seconds for a large one; services use begin_indexing() instead.
+        """
+        self._ensure_indexed()
+
+    def begin_indexing(self) -> Callable[[], Optional["CustomerRepository"]]:
+        """
+        Start building the indexes of a snapshot-backed repository off the event loop.
+
+        Returns a function to run in a thread. It only reads the snapshot,
+        indexing its customers into a new repository, which it returns for
+        finish_indexing(). Meanwhile lookups by id and pages carry on, and
+        email lookups, searches and writes raise IndexesNotReady.
+        """
+        snapshot = self._by_id.snapshot
+        self._indexing = True
+
+        def build() -> Optional["CustomerRepository"]:
+            built = CustomerRepository()
+            for position in range(len(snapshot)):
+                if not self._indexing:
+                    # Abandoned by finish_indexing(None)
+                    return None
+                built._index_attributes(snapshot.record(position))
+            return built
+        return build
+
+    def finish_indexing(self, built: Optional["CustomerRepository"]) -> None:
+        """Install the indexes built by begin_indexing(), or give up on them if built is None"""
+        self._indexing = False
+        if built is None or self._indexed or getattr(self._by_id, "snapshot", None) is None:
+            return
+        # Writes need the email index, so none were made while it was built
+        self._by_email = built._by_email
+        self._search = built._search
+        self._indexed = True
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        """Normalize an email address for the unique index"""
+        return email.strip().casefold()
+
+    @staticmethod
+    def _search_text(customer: Customer) -> str:
+        return f"{customer.name} {customer.email}"
+
+    def _merge_ids(self, new_ids: List[int]) -> None:
+        """Add ids to the sorted id index, sorting only if they land out of order"""
+        if not new_ids:
+            return
+        in_order = (not self._ids or new_ids[0] > self._ids[-1]) and new_ids == sorted(new_ids)
+        self._ids.extend(new_ids)
+        if not in_order:
+            self._ids = sorted(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Customer]:
+        return map(self._decode, self._by_id.values())
+
+    def get(self, customer_id: int) -> Optional[Customer]:
+        """Get a customer by ID"""
+        stored = self._by_id.get(customer_id)
+        return None if stored is None else self._decode(stored)
+
+    def get_by_email(self, email: str) -> Optional[Customer]:
+        """Get a customer by email address (case-insensitive)"""
+        self._ensure_indexed()
+        customer_id = self._by_email.get(self._email_key(email))
+        if customer_id is None:
+            return None
+        return self._decode(self._by_id[customer_id])
+
+    def get_many(self, ids: Iterable[int]) -> Tuple[List[Customer], List[int]]:
+        """
+        Get customers by ID in request order, each id once.
+
+        Returns the found customers and the ids that do not exist.
+        """
+        found: List[Customer] = []
+        missing: List[int] = []
+        for customer_id in dict.fromkeys(ids):
+            stored = self._by_id.get(customer_id)
+            if stored is None:
+                missing.append(customer_id)
+            else:
+                found.append(self._decode(stored))
+        return found, missing
+
+    def search(self, query: str, limit: int, prefix: bool = True) -> List[Customer]:
+        """Get the customers best matching a text query (see SearchIndex.search)"""
+        self._ensure_indexed()
+        hits = self._search.search(query, limit, prefix)
+        return [self._decode(self._by_id[customer_id]) for customer_id, _ in hits]
+
+    def next_id(self) -> int:
+        """Get the id after the highest stored id"""
+        return self._ids[-1] + 1 if self._ids else 1
+
+    def list(self) -> List[Customer]:
+        """Get all customers in insertion order"""
+        return list(map(self._decode, self._by_id.values()))
+
+    def page(self, after_id: Optional[int] = None,
+             limit: Optional[int] = None) -> Tuple[List[Customer], bool]:
+        """
+        Get customers ordered by id, starting after after_id.
+
+        Returns the page and whether more customers follow it. Keying on id
+        rather than an offset keeps cursors stable across concurrent inserts.
+        """
+        start = 0 if after_id is None else bisect_right(self._ids, after_id)
+        end = len(self._ids) if limit is None else start + limit
+        ids = self._ids[start:end]
+        return [self._decode(self._by_id[i]) for i in ids], end < len(self._ids)
+
+    def clear(self) -> None:
+        """Remove all customers"""
+        self._by_id.clear()
+        self._ids = []
+        self._by_email.clear()
+        self._search.clear()
+        self._indexed = True
+        self.changes.reset()
+        self.version += 1
+
+    def add(self, customer: Customer) -> Customer:
+        """Add a new customer, enforcing unique id and email"""
+        self._ensure_indexed()
+        if customer.id in self._by_id:
+            raise ValueError(f"Customer with ID {customer.id} already exists")
+        email_key = self._email_key(customer.email)
+        if email_key in self._by_email:
+            raise ValueError(f"Customer with email {customer.email} already exists")
+        self._by_id[customer.id] = self._encode(customer)
+        if self._ids and customer.id < self._ids[-1]:
+            insort(self._ids, customer.id)
+        else:
+            self._ids.append(customer.id)
+        self._by_email[email_key] = customer.id
+        self._search.add(customer.id, self._search_text(customer))
+        self.changes.record(customer.id)
+        self.version += 1
+        return customer
+
+    def email_conflicts(self, customers: List[Customer]) -> Dict[int, str]:
+        """
+        Check a batch for email uniqueness before upsert_many.
+
+        Returns batch position -> error for customers whose email is taken by
+        another stored customer or an earlier customer in the same batch.
+        """
+        self._ensure_indexed()
+        conflicts: Dict[int, str] = {}
+        claimed: Dict[str, int] = {}
+        for position, customer in enumerate(customers):
+            email_key = self._email_key(customer.email)
+            owner = claimed.get(email_key, self._by_email.get(email_key))
+            if owner is not None and owner != customer.id:
+                conflicts[position] = f"Customer with email {customer.email} already exists"
+            else:
+                claimed[email_key] = customer.id
+        return conflicts
+
+    def upsert_many(self, customers: List[Customer]) -> int:
+        """
+        Insert or replace a batch of customers, returning how many were new.
+
+        Callers must check email_conflicts first. The sorted id index is
+        rebuilt once per batch instead of per row.
+        """
+        self._ensure_indexed()
+        new_ids = []
+        for customer in customers:
+            existing = self._by_id.get(customer.id)
+            if existing is None:
+                new_ids.append(customer.id)
+            else:
+                del self._by_email[self._email_key(existing.email)]
+            self._by_id[customer.id] = self._encode(customer)
+            self._index_attributes(customer)
+        self._merge_ids(new_ids)
+        self.changes.record_many(customer.id for customer in customers)
+        self.version += 1
+        return len(new_ids)
+
+    def update(self, customer: Customer) -> Customer:
+        """Replace an existing customer and re-index its email"""
+        self._ensure_indexed()
+        existing = self._by_id.get(customer.id)
+        if existing is None:
+            raise KeyError(customer.id)
+        old_key = self._email_key(existing.email)
+        new_key = self._email_key(customer.email)
+        if new_key != old_key:
+            if new_key in self._by_email:
+                raise ValueError(f"Customer with email {customer.email} already exists")
+            del self._by_email[old_key]
+            self._by_email[new_key] = customer.id
+        self._by_id[customer.id] = self._encode(customer)
+        self._search.add(customer.id, self._search_text(customer))
+        self.changes.record(customer.id)
+        self.version += 1
+        return customer
+
+    def delete(self, customer_id: int) -> Optional[Customer]:
+        """Remove a customer, returning it if it existed"""
+        self._ensure_indexed()
+        stored = self._by_id.pop(customer_id, None)
+        if stored is None:
+            return None
+        del self._ids[bisect_left(self._ids, customer_id)]
+        del self._by_email[self._email_key(stored.email)]
+        self._search.remove(customer_id)
+        self.changes.record(customer_id)
+        self.version += 1
+        return self._decode(stored)
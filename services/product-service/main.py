@@ -1,25 +1,118 @@
-from fastapi import FastAPI, HTTPException
-from typing import List
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from typing import Dict, List, Literal, Optional, Union
+from contextlib import asynccontextmanager, suppress
+from pydantic import TypeAdapter
+import asyncio
 from datetime import datetime
 from decimal import Decimal
 import os
 import sys
 sys.path.append('/app')
 
-from models.product import Product, ProductCreate, ProductResponse
-from shared.common import setup_logging, create_health_response
+from models.product import (
+    ProductBatch, Product, ProductBulkItem, ProductResponse, CategoryCount,
+    ReservationItem, ReservationRequest, ReservationResponse, ReserveRequest,
+)
+from repository import ProductRepository, PRODUCTS_TABLE
+from reservations import InsufficientStock, Reservation, ReservationManager
+from shared.common import setup_logging, create_sampled_logger
+from shared.health import HealthProbes
+from shared.bulk import BulkResult, read_bulk_rows, validate_bulk_rows, bulk_errors, reject_bulk_errors
+from shared.cache import ResponseCache
+from shared.metrics import METRICS_MEDIA_TYPE, setup_metrics
+from shared.ratelimit import setup_rate_limit
+from shared.streaming import ndjson_response
+from shared.persistence import create_backend, load_repository
+from shared.responses import ORJSONResponse
+from shared.batch import BatchRequest, batch_response, parse_ids
+from shared.snapshot import IndexesNotReady, index_in_background, open_snapshot, write_snapshot
+from shared.changes import ChangePage, ChangesExpired, change_page, change_stream
+from shared.pagination import MAX_PAGE_SIZE, decode_cursor, parse_fields, page_response
 
 # Setup logging
 logger = setup_logging("product-service")
+# Per-request lookup lines are sampled (LOG_SAMPLE_EVERY) to keep log volume down under load
+lookup_logger = create_sampled_logger(logger)
+
+# Optional durable store behind products_db (in-memory only when DATABASE_URL is unset)
+database = create_backend(os.getenv("DATABASE_URL"), int(os.getenv("DB_POOL_SIZE", 5)))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load products_db and start the reservation sweeper and snapshot indexing on startup; stop them on shutdown"""
+    global snapshot
+    watermark = None
+    if database:
+        await database.connect()
+        if snapshot is not None:
+            # Writes since the snapshot was taken bumped the data version: it is stale
+            await database.ensure_table(PRODUCTS_TABLE)
+            if snapshot.watermark != await database.data_version(PRODUCTS_TABLE):
+                logger.info("Snapshot %s is behind the database; reloading", SNAPSHOT_PATH)
+                snapshot = None
+        if snapshot is None:
+            watermark = await load_repository(database, PRODUCTS_TABLE, products_db)
+            logger.info("Loaded %d products from database", len(products_db))
+    if SNAPSHOT_PATH and snapshot is None:
+        count = write_snapshot(SNAPSHOT_PATH, PRODUCTS_TABLE, products_db, watermark)
+        logger.info("Wrote %d products to snapshot %s", count, SNAPSHOT_PATH)
+    # Indexed in a thread while lookups by id are served; readiness reports 503 until it is done
+    indexer = asyncio.create_task(index_in_background(products_db, logger)) if snapshot is not None else None
+    sweeper = asyncio.create_task(reservations.sweep(RESERVATION_SWEEP_INTERVAL))
+    yield
+    for task in (sweeper, indexer):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    if database:
+        await database.close()
 
 app = FastAPI(
     title="Product Service",
     description="Microservice for managing products",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Per-caller token buckets keyed on the gateway's x-jwt-sub header
+rate_limiter = setup_rate_limit(app)
+
+# Per-route request metrics, exposed at /products/metrics (outermost, so 429s are counted)
+metrics = setup_metrics(app, "product-service")
+
+@app.exception_handler(IndexesNotReady)
+async def indexes_not_ready(request: Request, exc: IndexesNotReady):
+    """Queries by category, stock, text or price while the snapshot is being indexed"""
+    return ORJSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "5"})
+
+async def check_ready():
+    """Readiness details; raises if the database is unreachable or the snapshot is still being indexed"""
+    if not products_db.indexes_ready:
+        raise IndexesNotReady("Product indexes are still being built")
+    details = {"products": len(products_db)}
+    if database:
+        details["database"] = await database.ping()
+    return details
+
+health = HealthProbes("product-service", check_ready)
+
+# Seconds the gateway may serve catalog reads from its cache; browsers always revalidate by ETag
+GATEWAY_CACHE_TTL = int(os.getenv("GATEWAY_CACHE_TTL", 5))
+
+# Encoded catalog responses, invalidated whenever products_db changes
+response_cache = ResponseCache(cache_control=f"public, max-age=0, s-maxage={GATEWAY_CACHE_TTL}")
+
+# Serializes writers so id assignment and persistence happen in one step
+write_lock = asyncio.Lock()
+product_bulk_adapter = TypeAdapter(List[ProductBulkItem])
+
+# Store products as compact __slots__ records instead of Pydantic models
+COMPACT_STORAGE = os.getenv("COMPACT_STORAGE", "false").lower() == "true"
+
 # Mock data for now (will be replaced with database)
-products_db = [
+products_db = ProductRepository([
     Product(
         id=1,
         name="Laptop",
@@ -47,40 +140,320 @@ products_db = [
         stock_quantity=25,
         created_at=datetime.now()
     )
-]
+], compact=COMPACT_STORAGE)
+
+# Warm start: with SNAPSHOT_PATH set, products are served from a memory-mapped snapshot
+# (written on the first start) instead of the data above or the database
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+snapshot = open_snapshot(SNAPSHOT_PATH, PRODUCTS_TABLE) if SNAPSHOT_PATH else None
+if snapshot is not None:
+    products_db = ProductRepository.from_snapshot(snapshot)
+    logger.info("Opened snapshot %s with %d products", SNAPSHOT_PATH, len(products_db))
+
+# Stock reservations for checkout, striped by product so unrelated checkouts never wait on each other
+RESERVATION_TTL = int(os.getenv("RESERVATION_TTL", 600))
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", 5))
+
+async def persist_stock(amounts: Dict[int, int]) -> Dict[int, int]:
+    return await database.take_many(PRODUCTS_TABLE, "stock_quantity", amounts)
+
+reservations = ReservationManager(
+    products_db, persist_stock if database else None, default_ttl=RESERVATION_TTL
+)
+
+def reservation_response(reservation: Reservation, status_code: int = 200) -> ORJSONResponse:
+    return ORJSONResponse(ReservationResponse(
+        id=reservation.id,
+        items=[ReservationItem(product_id=product_id, quantity=quantity)
+               for product_id, quantity in reservation.items.items()],
+        expires_at=reservation.expires_at
+    ), status_code=status_code)
+
+async def reserve_stock(items: Dict[int, int], ttl_seconds: Optional[int]) -> ORJSONResponse:
+    try:
+        reservation = await reservations.reserve(items, ttl_seconds)
+    except KeyError as e:
+        logger.warning("Reservation for unknown product ID: %s", e.args[0])
+        raise HTTPException(status_code=404, detail=f"Product {e.args[0]} not found")
+    except InsufficientStock as e:
+        lookup_logger.info("Reservation rejected: %s", e)
+        raise HTTPException(status_code=409, detail=str(e))
+    lookup_logger.info("Reserved %s as %s", items, reservation.id)
+    return reservation_response(reservation, status_code=201)
 
 @app.get("/products/health")
-def health_check():
-    """Health check endpoint"""
-    logger.info("Health check requested")
-    return create_health_response("product-service")
+async def health_check():
+    """Health check endpoint (same as readiness)"""
+    return await health.ready()
+
+@app.get("/products/health/live")
+async def liveness_check():
+    """Liveness probe: static payload, no logging"""
+    return health.live()
+
+@app.get("/products/health/ready")
+async def readiness_check():
+    """Readiness probe: checks the database, cached for HEALTH_READY_TTL seconds"""
+    return await health.ready()
+
+@app.get("/products/metrics")
+async def get_metrics():
+    """Prometheus metrics for this worker"""
+    return Response(content=metrics.render(), media_type=METRICS_MEDIA_TYPE)
+
+@app.get("/products", response_model=Union[List[ProductResponse], ProductBatch])
+async def get_products(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    ids: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    sort: Literal["id", "price"] = "id",
+):
+    """
+    Get all products, optionally paginated by cursor and projected to fields.
+
+    category, min_price, max_price and in_stock filter the list through the
+    repository's indexes; sort=price orders it by price (the first `limit`
+    matches, without a cursor).
+
+    With ids=1,2,3 returns {"items": [...], "missing": [...]} for just those products,
+    in request order.
+    """
+    try:
+        after_id = decode_cursor(cursor) if cursor else None
+        include = parse_fields(fields, ProductResponse.model_fields)
+        batch_ids = parse_ids(ids) if ids is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filtered = (category is not None or min_price is not None or max_price is not None
+                or in_stock is not None or sort != "id")
+    if batch_ids is not None:
+        if limit is not None or cursor or filtered:
+            raise HTTPException(status_code=400, detail="ids cannot be combined with limit, cursor or filters")
+        lookup_logger.info("Fetching %d products by ID", len(batch_ids))
+
+        def build():
+            return batch_response(products_db.get_many, batch_ids, include)
+    elif filtered:
+        if sort == "price" and cursor:
+            raise HTTPException(status_code=400, detail="cursor cannot be combined with sort=price")
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise HTTPException(status_code=400, detail="min_price cannot exceed max_price")
+        lookup_logger.info("Filtering products: category=%s price=%s..%s in_stock=%s sort=%s",
+                           category, min_price, max_price, in_stock, sort)
+
+        def build():
+            products, has_more = products_db.find(category, min_price, max_price, in_stock, sort, after_id, limit)
+            return page_response(products, limit, has_more and sort == "id", include)
+    else:
+        lookup_logger.info("Fetching all products. Count: %d", len(products_db))
 
-@app.get("/products", response_model=List[ProductResponse])
-def get_products():
-    """Get all products"""
-    logger.info(f"Fetching all products. Count: {len(products_db)}")
-    return products_db
+        def build():
+            products, has_more = products_db.page(after_id, limit)
+            return page_response(products, limit, has_more, include)
+
+    return response_cache.respond(request, products_db.version, build)
+
+@app.post("/products/batch", response_model=ProductBatch)
+async def batch_get_products(batch: BatchRequest, fields: Optional[str] = None):
+    """Get products by ID for id sets too large for a query string"""
+    try:
+        include = parse_fields(fields, ProductResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lookup_logger.info("Fetching %d products by ID", len(batch.ids))
+    return batch_response(products_db.get_many, batch.ids, include)
+
+@app.get("/products/categories", response_model=List[CategoryCount])
+async def get_categories(request: Request):
+    """Get product counts per category"""
+    lookup_logger.info("Fetching product categories")
+
+    def build():
+        return ORJSONResponse([
+            CategoryCount(category=category, count=count)
+            for category, count in products_db.category_counts().items()
+        ])
+
+    return response_cache.respond(request, products_db.version, build)
+
+@app.get("/products/search", response_model=List[ProductResponse])
+async def search_products(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    prefix: bool = True,
+    fields: Optional[str] = None,
+):
+    """
+    Search products by name and description, best matches first.
+
+    Every word must match; with prefix=true (the default) the last word may be
+    the start of a longer one, for typeahead.
+    """
+    try:
+        include = parse_fields(fields, ProductResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lookup_logger.info("Searching products: %s", q)
+
+    def build():
+        return page_response(products_db.search(q, limit, prefix), None, False, include)
+
+    return response_cache.respond(request, products_db.version, build)
+
+@app.get("/products/export")
+async def export_products():
+    """Stream all products as NDJSON, one product per line"""
+    logger.info("Exporting products. Count: %d", len(products_db))
+    return ndjson_response(products_db.page)
+
+@app.get("/products/changes", response_model=ChangePage)
+async def get_product_changes(
+    since: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """
+    Get the products changed after since (the next value of the previous poll), oldest first.
+
+    Without since, returns no items and the position to poll from after a
+    full export. Returns 410 if changes after since are no longer retained
+    or since was issued by another worker or run.
+    """
+    try:
+        page = change_page(products_db.changes, since, limit, products_db.get)
+    except ChangesExpired as e:
+        logger.warning("Change poll too old: %s", e)
+        raise HTTPException(status_code=410, detail=str(e))
+    return ORJSONResponse(page, headers={"Cache-Control": "no-store"})
+
+@app.get("/products/changes/stream")
+async def stream_product_changes(since: Optional[str] = None, last_event_id: Optional[str] = Header(None)):
+    """Follow product changes as Server-Sent Events, resuming from Last-Event-ID on reconnect"""
+    try:
+        return change_stream(products_db.changes, last_event_id if since is None else since, products_db.get)
+    except ChangesExpired as e:
+        logger.warning("Change stream too old: %s", e)
+        raise HTTPException(status_code=410, detail=str(e))
+
+@app.post("/products/reservations", response_model=ReservationResponse, status_code=201)
+async def reserve_products(request: ReservationRequest):
+    """
+    Reserve stock for several products at once, all or nothing.
+
+    Returns 409 without reserving anything if any product lacks stock.
+    """
+    items: Dict[int, int] = {}
+    for item in request.items:
+        items[item.product_id] = items.get(item.product_id, 0) + item.quantity
+    return await reserve_stock(items, request.ttl_seconds)
+
+@app.post("/products/reservations/{reservation_id}/confirm", response_model=ReservationResponse)
+async def confirm_reservation(reservation_id: str):
+    """Confirm a reservation: its stock stays taken and it can no longer expire"""
+    try:
+        reservation = reservations.confirm(reservation_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Reservation not found or expired")
+    lookup_logger.info("Confirmed reservation %s", reservation_id)
+    return reservation_response(reservation)
+
+@app.delete("/products/reservations/{reservation_id}", status_code=204)
+async def release_reservation(reservation_id: str):
+    """Release a reservation, returning its stock"""
+    try:
+        await reservations.release(reservation_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Reservation not found or expired")
+    lookup_logger.info("Released reservation %s", reservation_id)
+    return Response(status_code=204)
 
 @app.get("/products/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int):
+async def get_product(request: Request, product_id: int):
     """Get a specific product by ID"""
-    logger.info(f"Fetching product with ID: {product_id}")
-    product = next((p for p in products_db if p.id == product_id), None)
-    if not product:
-        logger.warning(f"Product not found with ID: {product_id}")
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    lookup_logger.info("Fetching product with ID: %s", product_id)
+
+    def build():
+        product = products_db.get(product_id)
+        if not product:
+            logger.warning("Product not found with ID: %s", product_id)
+            raise HTTPException(status_code=404, detail="Product not found")
+        return ORJSONResponse(product)
+
+    return response_cache.respond(request, products_db.version, build)
 
 @app.get("/products/category/{category}")
-def get_products_by_category(category: str):
+async def get_products_by_category(request: Request, category: str):
     """Get products by category"""
-    logger.info(f"Fetching products by category: {category}")
-    filtered_products = [p for p in products_db if p.category.lower() == category.lower()]
-    logger.info(f"Found {len(filtered_products)} products in category: {category}")
-    return filtered_products
+    lookup_logger.info("Fetching products by category: %s", category)
+
+    def build():
+        filtered_products = products_db.list_by_category(category)
+        lookup_logger.info("Found %d products in category: %s", len(filtered_products), category)
+        return ORJSONResponse(filtered_products)
+
+    return response_cache.respond(request, products_db.version, build)
+
+@app.post("/products/{product_id}/reserve", response_model=ReservationResponse, status_code=201)
+async def reserve_product(product_id: int, request: ReserveRequest):
+    """Reserve stock of one product; returns 409 if there is not enough"""
+    return await reserve_stock({product_id: request.quantity}, request.ttl_seconds)
+
+@app.post("/products/bulk", response_model=BulkResult)
+async def bulk_upsert_products(request: Request, partial: bool = False):
+    """
+    Create or update products from a JSON array or NDJSON body.
+
+    Rows are validated in one batched pass and applied atomically. With
+    partial=true, invalid rows are reported and the valid rows are applied.
+    """
+    rows, errors = await read_bulk_rows(request)
+    logger.info("Bulk upsert of %d products (partial=%s)", len(rows), partial)
+    items = validate_bulk_rows(product_bulk_adapter, rows, errors)
+
+    async with write_lock:
+        now = datetime.now()
+        next_id = max([products_db.next_id()] + [item.id + 1 for _, item in items if item.id is not None])
+        seen_ids = set()
+        products = []
+        for index, item in items:
+            product_id = item.id
+            if product_id is None:
+                product_id = next_id
+                next_id += 1
+            elif product_id in seen_ids:
+                errors[index] = f"Duplicate product ID {product_id} in batch"
+                continue
+            seen_ids.add(product_id)
+            existing = products_db.get(product_id)
+            products.append(Product.model_construct(
+                **item.model_dump(exclude={"id"}),
+                id=product_id,
+                created_at=existing.created_at if existing else now
+            ))
+        if not partial:
+            reject_bulk_errors(errors)
+
+        # Stock levels change too: wait out reservations of these products
+        async with reservations.locked(product.id for product in products):
+            if database:
+                await database.upsert_many(PRODUCTS_TABLE, products)
+            created = products_db.upsert_many(products)
+
+    logger.info("Bulk upsert applied %d products, rejected %d", len(products), len(errors))
+    return BulkResult(
+        created=created,
+        updated=len(products) - created,
+        failed=len(errors),
+        errors=bulk_errors(errors)
+    )
 
 if __name__ == "__main__":
-    import uvicorn
-    port = int(os.getenv("SERVICE_PORT", 8000))
-    logger.info(f"Starting product service on port {port}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    from shared.server import run
+    run("main:app", instance=app)
\ No newline at end of file
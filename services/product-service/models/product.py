@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
@@ -19,6 +19,10 @@ class ProductCreate(BaseModel):
     category: str
     stock_quantity: int
     
+class ProductBulkItem(ProductCreate):
+    # Existing product to update; a new id is assigned when omitted
+    id: Optional[int] = None
+    
 class ProductResponse(BaseModel):
     id: int
     name: str
@@ -26,4 +30,31 @@ class ProductResponse(BaseModel):
     price: Decimal
     category: str
     stock_quantity: int
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+    
+class CategoryCount(BaseModel):
+    category: str
+    count: int
+    
+class ProductBatch(BaseModel):
+    items: List[ProductResponse]
+    # Requested ids that do not exist
+    missing: List[int]
+    
+class ReservationItem(BaseModel):
+    product_id: int
+    quantity: int = Field(..., ge=1)
+    
+class ReserveRequest(BaseModel):
+    quantity: int = Field(1, ge=1)
+    # Seconds to hold the stock; RESERVATION_TTL when omitted
+    ttl_seconds: Optional[int] = Field(None, ge=1, le=86400)
+    
+class ReservationRequest(BaseModel):
+    items: List[ReservationItem] = Field(..., min_length=1, max_length=100)
+    ttl_seconds: Optional[int] = Field(None, ge=1, le=86400)
+    
+class ReservationResponse(BaseModel):
+    id: str
+    items: List[ReservationItem]
+    expires_at: datetime
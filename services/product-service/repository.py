@@ -0,0 +1,580 @@
+"""
+In-memory product repository with hash indexes
+"""
+from bisect import bisect_left, bisect_right, insort
+import heapq
+from itertools import islice
+import math
+import sys
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from models.product import Product
+from shared.changes import ChangeLog
+from shared.persistence import Column, Table
+from shared.search import SearchIndex
+from shared.snapshot import IndexesNotReady, Snapshot, SnapshotRecords
+
+
+PRODUCTS_TABLE = Table(
+    name="products",
+    model=Product,
+    columns=(
+        Column("id", "INTEGER"),
+        Column("name", "TEXT"),
+        Column("description", "TEXT"),
+        Column("price", "DECIMAL"),
+        Column("category", "TEXT"),
+        Column("stock_quantity", "INTEGER"),
+        Column("created_at", "TIMESTAMP"),
+    ),
+    indexes=(("category", False),),
+)
+
+
+class ProductRecord:
+    """
+    Compact stored form of a Product.
+
+    A __slots__ object without Pydantic's per-instance dict and field-set
+    bookkeeping. The price is kept as an integer number of units plus a
+    decimal exponent (99999, -2 for 999.99) instead of a Decimal, which
+    round-trips exactly including trailing zeros, and category names are
+    interned so products in a category share one string. Product models are
+    only built when a record is read.
+    """
+    __slots__ = ("id", "name", "description", "price_units", "price_exp",
+                 "category", "stock_quantity", "created_at")
+
+    def __init__(self, id: int, name: str, description: str, price_units: int, price_exp: int,
+                 category: str, stock_quantity: int, created_at: datetime):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.price_units = price_units
+        self.price_exp = price_exp
+        self.category = sys.intern(category)
+        self.stock_quantity = stock_quantity
+        self.created_at = created_at
+
+    @property
+    def price(self) -> Decimal:
+        return Decimal(self.price_units).scaleb(self.price_exp)
+
+    @classmethod
+    def from_model(cls, product: Product) -> "ProductRecord":
+        price_exp = product.price.as_tuple().exponent
+        return cls(
+            product.id, product.name, product.description,
+            int(product.price.scaleb(-price_exp)), price_exp,
+            product.category, product.stock_quantity, product.created_at
+        )
+
+    def to_model(self) -> Product:
+        return Product.model_construct(
+            id=self.id,
+            name=self.name,
+            description=self.description,
+            price=self.price,
+            category=self.category,
+            stock_quantity=self.stock_quantity,
+            created_at=self.created_at
+        )
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+# Bulk upserts larger than this merge into the price index in one pass instead of row by row
+PRICE_INDEX_MERGE_ROWS = 1000
+
+
+class ProductRepository:
+    """
+    Product store indexed by id with secondary indexes on category, price
+    and stock, and a full-text index over name and description.
+    Every write is logged to `changes` for the change feed.
+
+    With compact=True products are stored as ProductRecord objects and
+    materialized as Product models only when read. from_snapshot() opens a
+    repository over a memory-mapped snapshot instead.
+    """
+
+    def __init__(self, products: Iterable[Product] = (), compact: bool = False):
+        self.compact = compact
+        self._encode = ProductRecord.from_model if compact else _identity
+        self._decode = ProductRecord.to_model if compact else _identity
+        # Bumped on every write so derived caches can detect staleness
+        self.version = 0
+        # Ids of changed records for the change feed
+        self.changes = ChangeLog()
+        self._by_id: Dict[int, Any] = {}
+        # Sorted ids for keyset pagination
+        self._ids: List[int] = []
+        # Case-folded category -> ordered set of product ids
+        self._by_category: Dict[str, Dict[int, None]] = {}
+        # Case-folded category -> display name (first spelling seen)
+        self._category_names: Dict[str, str] = {}
+        self._search = SearchIndex()
+        # Ids with stock_quantity > 0
+        self._in_stock: Set[int] = set()
+        # Prices and ids sorted by (price, id); None until a price query builds them
+        self._prices: Optional[List[Decimal]] = None
+        self._price_ids: Optional[List[int]] = None
+        # False until the category, stock and search indexes cover every product
+        self._indexed = True
+        # True while begin_indexing()'s build runs
+        self._indexing = False
+        for product in products:
+            self.add(product)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot) -> "ProductRepository":
+        """
+        Open a repository over a snapshot of products.
+
+        Products stay in the mapped file and are decoded when read; writes
+        are kept in memory on top of it. The category, stock, search and
+        price indexes are built in the background (begin_indexing()), by
+        build_indexes() or on first use.
+        """
+        repository = cls()
+        repository._by_id = SnapshotRecords(snapshot)
+        repository._ids = snapshot.id_array()
+        repository._indexed = False
+        return repository
+
+    @staticmethod
+    def _category_key(category: str) -> str:
+        """Normalize a category name for the index"""
+        return category.strip().casefold()
+
+    def _index(self, product: Product) -> None:
+        if self._indexed:
+            self._index_attributes(product)
+        if self._prices is not None:
+            position = self._price_position(product.price, product.id)
+            self._prices.insert(position, product.price)
+            self._price_ids.insert(position, product.id)
+
+    def _unindex(self, product: Product) -> None:
+        if self._indexed:
+            self._unindex_attributes(product)
+        if self._prices is not None:
+            position = self._price_position(product.price, product.id)
+            del self._prices[position]
+            del self._price_ids[position]
+
+    def _index_attributes(self, product: Product) -> None:
+        key = self._category_key(product.category)
+        ids = self._by_category.get(key)
+        if ids is None:
+            ids = self._by_category[key] = {}
+            self._category_names[key] = product.category
+        ids[product.id] = None
+        self._search.add(product.id, f"{product.name} {product.description}")
+        if product.stock_quantity > 0:
+            self._in_stock.add(product.id)
+
+    def _unindex_attributes(self, product: Product) -> None:
+        key = self._category_key(product.category)
+        ids = self._by_category[key]
+        del ids[product.id]
+        if not ids:
+            del self._by_category[key]
+            del self._category_names[key]
+        self._search.remove(product.id)
+        self._in_stock.discard(product.id)
+
+    @property
+    def indexes_ready(self) -> bool:
+        """Whether queries by category, stock, text or price can be served"""
+        return self._indexed
+
+    def _ensure_indexed(self) -> None:
+        """Build the category, stock and search indexes of a snapshot-backed repository"""
+        if not self._indexed:
+            if self._indexing:
+                raise IndexesNotReady("Product indexes are still being built")
+            for stored in self._by_id.values():
+                self._index_attributes(self._decode(stored))
+            self._indexed = True
+
+    def build_indexes(self) -> None:
+        """
+        Build every lazy index now: category, stock, search and price.
+
+        Decodes every record of a snapshot-backed repository, which takes
+        seconds for a large one; services use begin_indexing() instead.
+        """
+        if self._indexed:
+            self._price_range(None, None)
+            return
+        # One pass over the records for all of them
+        pairs = []
+        for product_id, stored in self._by_id.items():
+            product = self._decode(stored)
+            self._index_attributes(product)
+            pairs.append((product.price, product_id))
+        self._indexed = True
+        if self._prices is None:
+            self._set_prices(pairs)
+
+    def begin_indexing(self) -> Callable[[], Optional["ProductRepository"]]:
+        """
+        Start building the indexes of a snapshot-backed repository off the event loop.
+
+        Returns a function to run in a thread. It only reads the snapshot,
+        indexing its products into a new repository, which it returns for
+        finish_indexing(). Meanwhile lookups by id, pages and writes carry
+        on, and queries that need the indexes raise IndexesNotReady.
+        """
+        snapshot = self._by_id.snapshot
+        self._indexing = True
+
+        def build() -> Optional["ProductRepository"]:
+            built = ProductRepository()
+            pairs = []
+            for position in range(len(snapshot)):
+                if not self._indexing:
+                    # Abandoned by finish_indexing(None)
+                    return None
+                product = snapshot.record(position)
+                built._index_attributes(product)
+                pairs.append((product.price, product.id))
+            built._set_prices(pairs)
+            return built
+        return build
+
+    def finish_indexing(self, built: Optional["ProductRepository"]) -> None:
+        """
+        Install the indexes built by begin_indexing(), or give up on them if built is None.
+
+        Products written while they were built are re-indexed here.
+        """
+        self._indexing = False
+        snapshot = getattr(self._by_id, "snapshot", None)
+        if built is None or self._indexed or snapshot is None:
+            return
+        self._by_category = built._by_category
+        self._category_names = built._category_names
+        self._search = built._search
+        self._in_stock = built._in_stock
+        self._indexed = True
+        changed = self._by_id.changed_ids()
+        if len(changed) <= PRICE_INDEX_MERGE_ROWS:
+            self._prices, self._price_ids = built._prices, built._price_ids
+        for product_id in changed:
+            position = snapshot.position(product_id)
+            if position >= 0:
+                self._unindex(snapshot.record(position))
+            stored = self._by_id.get(product_id)
+            if stored is not None:
+                self._index(self._decode(stored))
+        if self._prices is None:
+            # Many writes: merge them into the price index in one pass, as upsert_many does
+            pairs = [(price, i) for price, i in zip(built._prices, built._price_ids) if i not in changed]
+            pairs.extend((self._by_id[i].price, i) for i in changed if i in self._by_id)
+            self._set_prices(pairs)
+
+    def _set_prices(self, pairs: List[Tuple[Decimal, int]]) -> None:
+        pairs.sort()
+        self._prices = [price for price, _ in pairs]
+        self._price_ids = [product_id for _, product_id in pairs]
+
+    def _price_position(self, price: Decimal, product_id: int) -> int:
+        """Index of (price, product_id) in the sorted price index"""
+        lo = bisect_left(self._prices, price)
+        hi = bisect_right(self._prices, price, lo)
+        return bisect_left(self._price_ids, product_id, lo, hi)
+
+    def _price_range(self, min_price: Optional[Decimal], max_price: Optional[Decimal]) -> Tuple[int, int]:
+        """Slice of the price index with min_price <= price <= max_price, building it if needed"""
+        if self._prices is None:
+            self._set_prices([(stored.price, product_id) for product_id, stored in self._by_id.items()])
+        lo = 0 if min_price is None else bisect_left(self._prices, min_price)
+        hi = len(self._prices) if max_price is None else bisect_right(self._prices, max_price)
+        return lo, max(lo, hi)
+
+    def _merge_ids(self, new_ids: List[int]) -> None:
+        """Add ids to the sorted id index, sorting only if they land out of order"""
+        if not new_ids:
+            return
+        in_order = (not self._ids or new_ids[0] > self._ids[-1]) and new_ids == sorted(new_ids)
+        self._ids.extend(new_ids)
+        if not in_order:
+            self._ids = sorted(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Product]:
+        return map(self._decode, self._by_id.values())
+
+    def get(self, product_id: int) -> Optional[Product]:
+        """Get a product by ID"""
+        stored = self._by_id.get(product_id)
+        return None if stored is None else self._decode(stored)
+
+    def get_many(self, ids: Iterable[int]) -> Tuple[List[Product], List[int]]:
+        """
+        Get products by ID in request order, each id once.
+
+        Returns the found products and the ids that do not exist.
+        """
+        found: List[Product] = []
+        missing: List[int] = []
+        for product_id in dict.fromkeys(ids):
+            stored = self._by_id.get(product_id)
+            if stored is None:
+                missing.append(product_id)
+            else:
+                found.append(self._decode(stored))
+        return found, missing
+
+    def next_id(self) -> int:
+        """Get the id after the highest stored id"""
+        return self._ids[-1] + 1 if self._ids else 1
+
+    def list(self) -> List[Product]:
+        """Get all products in insertion order"""
+        return list(map(self._decode, self._by_id.values()))
+
+    def page(self, after_id: Optional[int] = None,
+             limit: Optional[int] = None) -> Tuple[List[Product], bool]:
+        """
+        Get products ordered by id, starting after after_id.
+
+        Returns the page and whether more products follow it. Keying on id
+        rather than an offset keeps cursors stable across concurrent inserts.
+        """
+        start = 0 if after_id is None else bisect_right(self._ids, after_id)
+        end = len(self._ids) if limit is None else start + limit
+        ids = self._ids[start:end]
+        return [self._decode(self._by_id[i]) for i in ids], end < len(self._ids)
+
+    def list_by_category(self, category: str) -> List[Product]:
+        """Get all products in a category (case-insensitive)"""
+        self._ensure_indexed()
+        ids = self._by_category.get(self._category_key(category), {})
+        return [self._decode(self._by_id[product_id]) for product_id in ids]
+
+    def find(self, category: Optional[str] = None, min_price: Optional[Decimal] = None,
+             max_price: Optional[Decimal] = None, in_stock: Optional[bool] = None,
+             sort: str = "id", after_id: Optional[int] = None,
+             limit: Optional[int] = None) -> Tuple[List[Product], bool]:
+        """
+        Get products matching all the given filters, ordered by id or by price.
+
+        Candidates either come from walking the index of the sort key (ids,
+        or the price index) in order until the page is full, or from the
+        smallest of the category index, the price range and the in-stock set
+        and are then ordered, whichever is estimated to touch fewer products.
+        Either way the cost follows the number of matches rather than the
+        catalog size. after_id continues an id-ordered listing like page().
+        Returns the products and whether more matches follow them.
+        """
+        self._ensure_indexed()
+        by_id = self._by_id
+        in_stock_ids = self._in_stock
+        category_ids = None
+        if category is not None:
+            category_ids = self._by_category.get(self._category_key(category), {})
+        price_filter = min_price is not None or max_price is not None
+        if price_filter or sort == "price":
+            price_lo, price_hi = self._price_range(min_price, max_price)
+            price_ids = self._price_ids
+
+        # Fraction of the catalog each filter keeps, to estimate how far an ordered walk must go
+        total = max(1, len(by_id))
+        fractions = {}
+        if category_ids is not None:
+            fractions["category"] = len(category_ids) / total
+        if in_stock is not None:
+            fractions["stock"] = len(in_stock_ids) / total if in_stock else 1 - len(in_stock_ids) / total
+        if price_filter:
+            fractions["price"] = (price_hi - price_lo) / total
+
+        # Walk the index of the sort key in order, stopping once the page (plus one) is found
+        if sort == "price":
+            walk_size = price_hi - price_lo
+            ordered = (price_ids[i] for i in range(price_lo, price_hi))
+            walk_applies = {"price"}
+        else:
+            start = 0 if after_id is None else bisect_right(self._ids, after_id)
+            walk_size = len(self._ids) - start
+            ordered = (self._ids[i] for i in range(start, len(self._ids)))
+            walk_applies = {"after"}
+        walk_cost = walk_size
+        if limit is not None:
+            # Share of the walked entries expected to pass the other filters
+            selectivity = math.prod(f for name, f in fractions.items() if name not in walk_applies)
+            walk_cost = min(walk_size, (limit + 1) / max(selectivity, 1 / total))
+
+        # Or collect matches from the smallest index, then order them: (size, ids, filters applied)
+        unordered = []
+        if category_ids is not None and in_stock:
+            # Intersected in C (iterating the smaller side) only if chosen; sized by the smaller side
+            unordered.append((min(len(category_ids), len(in_stock_ids)), None, {"category", "stock"}))
+        elif category_ids is not None:
+            unordered.append((len(category_ids), category_ids, {"category"}))
+        elif in_stock:
+            unordered.append((len(in_stock_ids), in_stock_ids, {"stock"}))
+        if price_filter and sort != "price":
+            unordered.append((price_hi - price_lo, (price_ids[i] for i in range(price_lo, price_hi)), {"price"}))
+        collect_cost, collected, collect_applies = min(
+            unordered, key=lambda source: source[0], default=(None, None, None)
+        )
+
+        if not unordered or walk_cost <= collect_cost:
+            candidates, order, applied = ordered, sort, walk_applies
+        else:
+            candidates, order, applied = collected, None, collect_applies
+            if candidates is None:
+                candidates = category_ids.keys() & in_stock_ids
+
+        # Check each candidate only against the filters its source did not already apply
+        check_after = after_id is not None and "after" not in applied
+        check_category = category_ids is not None and "category" not in applied
+        check_stock = in_stock is not None and "stock" not in applied
+        check_price = price_filter and "price" not in applied
+
+        def matches(product_id: int) -> bool:
+            if check_after and product_id <= after_id:
+                return False
+            if check_category and product_id not in category_ids:
+                return False
+            if check_stock and (product_id in in_stock_ids) != in_stock:
+                return False
+            if check_price:
+                price = by_id[product_id].price
+                if (min_price is not None and price < min_price) or (max_price is not None and price > max_price):
+                    return False
+            return True
+
+        matched = filter(matches, candidates)
+        if order == sort:
+            # Already in the requested order: stop once the page (plus one) is found
+            found = list(islice(matched, None if limit is None else limit + 1))
+        else:
+            key = None if sort == "id" else (lambda product_id: (by_id[product_id].price, product_id))
+            found = sorted(matched, key=key) if limit is None else heapq.nsmallest(limit + 1, matched, key=key)
+        has_more = limit is not None and len(found) > limit
+        if has_more:
+            found = found[:limit]
+        return [self._decode(by_id[product_id]) for product_id in found], has_more
+
+    def search(self, query: str, limit: int, prefix: bool = True) -> List[Product]:
+        """Get the products best matching a text query (see SearchIndex.search)"""
+        self._ensure_indexed()
+        hits = self._search.search(query, limit, prefix)
+        return [self._decode(self._by_id[product_id]) for product_id, _ in hits]
+
+    def category_counts(self) -> Dict[str, int]:
+        """Get the number of products per category"""
+        self._ensure_indexed()
+        return {
+            self._category_names[key]: len(ids)
+            for key, ids in self._by_category.items()
+        }
+
+    def clear(self) -> None:
+        """Remove all products"""
+        self._by_id.clear()
+        self._ids = []
+        self._by_category.clear()
+        self._category_names.clear()
+        self._search.clear()
+        self._in_stock.clear()
+        self._prices = self._price_ids = None
+        self._indexed = True
+        self.changes.reset()
+        self.version += 1
+
+    def add(self, product: Product) -> Product:
+        """Add a new product, enforcing a unique id"""
+        if product.id in self._by_id:
+            raise ValueError(f"Product with ID {product.id} already exists")
+        self._by_id[product.id] = self._encode(product)
+        if self._ids and product.id < self._ids[-1]:
+            insort(self._ids, product.id)
+        else:
+            self._ids.append(product.id)
+        self._index(product)
+        self.changes.record(product.id)
+        self.version += 1
+        return product
+
+    def upsert_many(self, products: List[Product]) -> int:
+        """
+        Insert or replace a batch of products, returning how many were new.
+
+        The sorted id index is rebuilt once per batch instead of per row, and
+        so is the price index for large batches.
+        """
+        merge_prices = self._prices is not None and len(products) > PRICE_INDEX_MERGE_ROWS
+        if merge_prices:
+            prices, price_ids = self._prices, self._price_ids
+            self._prices = self._price_ids = None
+        new_ids = []
+        for product in products:
+            existing = self._by_id.get(product.id)
+            if existing is None:
+                new_ids.append(product.id)
+            else:
+                self._unindex(existing)
+            self._by_id[product.id] = self._encode(product)
+            self._index(product)
+        self._merge_ids(new_ids)
+        if merge_prices:
+            changed = {product.id for product in products}
+            pairs = [(price, i) for price, i in zip(prices, price_ids) if i not in changed]
+            pairs.extend(sorted((product.price, product.id) for product in products))
+            # Two sorted runs: Timsort merges them in linear time
+            pairs.sort()
+            self._prices = [price for price, _ in pairs]
+            self._price_ids = [product_id for _, product_id in pairs]
+        self.changes.record_many(product.id for product in products)
+        self.version += 1
+        return len(new_ids)
+
+    def update(self, product: Product) -> Product:
+        """Replace an existing product and re-index its category"""
+        existing = self._by_id.get(product.id)
+        if existing is None:
+            raise KeyError(product.id)
+        self._unindex(existing)
+        self._by_id[product.id] = self._encode(product)
+        self._index(product)
+        self.changes.record(product.id)
+        self.version += 1
+        return product
+
+    def set_stock(self, product_id: int, stock_quantity: int) -> Product:
+        """Change a product's stock; only the in-stock index depends on it"""
+        existing = self._by_id.get(product_id)
+        if existing is None:
+            raise KeyError(product_id)
+        product = self._decode(existing).model_copy(update={"stock_quantity": stock_quantity})
+        self._by_id[product_id] = self._encode(product)
+        if self._indexed:
+            if stock_quantity > 0:
+                self._in_stock.add(product_id)
+            else:
+                self._in_stock.discard(product_id)
+        self.changes.record(product_id)
+        self.version += 1
+        return product
+
+    def delete(self, product_id: int) -> Optional[Product]:
+        """Remove a product, returning it if it existed"""
+        stored = self._by_id.pop(product_id, None)
+        if stored is None:
+            return None
+        del self._ids[bisect_left(self._ids, product_id)]
+        self._unindex(stored)
+        self.changes.record(product_id)
+        self.version += 1
+        return self._decode(stored)
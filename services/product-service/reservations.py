@@ -0,0 +1,199 @@
+"""
+Stock reservations for checkout
+
+A reservation takes stock from one or more products, all or nothing, and
+holds it until it is confirmed (the order went through, the stock stays
+taken), released (the checkout was abandoned) or it expires and the
+sweeper gives the stock back.
+
+Products map onto a fixed set of lock stripes. A reservation holds the
+stripes of its products, taken in stripe order so two batches can never
+deadlock, while it takes the stock in the database and applies the new
+levels to the repository. Checkouts of unrelated products therefore never
+wait on each other, even while their database writes are in flight.
+
+With a database, the stock check is the database's conditional decrement,
+not the worker's copy of the catalog, so several workers or replicas
+sharing it never oversell. Reservations live in the worker that created
+them, like the repository.
+"""
+import asyncio
+import heapq
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from repository import ProductRepository
+from shared.persistence import ConditionFailed
+
+logger = logging.getLogger("product-service")
+
+# Seconds a reservation holds stock unless the request asks for less or more
+DEFAULT_TTL = 600
+LOCK_STRIPES = 64
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id: int, requested: int, available: int):
+        super().__init__(f"Insufficient stock for product {product_id}: requested {requested}, available {available}")
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+class Reservation:
+    __slots__ = ("id", "items", "expires_at", "deadline")
+
+    def __init__(self, items: Dict[int, int], ttl: float):
+        self.id = uuid.uuid4().hex
+        # product id -> quantity
+        self.items = items
+        self.expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        # Monotonic clock, immune to wall-clock changes
+        self.deadline = time.monotonic() + ttl
+
+
+class ReservationManager:
+    """
+    Reserves, confirms and releases stock in a ProductRepository.
+
+    persist, if given, takes stock in the database: it is awaited with
+    {product id: quantity} (negative to give stock back), and returns the new
+    stock levels or raises ConditionFailed, changing nothing, if a product is
+    missing or short. Without it stock is checked against the repository.
+    """
+
+    def __init__(self, repository: ProductRepository,
+                 persist: Optional[Callable[[Dict[int, int]], Awaitable[Dict[int, int]]]] = None,
+                 stripes: int = LOCK_STRIPES, default_ttl: float = DEFAULT_TTL):
+        self.repository = repository
+        self.persist = persist
+        self.default_ttl = default_ttl
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+        self._reservations: Dict[str, Reservation] = {}
+        # (deadline, reservation id); entries for settled reservations are skipped when popped
+        self._expiry: List[Tuple[float, str]] = []
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._reservations)
+
+    def get(self, reservation_id: str) -> Optional[Reservation]:
+        return self._reservations.get(reservation_id)
+
+    @asynccontextmanager
+    async def locked(self, product_ids: Iterable[int]) -> AsyncIterator[None]:
+        """
+        Hold the lock stripes of the given products, acquired in stripe order.
+
+        Other writers of stock (bulk upserts) hold them too, so their writes
+        never interleave with a reservation's.
+        """
+        stripes = sorted({product_id % len(self._locks) for product_id in product_ids})
+        acquired = []
+        try:
+            for stripe in stripes:
+                await self._locks[stripe].acquire()
+                acquired.append(self._locks[stripe])
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    async def _take(self, amounts: Dict[int, int]) -> None:
+        """Take amounts[id] of each product's stock, all or nothing; negative amounts give it back"""
+        if self.persist is None:
+            levels = {}
+            for product_id, amount in amounts.items():
+                stock = self.repository.get(product_id).stock_quantity
+                if stock < amount:
+                    raise InsufficientStock(product_id, amount, stock)
+                levels[product_id] = stock - amount
+        else:
+            try:
+                levels = await self.persist(amounts)
+            except ConditionFailed as e:
+                if e.current is None:
+                    raise KeyError(e.key)
+                # Another worker or replica took it; catch up with the stored level
+                self.repository.set_stock(e.key, e.current)
+                raise InsufficientStock(e.key, amounts[e.key], e.current)
+        for product_id, stock in levels.items():
+            self.repository.set_stock(product_id, stock)
+
+    async def reserve(self, items: Dict[int, int], ttl: Optional[float] = None) -> Reservation:
+        """
+        Take stock for every item or none of them.
+
+        Raises KeyError for an unknown product and InsufficientStock if any
+        product has less stock than requested.
+        """
+        async with self.locked(items):
+            for product_id in items:
+                if self.repository.get(product_id) is None:
+                    raise KeyError(product_id)
+            await self._take(items)
+        reservation = Reservation(dict(items), self.default_ttl if ttl is None else ttl)
+        self._reservations[reservation.id] = reservation
+        heapq.heappush(self._expiry, (reservation.deadline, reservation.id))
+        return reservation
+
+    def confirm(self, reservation_id: str) -> Reservation:
+        """Make a reservation's stock change permanent; raises KeyError if unknown or expired"""
+        reservation = self._reservations.get(reservation_id)
+        if reservation is None or reservation.deadline <= time.monotonic():
+            # Past its deadline the stock belongs to the sweeper, which will return it
+            raise KeyError(reservation_id)
+        return self._reservations.pop(reservation_id)
+
+    async def release(self, reservation_id: str) -> Reservation:
+        """Return a reservation's stock; raises KeyError if unknown or expired"""
+        reservation = self._reservations.pop(reservation_id)
+        await self._restore(reservation)
+        return reservation
+
+    async def _restore(self, reservation: Reservation) -> None:
+        try:
+            await self._return_stock(reservation)
+        except BaseException:
+            # Keep holding it so a later release or sweep can retry
+            self._reservations[reservation.id] = reservation
+            heapq.heappush(self._expiry, (reservation.deadline, reservation.id))
+            raise
+
+    async def _return_stock(self, reservation: Reservation) -> None:
+        async with self.locked(reservation.items):
+            # A product deleted since it was reserved has no stock to return
+            await self._take({
+                product_id: -quantity for product_id, quantity in reservation.items.items()
+                if self.repository.get(product_id) is not None
+            })
+
+    async def expire(self, now: Optional[float] = None) -> int:
+        """Release every reservation past its deadline, returning how many were released"""
+        now = time.monotonic() if now is None else now
+        released = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, reservation_id = heapq.heappop(self._expiry)
+            reservation = self._reservations.pop(reservation_id, None)
+            if reservation is None:
+                continue
+            await self._restore(reservation)
+            released += 1
+        self.expired += released
+        return released
+
+    async def sweep(self, interval: float) -> None:
+        """Expire reservations every interval seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                released = await self.expire()
+            except Exception:
+                logger.exception("Reservation sweep failed")
+                continue
+            if released:
+                logger.info("Released %d expired reservations", released)
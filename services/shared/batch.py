@@ -0,0 +1,39 @@
+"""
+Shared helpers for batch multi-get endpoints
+
+Ids come from `?ids=1,2,3` or, for large sets, a POST body of
+`{"ids": [...]}`. Results keep the request order and list ids that were not
+found instead of failing the whole call.
+"""
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, Field
+
+from shared.responses import ORJSONResponse
+
+MAX_BATCH_IDS = 1000
+
+
+class BatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+
+def parse_ids(ids: str) -> List[int]:
+    """Parse a comma-separated id list"""
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise ValueError("Invalid ids: expected comma-separated integers")
+    if not parsed:
+        raise ValueError("Invalid ids: no ids given")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise ValueError(f"Too many ids: at most {MAX_BATCH_IDS} per request")
+    return parsed
+
+
+def batch_response(get_many: Callable[[Iterable[int]], Tuple[List[BaseModel], List[int]]],
+                   ids: List[int], fields: Optional[Set[str]] = None) -> ORJSONResponse:
+    """Resolve ids in one pass and render {"items": [...], "missing": [...]}"""
+    items, missing = get_many(ids)
+    content: List[Any] = items if fields is None else [item.model_dump(include=fields) for item in items]
+    return ORJSONResponse({"items": content, "missing": missing})
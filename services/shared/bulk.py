@@ -0,0 +1,98 @@
+"""
+Shared helpers for bulk create/upsert endpoints
+"""
+import json
+from typing import Any, Dict, List, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+MAX_BULK_ROWS = 10000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class BulkRowError(BaseModel):
+    index: int
+    message: str
+
+
+class BulkResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[BulkRowError] = []
+
+
+def _format_error(error: Dict[str, Any]) -> str:
+    # loc[0] is the row index; the rest is the field path within the row
+    field = ".".join(str(part) for part in error["loc"][1:])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+
+async def read_bulk_rows(request: Request) -> Tuple[List[Any], Dict[int, str]]:
+    """
+    Decode a bulk request body into raw rows.
+
+    Accepts a JSON array, or one JSON object per line when the content type
+    is application/x-ndjson. Returns the rows and any per-row decode errors.
+    """
+    body = await request.body()
+    errors: Dict[int, str] = {}
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                errors[len(rows)] = "Invalid JSON"
+                rows.append(None)
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(
+            status_code=413, detail=f"Bulk requests are limited to {MAX_BULK_ROWS} rows"
+        )
+    return rows, errors
+
+
+def validate_bulk_rows(adapter: TypeAdapter, rows: List[Any],
+                       errors: Dict[int, str]) -> List[Tuple[int, Any]]:
+    """
+    Validate rows with a list TypeAdapter in one batched pass.
+
+    Rows that fail are recorded in errors (keyed by row index) and the rest
+    are validated again without them, so one bad row never costs a per-row
+    validation of the whole batch. Returns (row index, model) pairs.
+    """
+    indices = [i for i in range(len(rows)) if i not in errors]
+    try:
+        items = adapter.validate_python([rows[i] for i in indices])
+    except ValidationError as e:
+        for error in e.errors():
+            index = indices[error["loc"][0]]
+            errors[index] = "; ".join(filter(None, [errors.get(index), _format_error(error)]))
+        indices = [i for i in indices if i not in errors]
+        items = adapter.validate_python([rows[i] for i in indices])
+    return list(zip(indices, items))
+
+
+def bulk_errors(errors: Dict[int, str]) -> List[BulkRowError]:
+    """Convert row errors to response models ordered by row index"""
+    return [BulkRowError(index=index, message=message) for index, message in sorted(errors.items())]
+
+
+def reject_bulk_errors(errors: Dict[int, str]) -> None:
+    """Abort an all-or-nothing bulk request if any row failed"""
+    if errors:
+        raise HTTPException(
+            status_code=422,
+            detail=[error.model_dump() for error in bulk_errors(errors)]
+        )
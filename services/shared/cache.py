@@ -0,0 +1,97 @@
+"""
+Pre-serialized response cache with ETag / If-None-Match support
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+
+# Headers from the built response that are replayed on cache hits
+CACHED_HEADERS = ("x-next-cursor",)
+
+
+class CacheEntry(NamedTuple):
+    version: int
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class ResponseCache:
+    """
+    LRU cache of encoded JSON bodies keyed by path and query string.
+
+    Entries are tagged with the data version they were built from; any write
+    bumps the version, so stale entries are rebuilt on their next lookup.
+    When cache_control is set it is sent on every response served, so
+    downstream caches (the gateway, browsers) can store and revalidate them.
+    """
+
+    def __init__(self, max_entries: int = 1024, cache_control: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_control = cache_control
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Tuple[str, str], version: int) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key: Tuple[str, str], entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def respond(self, request: Request, version: int,
+                build: Callable[[], Response]) -> Response:
+        """
+        Serve a cached response for the request, building it on a miss.
+
+        Returns 304 Not Modified with no body when If-None-Match matches.
+        """
+        key = (request.url.path, request.url.query)
+        entry = self._lookup(key, version)
+        if entry is None:
+            response = build()
+            body = bytes(response.body)
+            headers = {
+                name: response.headers[name]
+                for name in CACHED_HEADERS if name in response.headers
+            }
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            entry = CacheEntry(version, body, etag, headers)
+            self._store(key, entry)
+
+        headers = {"ETag": entry.etag, **entry.headers}
+        if self.cache_control:
+            headers["Cache-Control"] = self.cache_control
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
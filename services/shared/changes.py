@@ -0,0 +1,276 @@
+"""
+Change feed: a compacted, bounded log of record mutations
+
+Repositories record the id of every record they write or delete. Each
+change gets the next sequence number, so consumers can ask for everything
+after the last position they saw, and the feed serves the current state
+of each changed record (or a delete if it is gone).
+
+Compaction: only a record's latest change is kept; older changes to the
+same record are dropped, so a consumer catching up sees each changed
+record once. Retention: the log keeps the latest changes of at most
+`retention` records (twice that between compactions). Changes pushed out
+by retention, a clear() of the repository or a restart move the log's
+floor; a consumer whose position is below the floor gets ChangesExpired
+and must resync from a full read (the export) before polling again.
+
+Positions handed to consumers are opaque tokens of the log's epoch (a
+random id drawn when the log is created) and a sequence number. Each
+worker, replica and restart has its own log, so a position is only served
+by the log that issued it; one from any other log (or a malformed one)
+gets ChangesExpired rather than a silently wrong window. Reads bisect to
+the requested position and walk forward, so a poll costs about the number
+of changes it returns, not the size of the catalog.
+"""
+import asyncio
+import base64
+import binascii
+import secrets
+from array import array
+from bisect import bisect_right
+from itertools import compress
+from operator import eq
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Literal, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from shared.responses import dumps
+
+CHANGE_RETENTION = 100_000
+# Entries the log may hold before the first compaction
+MIN_COMPACTION = 1024
+SSE_MEDIA_TYPE = "text/event-stream"
+# Changes encoded per read of the log while streaming
+SSE_BATCH = 1000
+# Seconds between keep-alive comments on an idle event stream
+SSE_HEARTBEAT = 15.0
+
+
+class ChangesExpired(Exception):
+    def __init__(self, since: str, floor: str):
+        super().__init__(f"Changes after {since} are not retained here; resync and poll from {floor} or later")
+        self.since = since
+        self.floor = floor
+
+
+class Change(BaseModel):
+    seq: int
+    op: Literal["upsert", "delete"]
+    id: int
+    # Current record for upserts, null for deletes
+    data: Optional[Dict[str, Any]] = None
+
+
+class ChangePage(BaseModel):
+    items: List[Change]
+    # Position to pass as since on the next poll
+    next: str
+    has_more: bool
+
+
+class ChangeLog:
+    """Sequence-numbered ids of changed records, compacted to one entry per record"""
+
+    def __init__(self, retention: int = CHANGE_RETENTION):
+        self.retention = retention
+        # Identifies this log in the positions it hands out
+        self.epoch = secrets.token_hex(8)
+        # Last sequence number assigned; reads need since >= floor
+        self.seq = self.floor = 0
+        # Parallel, seq-ordered arrays; an entry is live when it is its id's latest change
+        self._seqs = array("q")
+        self._ids = array("q")
+        self._latest: Dict[int, int] = {}
+        self._next_compaction = MIN_COMPACTION
+        self._waiters: List[asyncio.Future] = []
+
+    def __len__(self) -> int:
+        """Records with a retained change"""
+        return len(self._latest)
+
+    @property
+    def head(self) -> str:
+        """Position of the latest change"""
+        return self.position(self.seq)
+
+    def position(self, seq: int) -> str:
+        """Encode a sequence number of this log as an opaque position"""
+        return base64.urlsafe_b64encode(f"{self.epoch}:{seq}".encode()).decode().rstrip("=")
+
+    def parse(self, position: str) -> int:
+        """
+        Decode a position back into a sequence number of this log.
+
+        Raises ChangesExpired if the position was issued by another log (a
+        different worker, replica or run) or is not a position at all.
+        """
+        try:
+            padded = position + "=" * (-len(position) % 4)
+            epoch, _, seq = base64.urlsafe_b64decode(padded).decode().partition(":")
+            if epoch == self.epoch:
+                return int(seq)
+        except (ValueError, binascii.Error, UnicodeDecodeError):
+            pass
+        raise ChangesExpired(position, self.position(self.floor))
+
+    def record(self, record_id: int) -> None:
+        """Log a change to one record"""
+        self.seq += 1
+        self._seqs.append(self.seq)
+        self._ids.append(record_id)
+        self._latest[record_id] = self.seq
+        self._appended()
+
+    def record_many(self, record_ids: Iterable[int]) -> None:
+        """Log a change to each record, in order"""
+        record_ids = array("q", record_ids)
+        seqs = range(self.seq + 1, self.seq + 1 + len(record_ids))
+        self._seqs.extend(seqs)
+        self._ids.extend(record_ids)
+        self._latest.update(zip(record_ids, seqs))
+        self.seq += len(record_ids)
+        self._appended()
+
+    def _appended(self) -> None:
+        if len(self._seqs) >= self._next_compaction:
+            self._compact()
+        self._notify()
+
+    def reset(self) -> None:
+        """Forget every change (the repository was cleared); all consumers must resync"""
+        self.seq += 1
+        self.floor = self.seq
+        self._seqs = array("q")
+        self._ids = array("q")
+        self._latest.clear()
+        self._next_compaction = MIN_COMPACTION
+        self._notify()
+
+    def _compact(self) -> None:
+        """Drop superseded entries, then the oldest records beyond retention"""
+        live = list(map(eq, map(self._latest.__getitem__, self._ids), self._seqs))
+        self._seqs = array("q", compress(self._seqs, live))
+        self._ids = array("q", compress(self._ids, live))
+        excess = len(self._seqs) - self.retention
+        if excess > 0:
+            for record_id in self._ids[:excess]:
+                del self._latest[record_id]
+            self.floor = self._seqs[excess - 1]
+            del self._seqs[:excess]
+            del self._ids[:excess]
+        self._next_compaction = max(2 * len(self._seqs), MIN_COMPACTION)
+
+    def check(self, since: int) -> None:
+        """Raise ChangesExpired unless the log holds every change after since"""
+        if since < self.floor or since > self.seq:
+            raise ChangesExpired(self.position(since), self.position(self.floor))
+
+    def read(self, since: int, limit: int) -> Tuple[List[Tuple[int, int]], int, bool]:
+        """
+        Get up to limit (seq, record id) changes after since, oldest first.
+
+        Returns the changes, the position to read from next and whether
+        more changes follow. Raises ChangesExpired if since is below the
+        floor or ahead of the log.
+        """
+        self.check(since)
+        seqs, ids, latest = self._seqs, self._ids, self._latest
+        start = position = bisect_right(seqs, since)
+        changes = []
+        while position < len(seqs) and len(changes) < limit:
+            seq, record_id = seqs[position], ids[position]
+            if latest[record_id] == seq:
+                changes.append((seq, record_id))
+            position += 1
+        next_since = seqs[position - 1] if position > start else since
+        return changes, next_since, position < len(seqs)
+
+    def _notify(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """Wait up to timeout seconds for a change after since; returns whether one arrived"""
+        if self.seq > since:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.seq > since
+
+
+# Current state of a record by id, None once deleted
+Lookup = Callable[[int], Optional[BaseModel]]
+
+
+def change_items(changes: List[Tuple[int, int]], lookup: Lookup) -> List[Dict[str, Any]]:
+    """Pair each change with its record's current state, as Change-shaped dicts"""
+    items = []
+    for seq, record_id in changes:
+        record = lookup(record_id)
+        items.append({"seq": seq, "op": "delete" if record is None else "upsert", "id": record_id, "data": record})
+    return items
+
+
+def change_page(log: ChangeLog, since: Optional[str], limit: int, lookup: Lookup) -> Dict[str, Any]:
+    """
+    Get the changes after since as a ChangePage-shaped dict of current records.
+
+    Plain dicts rather than models keep encoding cost per change low.
+    Without since the page is empty and next is the log's head, the
+    position to poll from after a full read.
+    """
+    if since is None:
+        return {"items": [], "next": log.head, "has_more": False}
+    changes, next_since, has_more = log.read(log.parse(since), limit)
+    return {"items": change_items(changes, lookup), "next": log.position(next_since), "has_more": has_more}
+
+
+async def change_events(log: ChangeLog, since: int, lookup: Lookup, limit: int = SSE_BATCH,
+                        heartbeat: float = SSE_HEARTBEAT) -> AsyncIterator[bytes]:
+    """
+    Encode changes after since as Server-Sent Events, following the log.
+
+    Each change is an "upsert" or "delete" event whose id is its position
+    (so EventSource reconnects resume via Last-Event-ID) and whose
+    data is the Change as JSON. Idle streams get a comment every heartbeat
+    seconds. A consumer that falls behind the floor gets a final "reset"
+    event and must resync.
+    """
+    while True:
+        try:
+            changes, since, has_more = log.read(since, limit)
+        except ChangesExpired as e:
+            yield b"event: reset\ndata: %s\n\n" % dumps({"detail": str(e), "floor": e.floor})
+            return
+        if changes:
+            yield b"".join(
+                b"id: %s\nevent: %s\ndata: %s\n\n" % (
+                    log.position(change["seq"]).encode(), change["op"].encode(), dumps(change)
+                )
+                for change in change_items(changes, lookup)
+            )
+        if not has_more and not await log.wait(since, heartbeat):
+            yield b": keep-alive\n\n"
+
+
+def change_stream(log: ChangeLog, since: Optional[str], lookup: Lookup) -> StreamingResponse:
+    """
+    Stream changes after since (the head if None) as text/event-stream.
+
+    Raises ChangesExpired before the response starts if since is not
+    served, so handlers can answer 410.
+    """
+    since = log.seq if since is None else log.parse(since)
+    log.check(since)
+    return StreamingResponse(
+        change_events(log, since, lookup),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
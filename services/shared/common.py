@@ -1,35 +1,114 @@
 """
 Shared utilities for all microservices
 """
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
 from datetime import datetime
-from typing import Dict, Any
-
-def setup_logging(service_name: str, level: str = "INFO") -> logging.Logger:
-    """Setup logging configuration for a service"""
-    logging.basicConfig(
-        level=getattr(logging, level.upper()),
-        format=f'%(asctime)s - {service_name} - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional
+
+from shared.responses import dumps
+
+# Background listener writing queued log records to stdout (one per process)
+_log_listener: Optional[QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    def __init__(self, service_name: str):
+        super().__init__()
+        self.service_name = service_name
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record),
+            "service": self.service_name,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+class SampledLogger:
+    """
+    Emit only one in every `every` calls, for high-frequency INFO lines.
+
+    The check happens before a LogRecord is created, so skipped calls cost
+    a counter increment. The counter is not locked; under threads the
+    sampling rate is approximate.
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = 1):
+        self.logger = logger
+        self.every = max(1, every)
+        self._count = 0
+
+    def info(self, msg: str, *args: Any) -> None:
+        self._count += 1
+        if self._count % self.every == 0 and self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(msg, *args)
+
+def setup_logging(service_name: str, level: Optional[str] = None,
+                  json_format: Optional[bool] = None) -> logging.Logger:
+    """
+    Setup non-blocking logging for a service.
+
+    Records are put on an in-memory queue by the calling thread and written
+    to stdout by a background QueueListener, so slow stdout never stalls
+    request handling. Level and format default to the LOG_LEVEL and
+    LOG_FORMAT (text or json) environment variables.
+    """
+    global _log_listener
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+
+    if _log_listener is None:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        if json_format:
+            stream_handler.setFormatter(JsonFormatter(service_name))
+        else:
+            stream_handler.setFormatter(logging.Formatter(
+                f'%(asctime)s - {service_name} - %(levelname)s - %(message)s'
+            ))
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        # Only merge args into the message here; the listener applies the real format
+        queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        _log_listener = QueueListener(log_queue, stream_handler)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+        logging.basicConfig(
+            level=getattr(logging, level.upper()),
+            handlers=[queue_handler]
+        )
     return logging.getLogger(service_name)
 
-def create_health_response(service_name: str, additional_info: Dict[str, Any] = None) -> Dict[str, Any]:
-    """Create a standardized health check response"""
+def create_sampled_logger(logger: logging.Logger) -> SampledLogger:
+    """Create a sampled logger using the LOG_SAMPLE_EVERY environment variable (default 1, no sampling)"""
+    return SampledLogger(logger, int(os.getenv("LOG_SAMPLE_EVERY", 1)))
+
+def create_health_response(service_name: str, additional_info: Dict[str, Any] = None,
+                           status: str = "healthy", include_timestamp: bool = True) -> bytes:
+    """Create a standardized health check response, pre-serialized as JSON bytes"""
     response = {
-        "status": "healthy",
+        "status": status,
         "service": service_name,
-        "timestamp": datetime.now().isoformat(),
         "version": "1.0.0"
     }
+    if include_timestamp:
+        response["timestamp"] = datetime.now().isoformat()
     
     if additional_info:
         response.update(additional_info)
     
-    return response
+    return dumps(response)
 
 def create_error_response(message: str, error_code: str = None) -> Dict[str, Any]:
     """Create a standardized error response"""
@@ -0,0 +1,60 @@
+"""
+Liveness and readiness probes for FastAPI services
+
+Liveness answers from bytes encoded once at startup, with no logging or
+allocation beyond the response object. Readiness runs a service-provided
+check (database ping, pool state, record counts) and caches the encoded
+result for a short TTL so frequent probes from Docker, Envoy and the
+orchestrator do not each hit the backing store.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Response
+
+from shared.common import create_health_response
+
+HEALTH_MEDIA_TYPE = "application/json"
+
+# Returns extra readiness details; raise to report not ready
+ReadyCheck = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class HealthProbes:
+    """Live/ready probe responses for one service"""
+
+    def __init__(self, service_name: str, ready_check: Optional[ReadyCheck] = None,
+                 ready_ttl: Optional[float] = None):
+        self.service_name = service_name
+        self.ready_check = ready_check
+        self.ready_ttl = float(os.getenv("HEALTH_READY_TTL", 2.0)) if ready_ttl is None else ready_ttl
+        self.live_body = create_health_response(service_name, include_timestamp=False)
+        self._ready: Optional[Tuple[float, int, bytes]] = None
+        self._ready_lock = asyncio.Lock()
+
+    def live(self) -> Response:
+        """Liveness: the process is up and serving requests"""
+        return Response(content=self.live_body, media_type=HEALTH_MEDIA_TYPE)
+
+    async def _check_ready(self) -> Tuple[int, bytes]:
+        try:
+            details = await self.ready_check() if self.ready_check else {}
+        except Exception as e:
+            return 503, create_health_response(
+                self.service_name, {"error": str(e) or type(e).__name__}, status="unhealthy"
+            )
+        return 200, create_health_response(self.service_name, details)
+
+    async def ready(self) -> Response:
+        """Readiness: dependencies are reachable; result cached for ready_ttl seconds"""
+        cached = self._ready
+        if cached is None or cached[0] <= time.monotonic():
+            async with self._ready_lock:
+                cached = self._ready
+                # Another probe may have refreshed it while we waited
+                if cached is None or cached[0] <= time.monotonic():
+                    status_code, body = await self._check_ready()
+                    cached = self._ready = (time.monotonic() + self.ready_ttl, status_code, body)
+        return Response(content=cached[2], status_code=cached[1], media_type=HEALTH_MEDIA_TYPE)
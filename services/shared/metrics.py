@@ -0,0 +1,158 @@
+"""
+Prometheus-style request metrics for FastAPI services
+
+MetricsMiddleware is a plain ASGI middleware that records, per route
+template (e.g. /products/{product_id} rather than the raw path):
+request counts by status, latency and response size histograms, plus an
+in-flight gauge. Handlers run on the event loop, so recording needs no
+locks; each uvicorn worker keeps and exposes its own counters.
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+from fastapi import FastAPI
+
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DEFAULT_SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+# Label used for requests that matched no route, to keep label cardinality bounded
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts are per bucket and made cumulative on render"""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+class MetricsRegistry:
+    """Per-worker request metrics rendered in the Prometheus text format"""
+
+    def __init__(self, service_name: str,
+                 latency_buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+                 size_buckets: Tuple[float, ...] = DEFAULT_SIZE_BUCKETS):
+        self.service_name = service_name
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.response_size: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe(self, method: str, route: str, status: int, duration: float, size: int) -> None:
+        """Record one completed request"""
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        route_key = (method, route)
+        latency = self.latency.get(route_key)
+        if latency is None:
+            latency = self.latency[route_key] = Histogram(self.latency_buckets)
+            self.response_size[route_key] = Histogram(self.size_buckets)
+        latency.observe(duration)
+        self.response_size[route_key].observe(size)
+
+    def _render_histogram(self, lines, name: str, histograms: Dict[Tuple[str, str], Histogram]) -> None:
+        for (method, route), histogram in sorted(histograms.items()):
+            labels = f'service="{self.service_name}",method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+    def render(self) -> bytes:
+        """Render all metrics in the Prometheus text exposition format"""
+        service = f'service="{self.service_name}"'
+        lines = [
+            "# HELP http_requests_total Total HTTP requests by route template and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(
+                f'http_requests_total{{{service},method="{method}",'
+                f'route="{_escape(route)}",status="{status}"}} {count}'
+            )
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight{{{service}}} {self.in_flight}",
+            "# HELP http_request_duration_seconds Request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        self._render_histogram(lines, "http_request_duration_seconds", self.latency)
+        lines += [
+            "# HELP http_response_size_bytes Response body size by route template.",
+            "# TYPE http_response_size_bytes histogram",
+        ]
+        self._render_histogram(lines, "http_response_size_bytes", self.response_size)
+        return ("\n".join(lines) + "\n").encode()
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding a MetricsRegistry"""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            registry.in_flight -= 1
+            # The router stores the matched route in the shared scope dict
+            route = scope.get("route")
+            registry.observe(
+                scope["method"],
+                route.path if route is not None else UNMATCHED_ROUTE,
+                status,
+                duration,
+                size
+            )
+
+
+def setup_metrics(app: FastAPI, service_name: str) -> MetricsRegistry:
+    """Attach request metrics to an app and return the registry to expose"""
+    registry = MetricsRegistry(service_name)
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    return registry
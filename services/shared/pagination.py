@@ -0,0 +1,56 @@
+"""
+Keyset (cursor) pagination and field projection helpers
+"""
+import base64
+import binascii
+from typing import Any, Iterable, List, Optional, Set
+
+from pydantic import BaseModel
+
+from shared.responses import ORJSONResponse
+
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last id of a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor back into the id it points after"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded).decode().partition(":")
+        if prefix != "id":
+            raise ValueError
+        return int(value)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Set[str]]:
+    """Parse a comma-separated field projection, rejecting unknown fields"""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+
+def page_response(items: List[BaseModel], limit: Optional[int], has_more: bool,
+                  fields: Optional[Set[str]] = None) -> ORJSONResponse:
+    """
+    Build a JSON list response for a page of already-validated models.
+
+    The cursor for the next page (if any) is returned in the X-Next-Cursor header
+    so the body stays a plain list for existing clients.
+    """
+    content: List[Any] = [item.model_dump(include=fields) for item in items]
+    headers = {}
+    if limit is not None and has_more and items:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
+    return ORJSONResponse(content=content, headers=headers)
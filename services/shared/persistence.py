@@ -0,0 +1,424 @@
+"""
+Pluggable async persistence backends with bounded connection pools
+
+The services keep serving reads from their in-memory indexed repositories;
+a backend is the durable store behind them. On startup the repository is
+loaded from the backend, and writes go to the backend before the repository
+is updated. Selected with DATABASE_URL:
+
+    (unset)                      in-memory only (mock data)
+    sqlite:///path/to/file.db    SQLite via aiosqlite
+    postgresql://user:pw@host/db Postgres via asyncpg
+
+Each table has a data version in data_versions, bumped by every write made
+through a backend in the same transaction, so a copy of the table (such as
+a snapshot) can tell whether the database has changed since it was taken.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel
+
+# table_name -> count of write transactions, see Backend.data_version
+VERSIONS_TABLE = "data_versions"
+
+
+class Column(NamedTuple):
+    name: str
+    type: str  # INTEGER, TEXT, DECIMAL or TIMESTAMP
+    nullable: bool = False
+
+
+class ConditionFailed(Exception):
+    """A conditional update found its row missing (current is None) or failing the condition"""
+
+    def __init__(self, key: Any, current: Any):
+        super().__init__(f"Condition failed for {key} (current value {current})")
+        self.key = key
+        self.current = current
+
+
+class Table(NamedTuple):
+    """Mapping between a Pydantic model and a table; the first column is the primary key"""
+    name: str
+    model: Type[BaseModel]
+    columns: Tuple[Column, ...]
+    # (column, unique) pairs
+    indexes: Tuple[Tuple[str, bool], ...] = ()
+
+    @property
+    def column_names(self) -> Tuple[str, ...]:
+        return tuple(column.name for column in self.columns)
+
+    def to_row(self, obj: BaseModel) -> Tuple[Any, ...]:
+        return tuple(getattr(obj, name) for name in self.column_names)
+
+    def from_row(self, row: Sequence[Any]) -> BaseModel:
+        return self.model(**dict(zip(self.column_names, row)))
+
+
+class Backend(ABC):
+    """Interface shared by all persistence backends"""
+
+    # Generic column type -> dialect column type
+    TYPES: Dict[str, str] = {}
+
+    def __init__(self, pool_size: int):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.pool_size = pool_size
+        self._statements: Dict[Tuple[str, str], str] = {}
+
+    @abstractmethod
+    def _param(self, index: int) -> str:
+        """Placeholder for the index-th (1-based) statement parameter"""
+
+    def _statement(self, table: Table, kind: str) -> str:
+        """Build (once) the SQL text for a statement so the driver can reuse its prepared form"""
+        key = (table.name, kind)
+        sql = self._statements.get(key)
+        if sql is None:
+            sql = self._statements[key] = self._build_statement(table, kind)
+        return sql
+
+    def _build_statement(self, table: Table, kind: str) -> str:
+        names = table.column_names
+        pk = names[0]
+        # "take <column>" and "get <column>" name the column they work on
+        kind, _, column = kind.partition(" ")
+        if kind == "add_version":
+            return (
+                f"INSERT INTO {VERSIONS_TABLE} (table_name, version) VALUES ({self._param(1)}, 0) "
+                f"ON CONFLICT (table_name) DO NOTHING"
+            )
+        if kind == "bump_version":
+            return f"UPDATE {VERSIONS_TABLE} SET version = version + 1 WHERE table_name = {self._param(1)}"
+        if kind == "version":
+            return f"SELECT version FROM {VERSIONS_TABLE} WHERE table_name = {self._param(1)}"
+        if kind == "select_all":
+            return f"SELECT {', '.join(names)} FROM {table.name} ORDER BY {pk}"
+        if kind == "upsert":
+            params = ", ".join(self._param(i + 1) for i in range(len(names)))
+            updates = ", ".join(f"{name} = excluded.{name}" for name in names[1:])
+            return (
+                f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({params}) "
+                f"ON CONFLICT ({pk}) DO UPDATE SET {updates}"
+            )
+        if kind == "take":
+            # Parameters: amount, key, amount
+            return (
+                f"UPDATE {table.name} SET {column} = {column} - {self._param(1)} "
+                f"WHERE {pk} = {self._param(2)} AND {column} >= {self._param(3)} RETURNING {column}"
+            )
+        if kind == "get":
+            return f"SELECT {column} FROM {table.name} WHERE {pk} = {self._param(1)}"
+        raise ValueError(f"Unknown statement kind: {kind}")
+
+    def _schema(self, table: Table) -> List[str]:
+        """DDL for the table and its secondary indexes"""
+        columns = []
+        for i, column in enumerate(table.columns):
+            definition = f"{column.name} {self.TYPES[column.type]}"
+            if i == 0:
+                definition += " PRIMARY KEY"
+            elif not column.nullable:
+                definition += " NOT NULL"
+            columns.append(definition)
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {table.name} ({', '.join(columns)})",
+            f"CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} "
+            f"(table_name TEXT PRIMARY KEY, version {self.TYPES['INTEGER']} NOT NULL)",
+        ]
+        for column, unique in table.indexes:
+            statements.append(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS "
+                f"ix_{table.name}_{column} ON {table.name} ({column})"
+            )
+        return statements
+
+    @abstractmethod
+    async def connect(self) -> None:
+        """Open the connection pool"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Close every pooled connection"""
+
+    @abstractmethod
+    async def ping(self) -> Dict[str, Any]:
+        """Run a trivial query and report pool state; raises if the database is unreachable"""
+
+    @abstractmethod
+    async def ensure_table(self, table: Table) -> None:
+        """Create the table, its indexes and its data version if they do not exist"""
+
+    @abstractmethod
+    async def data_version(self, table: Table) -> int:
+        """
+        The table's data version: it changes whenever a write through a backend commits.
+
+        Read it before reading the rows; if it is unchanged later, so are they.
+        """
+
+    @abstractmethod
+    async def fetch_all(self, table: Table) -> List[BaseModel]:
+        """Get all rows ordered by primary key"""
+
+    @abstractmethod
+    async def upsert_many(self, table: Table, objs: Iterable[BaseModel]) -> None:
+        """Insert or update rows in a single transaction"""
+
+    @abstractmethod
+    async def take_many(self, table: Table, column: str, amounts: Dict[Any, int]) -> Dict[Any, int]:
+        """
+        Subtract amounts[key] from column in each keyed row, in a single transaction.
+
+        The decrement is conditional in the database, so concurrent writers
+        from other processes cannot take a value below zero; a negative
+        amount adds. Returns the new values, or raises ConditionFailed and
+        changes nothing if a row is missing or holds less than its amount.
+        """
+
+
+class SQLiteBackend(Backend):
+    """SQLite backend using a bounded pool of aiosqlite connections"""
+
+    TYPES = {"INTEGER": "INTEGER", "TEXT": "TEXT", "DECIMAL": "TEXT", "TIMESTAMP": "TEXT"}
+
+    def __init__(self, path: str, pool_size: int = 5, acquire_timeout: float = 10.0):
+        super().__init__(pool_size)
+        self.path = path
+        self.acquire_timeout = acquire_timeout
+        self._pool: Optional[asyncio.Queue] = None
+        self._connections: List[Any] = []
+        self.in_use = 0
+        self.max_in_use = 0
+
+    async def connect(self) -> None:
+        import aiosqlite
+
+        self._pool = asyncio.Queue(maxsize=self.pool_size)
+        for _ in range(self.pool_size):
+            # Autocommit mode; write methods manage their own transactions
+            conn = await aiosqlite.connect(self.path, isolation_level=None)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+            self._connections.append(conn)
+            self._pool.put_nowait(conn)
+
+    async def close(self) -> None:
+        for conn in self._connections:
+            await conn.close()
+        self._connections.clear()
+        self._pool = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """Borrow a connection, waiting up to acquire_timeout for one to free up"""
+        if self._pool is None:
+            raise RuntimeError("Backend is not connected")
+        conn = await asyncio.wait_for(self._pool.get(), self.acquire_timeout)
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        try:
+            yield conn
+        finally:
+            self.in_use -= 1
+            self._pool.put_nowait(conn)
+
+    def _param(self, index: int) -> str:
+        return "?"
+
+    async def ping(self) -> Dict[str, Any]:
+        async with self.acquire() as conn:
+            await conn.execute("SELECT 1")
+        return {"pool_size": self.pool_size, "in_use": self.in_use}
+
+    @staticmethod
+    def _adapt(value: Any) -> Any:
+        # Store exact decimals and ISO timestamps as text
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    @asynccontextmanager
+    async def _transaction(self) -> AsyncIterator[Any]:
+        """Borrow a connection inside a write transaction, rolled back if the block raises"""
+        async with self.acquire() as conn:
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                await conn.execute("ROLLBACK")
+                raise
+            await conn.execute("COMMIT")
+
+    async def ensure_table(self, table: Table) -> None:
+        async with self.acquire() as conn:
+            for statement in self._schema(table):
+                await conn.execute(statement)
+            await conn.execute(self._statement(table, "add_version"), (table.name,))
+
+    async def data_version(self, table: Table) -> int:
+        async with self.acquire() as conn:
+            async with conn.execute(self._statement(table, "version"), (table.name,)) as cursor:
+                row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def fetch_all(self, table: Table) -> List[BaseModel]:
+        async with self.acquire() as conn:
+            async with conn.execute(self._statement(table, "select_all")) as cursor:
+                rows = await cursor.fetchall()
+        return [table.from_row(row) for row in rows]
+
+    async def upsert_many(self, table: Table, objs: Iterable[BaseModel]) -> None:
+        rows = [tuple(self._adapt(v) for v in table.to_row(obj)) for obj in objs]
+        if rows:
+            async with self._transaction() as conn:
+                await conn.executemany(self._statement(table, "upsert"), rows)
+                await conn.execute(self._statement(table, "bump_version"), (table.name,))
+
+    async def take_many(self, table: Table, column: str, amounts: Dict[Any, int]) -> Dict[Any, int]:
+        take = self._statement(table, f"take {column}")
+        values = {}
+        async with self._transaction() as conn:
+            for key in sorted(amounts):
+                async with conn.execute(take, (amounts[key], key, amounts[key])) as cursor:
+                    row = await cursor.fetchone()
+                if row is None:
+                    async with conn.execute(self._statement(table, f"get {column}"), (key,)) as cursor:
+                        current = await cursor.fetchone()
+                    raise ConditionFailed(key, current[0] if current else None)
+                values[key] = row[0]
+            await conn.execute(self._statement(table, "bump_version"), (table.name,))
+        return values
+
+
+class PostgresBackend(Backend):
+    """Postgres backend using an asyncpg connection pool (statements are prepared and cached by asyncpg)"""
+
+    # Unconstrained NUMERIC keeps every digit of a price, as the repositories do
+    TYPES = {"INTEGER": "BIGINT", "TEXT": "TEXT", "DECIMAL": "NUMERIC", "TIMESTAMP": "TIMESTAMP"}
+
+    def __init__(self, dsn: str, pool_size: int = 5, acquire_timeout: float = 10.0):
+        super().__init__(pool_size)
+        self.dsn = dsn
+        self.acquire_timeout = acquire_timeout
+        self._pool = None
+
+    async def connect(self) -> None:
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError("asyncpg is required for postgresql:// DATABASE_URL values")
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=self.pool_size)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        if self._pool is None:
+            raise RuntimeError("Backend is not connected")
+        async with self._pool.acquire(timeout=self.acquire_timeout) as conn:
+            yield conn
+
+    def _param(self, index: int) -> str:
+        return f"${index}"
+
+    async def ping(self) -> Dict[str, Any]:
+        async with self.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+        return {"pool_size": self._pool.get_size(), "idle": self._pool.get_idle_size()}
+
+    async def ensure_table(self, table: Table) -> None:
+        async with self.acquire() as conn:
+            for statement in self._schema(table):
+                await conn.execute(statement)
+            # Tables created with NUMERIC(12, 2) rounded prices; widen them to NUMERIC
+            constrained = await conn.fetch(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = $1 AND data_type = 'numeric' AND numeric_scale IS NOT NULL",
+                table.name
+            )
+            decimals = {column.name for column in table.columns if column.type == "DECIMAL"}
+            for row in constrained:
+                if row["column_name"] in decimals:
+                    await conn.execute(f"ALTER TABLE {table.name} ALTER COLUMN {row['column_name']} TYPE NUMERIC")
+            await conn.execute(self._statement(table, "add_version"), table.name)
+
+    async def data_version(self, table: Table) -> int:
+        async with self.acquire() as conn:
+            version = await conn.fetchval(self._statement(table, "version"), table.name)
+        return version or 0
+
+    async def fetch_all(self, table: Table) -> List[BaseModel]:
+        async with self.acquire() as conn:
+            rows = await conn.fetch(self._statement(table, "select_all"))
+        return [table.from_row(tuple(row)) for row in rows]
+
+    async def upsert_many(self, table: Table, objs: Iterable[BaseModel]) -> None:
+        rows = [table.to_row(obj) for obj in objs]
+        if rows:
+            async with self.acquire() as conn:
+                async with conn.transaction():
+                    await conn.executemany(self._statement(table, "upsert"), rows)
+                    # Last, so the version row is locked only until the commit
+                    await conn.execute(self._statement(table, "bump_version"), table.name)
+
+    async def take_many(self, table: Table, column: str, amounts: Dict[Any, int]) -> Dict[Any, int]:
+        take = self._statement(table, f"take {column}")
+        values = {}
+        async with self.acquire() as conn:
+            async with conn.transaction():
+                # Rows are locked in key order so concurrent batches cannot deadlock
+                for key in sorted(amounts):
+                    value = await conn.fetchval(take, amounts[key], key, amounts[key])
+                    if value is None:
+                        current = await conn.fetchval(self._statement(table, f"get {column}"), key)
+                        raise ConditionFailed(key, current)
+                    values[key] = value
+                await conn.execute(self._statement(table, "bump_version"), table.name)
+        return values
+
+
+def create_backend(url: Optional[str], pool_size: int = 5) -> Optional[Backend]:
+    """Create a backend from a DATABASE_URL value, or None for in-memory only"""
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        if not path or path == ":memory:":
+            raise ValueError("SQLite DATABASE_URL needs a file path so pooled connections share data")
+        return SQLiteBackend(path, pool_size)
+    if url.startswith(("postgresql://", "postgres://")):
+        return PostgresBackend(url, pool_size)
+    raise ValueError(f"Unsupported DATABASE_URL scheme: {url.split(':', 1)[0]}")
+
+
+async def load_repository(backend: Backend, table: Table, repository) -> int:
+    """
+    Load a repository from the backend, seeding an empty table from the repository.
+
+    Returns the table's data version as of the load.
+    """
+    await backend.ensure_table(table)
+    version = await backend.data_version(table)
+    stored = await backend.fetch_all(table)
+    if stored:
+        repository.clear()
+        for obj in stored:
+            repository.add(obj)
+    else:
+        await backend.upsert_many(table, list(repository))
+        version = await backend.data_version(table)
+    return version
@@ -0,0 +1,100 @@
+"""
+Per-subject request rate limiting for FastAPI services
+
+The gateway verifies JWTs and passes the caller's subject in the x-jwt-sub
+header. RateLimitMiddleware gives each subject its own token bucket so one
+busy batch client cannot starve interactive callers; requests over the
+limit get 429 with Retry-After. Requests without a subject (health probes,
+metrics scrapes, direct calls inside the network) are not limited.
+Buckets live in each worker, like the metrics registry.
+
+    RATE_LIMIT_PER_SUBJECT  sustained requests/sec per subject (default 100; 0 disables)
+    RATE_LIMIT_BURST        bucket size (default 2x the rate)
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import FastAPI
+
+SUBJECT_HEADER = b"x-jwt-sub"
+# Idle subjects beyond this many are forgotten (their buckets would be full again anyway)
+MAX_SUBJECTS = 10_000
+
+
+class TokenBucket:
+    """Tokens refill continuously at `rate` per second up to `burst`"""
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+
+class SubjectRateLimiter:
+    """Token bucket per subject, evicting the least recently seen subjects"""
+
+    def __init__(self, rate: float, burst: float, max_subjects: int = MAX_SUBJECTS):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_subjects = max_subjects
+        self._buckets: "OrderedDict[bytes, TokenBucket]" = OrderedDict()
+        self.limited = 0
+
+    def acquire(self, subject: bytes, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)"""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(subject)
+        if bucket is None:
+            bucket = self._buckets[subject] = TokenBucket(self.burst, now)
+            if len(self._buckets) > self.max_subjects:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(subject)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True, 0.0
+        self.limited += 1
+        return False, (1 - bucket.tokens) / self.rate
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying a SubjectRateLimiter to requests with a subject header"""
+
+    def __init__(self, app, limiter: SubjectRateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            subject = next((value for name, value in scope["headers"] if name == SUBJECT_HEADER), None)
+            if subject is not None:
+                allowed, retry_after = self.limiter.acquire(subject)
+                if not allowed:
+                    await send({
+                        "type": "http.response.start",
+                        "status": 429,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"retry-after", str(math.ceil(retry_after)).encode()),
+                        ],
+                    })
+                    await send({"type": "http.response.body", "body": b'{"detail":"Rate limit exceeded"}'})
+                    return
+        await self.app(scope, receive, send)
+
+
+def setup_rate_limit(app: FastAPI) -> Optional[SubjectRateLimiter]:
+    """Attach per-subject rate limiting configured from the environment"""
+    rate = float(os.getenv("RATE_LIMIT_PER_SUBJECT", 100))
+    if rate <= 0:
+        return None
+    limiter = SubjectRateLimiter(rate, float(os.getenv("RATE_LIMIT_BURST", rate * 2)))
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return limiter
@@ -0,0 +1,44 @@
+"""
+orjson-backed JSON responses
+
+ORJSONResponse renders bytes identical to FastAPI's default path (Pydantic
+JSON-mode serialization followed by JSONResponse) for the types our models
+use: Decimal as a string ("999.99"), ISO datetimes with UTC as "Z",
+unescaped UTF-8 and no spaces. orjson formats datetimes natively; the only
+difference from Pydantic is for UTC offsets with a seconds component,
+which no current time zone uses.
+
+Handlers that already hold validated models can return
+ORJSONResponse(model_or_list) directly; FastAPI then skips re-validating
+them against the response_model, which is still used for the OpenAPI schema.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # Field values in declaration order; our response models have no
+        # aliases, computed fields or custom serializers
+        return obj.__dict__
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content (models, lists, dicts) to JSON bytes"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; accepts Pydantic models as content"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
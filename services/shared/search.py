@@ -0,0 +1,188 @@
+"""
+In-process full-text search: inverted index, prefix trie and TF-IDF ranking
+
+Documents are token lists keyed by an integer id (the record id). Postings
+map each term to the documents containing it and its occurrences in
+that document; a character trie over the vocabulary expands the last query
+term for typeahead. Repositories update the index on every write, so search
+results are never stale.
+
+A document matches when it contains every query term (the last one as a
+prefix). Candidates come from the rarest term's postings, capped at
+MAX_CANDIDATES postings so a query made only of very common terms stays
+fast; past that cap the ranking covers the first documents indexed for
+that term.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from itertools import islice
+from typing import Dict, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Completions of a prefix considered per query
+MAX_PREFIX_TERMS = 64
+# Postings scanned per query (candidate documents scored)
+MAX_CANDIDATES = 5_000
+
+# Trie key marking the end of a term (real keys are single characters)
+_END = ""
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into case-folded word tokens"""
+    return TOKEN_PATTERN.findall(text.casefold())
+
+
+class PrefixTrie:
+    """Character trie over a vocabulary, for prefix completion"""
+
+    def __init__(self):
+        self._root: Dict[str, dict] = {}
+
+    def add(self, term: str) -> None:
+        node = self._root
+        for char in term:
+            node = node.setdefault(char, {})
+        node[_END] = {}
+
+    def remove(self, term: str) -> None:
+        """Remove a term, pruning nodes no other term uses"""
+        path = [self._root]
+        for char in term:
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].pop(_END, None)
+        for depth in range(len(term), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][term[depth - 1]]
+
+    def complete(self, prefix: str, limit: int = MAX_PREFIX_TERMS) -> List[str]:
+        """Get up to limit terms starting with prefix, shortest and alphabetically first"""
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        terms: List[str] = []
+        level = [(prefix, node)]
+        while level and len(terms) < limit:
+            next_level = []
+            for term, node in level:
+                if _END in node:
+                    terms.append(term)
+                    if len(terms) == limit:
+                        break
+                next_level.extend((term + char, child) for char, child in sorted(node.items()) if char)
+            level = next_level
+        return terms
+
+    def clear(self) -> None:
+        self._root.clear()
+
+
+class SearchIndex:
+    """Inverted index with TF-IDF scoring, updated one document at a time"""
+
+    def __init__(self):
+        # Term -> document id -> occurrences of the term in the document
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # Document id -> (token count, *distinct terms); the terms are kept to unindex it
+        self._docs: Dict[int, tuple] = {}
+        self._trie = PrefixTrie()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc_id: int, text: str) -> None:
+        """Index a document, replacing any earlier version of it"""
+        if doc_id in self._docs:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        for term, count in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._trie.add(term)
+            postings[doc_id] = count
+        self._docs[doc_id] = (len(tokens), *counts)
+
+    def remove(self, doc_id: int) -> None:
+        """Drop a document from the index (no-op if absent)"""
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for term in doc[1:]:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                self._trie.remove(term)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._docs.clear()
+        self._trie.clear()
+
+    def _idf(self, term: str) -> float:
+        return math.log(1 + len(self._docs) / len(self._postings[term]))
+
+    def search(self, query: str, limit: int, prefix: bool = True) -> List[Tuple[int, float]]:
+        """
+        Get the ids and scores of the best matches for query, best first.
+
+        With prefix=True the last query term also matches longer terms
+        ("lap" finds "laptop"), as a search box does while typing. A
+        document's score is the sum over query terms of term frequency
+        (occurrences / document length) times inverse document frequency.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Each group is a set of alternatives; a match needs one term from every group
+        groups = [[term] for term in dict.fromkeys(tokens[:-1])]
+        last = tokens[-1]
+        groups.append(self._trie.complete(last) if prefix else [last])
+        weighted = []
+        for group in groups:
+            present = [(self._postings[term], self._idf(term)) for term in group if term in self._postings]
+            if not present:
+                return []
+            weighted.append(present)
+
+        # Candidates and their first partial scores come from the smallest group's postings
+        weighted.sort(key=lambda group: sum(len(postings) for postings, _ in group))
+        driver, rest = weighted[0], weighted[1:]
+        partial: Dict[int, float] = {}
+        budget = MAX_CANDIDATES
+        for postings, idf in driver:
+            for doc_id, count in islice(postings.items(), budget):
+                if count * idf > partial.get(doc_id, 0.0):
+                    partial[doc_id] = count * idf
+            budget -= len(postings)
+            if budget <= 0:
+                break
+
+        docs = self._docs
+
+        def scored():
+            for doc_id, score in partial.items():
+                for group in rest:
+                    best = 0.0
+                    for postings, idf in group:
+                        count = postings.get(doc_id)
+                        if count is not None and count * idf > best:
+                            best = count * idf
+                    if not best:
+                        break
+                    score += best
+                else:
+                    yield score / docs[doc_id][0], doc_id
+
+        best = heapq.nlargest(limit, scored(), key=lambda hit: (hit[0], -hit[1]))
+        return [(doc_id, score) for score, doc_id in best]
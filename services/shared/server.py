@@ -0,0 +1,79 @@
+"""
+Uvicorn launcher shared by the services
+
+Reads the server settings from the environment so the Dockerfiles and
+`python main.py` start the same way:
+
+    WORKERS                   worker processes (default 1; 0 = one per CPU)
+    UVICORN_LOOP              auto, asyncio or uvloop (default auto)
+    UVICORN_HTTP              auto, h11 or httptools (default auto)
+    UVICORN_KEEPALIVE         keep-alive timeout in seconds (default 5)
+    UVICORN_BACKLOG           listen backlog (default 2048)
+    UVICORN_LIMIT_CONCURRENCY max concurrent connections per worker before 503s (default unlimited)
+    UVICORN_GRACEFUL_TIMEOUT  seconds to let in-flight requests finish on shutdown (default 30)
+    UVICORN_ACCESS_LOG        true/false, log every request (default true)
+
+Each worker holds its own in-memory repository, response cache and metrics,
+so with more than one worker a write is only visible to the worker that
+handled it (the others pick it up from DATABASE_URL on their next start).
+Use WORKERS > 1 for read-heavy deployments.
+"""
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _optional_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def worker_count() -> int:
+    """Number of worker processes from WORKERS; 0 means one per CPU"""
+    workers = int(os.getenv("WORKERS", 1))
+    if workers < 0:
+        raise ValueError("WORKERS must be 0 or greater")
+    return workers or os.cpu_count() or 1
+
+
+def server_config(port: int, host: str = "0.0.0.0") -> Dict[str, Any]:
+    """Keyword arguments for uvicorn.run built from the environment"""
+    return {
+        "host": host,
+        "port": port,
+        "workers": worker_count(),
+        "loop": os.getenv("UVICORN_LOOP", "auto"),
+        "http": os.getenv("UVICORN_HTTP", "auto"),
+        "timeout_keep_alive": int(os.getenv("UVICORN_KEEPALIVE", 5)),
+        "backlog": int(os.getenv("UVICORN_BACKLOG", 2048)),
+        "limit_concurrency": _optional_int("UVICORN_LIMIT_CONCURRENCY"),
+        "timeout_graceful_shutdown": int(os.getenv("UVICORN_GRACEFUL_TIMEOUT", 30)),
+        # Logging is configured by shared.common.setup_logging in each worker
+        "log_config": None,
+        "access_log": os.getenv("UVICORN_ACCESS_LOG", "true").lower() in ("1", "true", "yes"),
+    }
+
+
+def run(app: str, port: Optional[int] = None, instance: Any = None) -> None:
+    """
+    Serve an app given as an import string (e.g. "main:app").
+
+    Worker processes import the app from that string. With one worker and
+    the already-built app passed as instance, it is served in this process
+    instead: started as `python main.py`, importing "main:app" again would
+    load main a second time (it runs as __main__) and build its data,
+    logging thread and metrics twice.
+    """
+    import uvicorn
+
+    config = server_config(port if port is not None else int(os.getenv("SERVICE_PORT", 8000)))
+    logger.info(
+        "Starting %s on port %d with %d worker(s), loop=%s, http=%s",
+        app, config["port"], config["workers"], config["loop"], config["http"]
+    )
+    if config["workers"] == 1 and instance is not None:
+        uvicorn.run(instance, **config)
+    else:
+        uvicorn.run(app, **config)
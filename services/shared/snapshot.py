@@ -0,0 +1,338 @@
+"""
+Memory-mapped dataset snapshots for fast warm starts
+
+A snapshot is a read-only binary file holding every record of a table
+(see shared.persistence.Table), sorted by id:
+
+    header   magic, format version, record count, watermark, columns as JSON
+    ids      int64[count], ascending
+    offsets  uint64[count + 1], where each record starts in the data section
+    data     the records, packed by column type
+
+Services open it with mmap, so starting costs a few page faults instead of
+building a model per record, and worker processes mapping the same file
+share one copy of it in the page cache. The watermark is the database's
+data version for the table (see shared.persistence) when the records were
+read, so a service can tell that the snapshot has fallen behind. Records are decoded one at a time
+when read; writes are kept in memory on top of the snapshot by
+SnapshotRecords. A record is a null bitmap, the fixed-width columns, then
+the bytes of its text columns:
+
+    INTEGER    int64
+    DECIMAL    int64 units + int8 exponent (999.99 is 99999, -2), exact
+    TIMESTAMP  int64 microseconds since the epoch + uint8 1 if UTC (aware
+               values are stored in UTC), 0 if naive
+    TEXT       uint32 UTF-8 byte length
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from shared.persistence import Table
+
+MAGIC = b"APISNAP\0"
+FORMAT_VERSION = 2
+# magic, format version, record count, watermark (-1 for none), columns JSON length
+_HEADER = struct.Struct("<8sIQqI")
+_EPOCH = datetime(1970, 1, 1)
+_FIXED = {"INTEGER": "q", "DECIMAL": "qb", "TIMESTAMP": "qB", "TEXT": "I"}
+
+
+class SnapshotMismatch(ValueError):
+    """The snapshot was written in another format or for other columns"""
+
+
+class IndexesNotReady(Exception):
+    """A query needs indexes that are still being built from the snapshot"""
+
+
+class RecordCodec:
+    """Packs a table's rows into bytes and back, column by column"""
+
+    def __init__(self, table: Table):
+        if len(table.columns) > 32:
+            raise ValueError("Snapshots support at most 32 columns")
+        self.table = table
+        self.names = table.column_names
+        self.types = tuple(column.type for column in table.columns)
+        self.fixed = struct.Struct("<I" + "".join(_FIXED[type_] for type_ in self.types))
+
+    def encode(self, obj: BaseModel) -> bytes:
+        nulls = 0
+        fixed: List[Any] = []
+        texts: List[bytes] = []
+        for position, (value, type_) in enumerate(zip(self.table.to_row(obj), self.types)):
+            if value is None:
+                nulls |= 1 << position
+                fixed.extend((0, 0) if type_ in ("DECIMAL", "TIMESTAMP") else (0,))
+            elif type_ == "INTEGER":
+                fixed.append(value)
+            elif type_ == "TEXT":
+                text = value.encode()
+                fixed.append(len(text))
+                texts.append(text)
+            elif type_ == "DECIMAL":
+                exponent = value.as_tuple().exponent
+                fixed.extend((int(value.scaleb(-exponent)), exponent))
+            else:
+                if value.tzinfo is None:
+                    fixed.extend((_microseconds(value - _EPOCH), 0))
+                else:
+                    utc = value.astimezone(timezone.utc).replace(tzinfo=None)
+                    fixed.extend((_microseconds(utc - _EPOCH), 1))
+        return self.fixed.pack(nulls, *fixed) + b"".join(texts)
+
+    def decode(self, buffer: Any, start: int) -> BaseModel:
+        fixed = self.fixed.unpack_from(buffer, start)
+        nulls = fixed[0]
+        text_at = start + self.fixed.size
+        values: Dict[str, Any] = {}
+        i = 1
+        for position, (name, type_) in enumerate(zip(self.names, self.types)):
+            if type_ == "INTEGER":
+                value = fixed[i]
+                i += 1
+            elif type_ == "TEXT":
+                value = str(buffer[text_at:text_at + fixed[i]], "utf-8")
+                text_at += fixed[i]
+                i += 1
+            elif type_ == "DECIMAL":
+                value = Decimal(fixed[i]).scaleb(fixed[i + 1])
+                i += 2
+            else:
+                value = _EPOCH + timedelta(microseconds=fixed[i])
+                if fixed[i + 1]:
+                    value = value.replace(tzinfo=timezone.utc)
+                i += 2
+            values[name] = None if nulls >> position & 1 else value
+        # Validated when first stored; skip validating again
+        return self.table.model.model_construct(**values)
+
+
+def _microseconds(delta: timedelta) -> int:
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _columns(table: Table) -> List[List[Any]]:
+    return [[column.name, column.type, column.nullable] for column in table.columns]
+
+
+def write_snapshot(path: str, table: Table, records: Iterable[BaseModel], watermark: Optional[int] = None) -> int:
+    """
+    Write records to a snapshot file, returning how many were written.
+
+    watermark is the database's data version the records were read at, if
+    they came from a database.
+
+    The file is written next to path and renamed over it, so readers (and
+    other workers writing the same snapshot) never see a partial file.
+    """
+    codec = RecordCodec(table)
+    key = table.column_names[0]
+    encoded = sorted((getattr(obj, key), codec.encode(obj)) for obj in records)
+    ids = array("q", (record_id for record_id, _ in encoded))
+    offsets = array("Q", [0])
+    for _, data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    columns = json.dumps(_columns(table)).encode()
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(ids), -1 if watermark is None else watermark, len(columns)
+    ) + columns
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        # Pad so the id and offset arrays are 8-byte aligned
+        file.write(header + b"\0" * (-len(header) % 8))
+        file.write(ids.tobytes())
+        file.write(offsets.tobytes())
+        for _, data in encoded:
+            file.write(data)
+    os.replace(temporary, path)
+    return len(ids)
+
+
+class Snapshot:
+    """A snapshot file mapped read-only, with records decoded on demand"""
+
+    def __init__(self, path: str, table: Table):
+        self.path = path
+        self.table = table
+        self.codec = RecordCodec(table)
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a snapshot")
+        if struct.unpack_from("<I", self._mmap, len(MAGIC))[0] != FORMAT_VERSION:
+            self.close()
+            raise SnapshotMismatch(f"{path} is not a version {FORMAT_VERSION} snapshot")
+        _, _, count, watermark, columns_size = _HEADER.unpack_from(self._mmap, 0)
+        columns_end = _HEADER.size + columns_size
+        if json.loads(self._mmap[_HEADER.size:columns_end]) != _columns(table):
+            self.close()
+            raise SnapshotMismatch(f"Snapshot {path} columns do not match table {table.name}")
+        # Data version of the database the records were read from, if any
+        self.watermark: Optional[int] = None if watermark < 0 else watermark
+        start = columns_end + -columns_end % 8
+        self._view = memoryview(self._mmap)
+        # Sorted ids, for lookups by id and keyset pagination
+        self.ids = self._view[start:start + 8 * count].cast("q")
+        start += 8 * count
+        self._offsets = self._view[start:start + 8 * (count + 1)].cast("Q")
+        self._data = start + 8 * (count + 1)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def id_array(self) -> array:
+        """Copy of the sorted ids that can be modified"""
+        ids = array("q")
+        ids.frombytes(self.ids.cast("B"))
+        return ids
+
+    def position(self, record_id: int) -> int:
+        """Index of a record by id, or -1 if the snapshot does not have it"""
+        position = bisect_left(self.ids, record_id)
+        return position if position < len(self.ids) and self.ids[position] == record_id else -1
+
+    def record(self, position: int) -> BaseModel:
+        return self.codec.decode(self._mmap, self._data + self._offsets[position])
+
+    def close(self) -> None:
+        for view in ("ids", "_offsets", "_view"):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._mmap.close()
+
+
+def open_snapshot(path: str, table: Table) -> Optional[Snapshot]:
+    """
+    Map a snapshot file, or return None if there is none yet.
+
+    A snapshot written by another version of the service (a different
+    format or columns) also gives None, so that it is written again.
+    """
+    try:
+        return Snapshot(path, table)
+    except (FileNotFoundError, SnapshotMismatch):
+        return None
+
+
+class SnapshotRecords:
+    """
+    Mapping of id -> record over a Snapshot, holding writes in memory.
+
+    Stands in for a repository's id -> record dict: records written or
+    deleted since the snapshot live in an overlay, everything else is
+    decoded from the snapshot when read. Iteration yields the snapshot's
+    records in id order, then records added since.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot: Optional[Snapshot] = snapshot
+        self._overlay: Dict[int, Any] = {}
+        # Snapshot ids deleted since
+        self._deleted: Set[int] = set()
+        # Overlay ids that are not in the snapshot
+        self._added = 0
+
+    def _in_snapshot(self, record_id: int) -> int:
+        return -1 if self.snapshot is None else self.snapshot.position(record_id)
+
+    def __len__(self) -> int:
+        base = 0 if self.snapshot is None else len(self.snapshot)
+        return base - len(self._deleted) + self._added
+
+    def __contains__(self, record_id: int) -> bool:
+        if record_id in self._overlay:
+            return True
+        return record_id not in self._deleted and self._in_snapshot(record_id) >= 0
+
+    def get(self, record_id: int, default: Any = None) -> Any:
+        record = self._overlay.get(record_id)
+        if record is not None:
+            return record
+        if record_id in self._deleted:
+            return default
+        position = self._in_snapshot(record_id)
+        return default if position < 0 else self.snapshot.record(position)
+
+    def __getitem__(self, record_id: int) -> Any:
+        record = self.get(record_id)
+        if record is None:
+            raise KeyError(record_id)
+        return record
+
+    def __setitem__(self, record_id: int, record: Any) -> None:
+        if record_id not in self._overlay:
+            if self._in_snapshot(record_id) < 0:
+                self._added += 1
+            else:
+                self._deleted.discard(record_id)
+        self._overlay[record_id] = record
+
+    def pop(self, record_id: int, default: Any = None) -> Any:
+        record = self.get(record_id)
+        if record is None:
+            return default
+        if self._overlay.pop(record_id, None) is not None and self._in_snapshot(record_id) < 0:
+            self._added -= 1
+        else:
+            self._deleted.add(record_id)
+        return record
+
+    def clear(self) -> None:
+        self.snapshot = None
+        self._overlay.clear()
+        self._deleted.clear()
+        self._added = 0
+
+    def changed_ids(self) -> Set[int]:
+        """Ids written or deleted since the snapshot"""
+        return self._deleted | self._overlay.keys()
+
+    def items(self) -> Iterator[Tuple[int, Any]]:
+        if self.snapshot is not None:
+            skip = self._deleted | self._overlay.keys()
+            for position, record_id in enumerate(self.snapshot.ids):
+                if record_id in skip:
+                    if record_id in self._overlay:
+                        yield record_id, self._overlay[record_id]
+                else:
+                    yield record_id, self.snapshot.record(position)
+        for record_id, record in self._overlay.items():
+            if self.snapshot is None or self.snapshot.position(record_id) < 0:
+                yield record_id, record
+
+    def values(self) -> Iterator[Any]:
+        return (record for _, record in self.items())
+
+
+async def index_in_background(repository: Any, logger: logging.Logger) -> None:
+    """
+    Build a snapshot-backed repository's indexes in a thread while the service serves.
+
+    The repository's begin_indexing() build runs off the event loop and
+    finish_indexing() installs the result on it. Cancelling abandons the build.
+    """
+    build = repository.begin_indexing()
+    built = None
+    start = time.perf_counter()
+    try:
+        built = await asyncio.get_running_loop().run_in_executor(None, build)
+    except Exception:
+        logger.exception("Building indexes from the snapshot failed")
+    finally:
+        repository.finish_indexing(built)
+    if built is not None:
+        logger.info("Indexed %d records from the snapshot in %.1fs", len(repository), time.perf_counter() - start)
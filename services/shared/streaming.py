@@ -0,0 +1,38 @@
+"""
+Streaming NDJSON export helpers
+"""
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+EXPORT_CHUNK_SIZE = 1000
+
+# Keyset page function: (after_id, limit) -> (items, has_more)
+PageFunction = Callable[[Optional[int], Optional[int]], Tuple[List[BaseModel], bool]]
+
+
+async def ndjson_chunks(fetch_page: PageFunction,
+                        chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Encode records as NDJSON, one keyset page per chunk.
+
+    Only one page is held at a time, so memory stays flat regardless of
+    catalog size, and writes made during the export never repeat or skip
+    rows that were already emitted.
+    """
+    after_id = None
+    while True:
+        items, has_more = fetch_page(after_id, chunk_size)
+        if items:
+            yield "".join(item.model_dump_json() + "\n" for item in items).encode()
+            after_id = items[-1].id
+        if not has_more:
+            break
+
+
+def ndjson_response(fetch_page: PageFunction,
+                    chunk_size: int = EXPORT_CHUNK_SIZE) -> StreamingResponse:
+    """Stream all records from a keyset page function as application/x-ndjson"""
+    return StreamingResponse(ndjson_chunks(fetch_page, chunk_size), media_type=NDJSON_MEDIA_TYPE)
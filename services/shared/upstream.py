@@ -0,0 +1,101 @@
+"""
+Pooled HTTP clients for calling other services
+
+Upstream holds one long-lived httpx.AsyncClient per service, so calls
+reuse keep-alive connections instead of paying a TCP handshake and a
+uvicorn accept each time. Every call has its own deadline covering
+connect, send and the whole body; timeouts, transport errors and
+unexpected statuses come back as UpstreamError naming the upstream, so a
+caller fanning out with fan_out can compose what succeeded and report
+the rest.
+
+    UPSTREAM_MAX_CONNECTIONS  connections per upstream and worker (default 100)
+    UPSTREAM_KEEPALIVE        seconds an idle connection is kept (default 4)
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Dict, Iterable, Mapping, Optional, Tuple
+
+import httpx
+
+# Identity set by the gateway, passed on so the services apply per-caller limits
+FORWARDED_HEADERS = ("x-jwt-sub", "x-jwt-username", "x-jwt-client", "x-request-id")
+
+
+class UpstreamError(Exception):
+    """A call to an upstream service timed out, failed or returned an unexpected status"""
+
+    def __init__(self, upstream: str, message: str, status_code: Optional[int] = None):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+        self.message = message
+        self.status_code = status_code
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"upstream": self.upstream, "error": self.message, "status": self.status_code}
+
+
+class Upstream:
+    """A service reached through a pooled keep-alive client, with a per-call deadline"""
+
+    def __init__(self, name: str, base_url: str, timeout: float,
+                 max_connections: Optional[int] = None, keepalive: Optional[float] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        if max_connections is None:
+            max_connections = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 100))
+        if keepalive is None:
+            # Under the services' 5s UVICORN_KEEPALIVE, so the client drops an idle
+            # connection before the server closes it under a request
+            keepalive = float(os.getenv("UPSTREAM_KEEPALIVE", 4))
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                keepalive_expiry=keepalive),
+            transport=transport,
+        )
+
+    async def get(self, path: str, params: Optional[Mapping[str, Any]] = None,
+                  headers: Optional[Mapping[str, str]] = None, expect: Iterable[int] = (200,)) -> httpx.Response:
+        """GET path, raising UpstreamError unless the status is one of expect"""
+        try:
+            # httpx timeouts apply per read; wait_for bounds the whole call
+            response = await asyncio.wait_for(self.client.get(path, params=params, headers=headers), self.timeout)
+        except asyncio.TimeoutError:
+            raise UpstreamError(self.name, f"timed out after {self.timeout}s")
+        except httpx.HTTPError as e:
+            raise UpstreamError(self.name, str(e) or type(e).__name__)
+        if response.status_code not in expect:
+            raise UpstreamError(self.name, f"returned {response.status_code}", response.status_code)
+        return response
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def forwarded_headers(headers: Mapping[str, str]) -> Dict[str, str]:
+    """The caller identity headers of an incoming request, to send upstream"""
+    return {name: headers[name] for name in FORWARDED_HEADERS if name in headers}
+
+
+async def fan_out(calls: Mapping[str, Awaitable[Any]]) -> Tuple[Dict[str, Any], Dict[str, UpstreamError]]:
+    """
+    Run calls concurrently, returning (results, errors) keyed like calls.
+
+    An UpstreamError fails only its own call; any other exception is a bug
+    and is raised once every call has finished.
+    """
+    outcomes = await asyncio.gather(*calls.values(), return_exceptions=True)
+    results: Dict[str, Any] = {}
+    errors: Dict[str, UpstreamError] = {}
+    for key, outcome in zip(calls, outcomes):
+        if isinstance(outcome, UpstreamError):
+            errors[key] = outcome
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            results[key] = outcome
+    return results, errors
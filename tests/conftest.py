@@ -0,0 +1,48 @@
+"""
+Shared setup for the in-process tests
+
+Puts services/ on sys.path, so tests import shared.*, and then
+services/product-service, whose models, repository and main most of them
+use. Other services' modules are loaded by path with load_service().
+"""
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+SERVICES_DIR = Path(__file__).resolve().parent.parent / "services"
+sys.path.insert(0, str(SERVICES_DIR))
+sys.path.insert(0, str(SERVICES_DIR / "product-service"))
+
+# Top-level modules each service defines for itself
+SERVICE_MODULES = ("main", "models", "repository", "reservations")
+
+
+def _service_modules():
+    return {name: module for name, module in sys.modules.items() if name.split(".")[0] in SERVICE_MODULES}
+
+
+def load_service(service: str, module: str = "main") -> ModuleType:
+    """
+    Import a module of a service by path, e.g. load_service("aggregation-service").
+
+    Every service has its own `main`, `models` and so on. The ones the
+    module imports are resolved from its service directory and then taken
+    out of sys.modules again, so they do not replace the product service's.
+    """
+    service_dir = SERVICES_DIR / service
+    saved = _service_modules()
+    for name in saved:
+        del sys.modules[name]
+    sys.path.insert(0, str(service_dir))
+    try:
+        name = f"{service.replace('-', '_')}_{module.replace('.', '_')}"
+        spec = importlib.util.spec_from_file_location(name, service_dir / f"{module.replace('.', '/')}.py")
+        loaded = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(loaded)
+    finally:
+        sys.path.remove(str(service_dir))
+        for name in _service_modules():
+            del sys.modules[name]
+        sys.modules.update(saved)
+    return loaded
@@ -0,0 +1,132 @@
+"""
+Tests for the aggregation service's customer view
+
+Runs the app in-process with the customer and product services replaced by
+httpx mock transports: concurrent fan-out, per-upstream timeouts, partial
+failures and the composed document.
+"""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from shared.upstream import Upstream
+from tests.conftest import load_service
+
+CUSTOMER = {"id": 1, "name": "Test User", "email": "test.user@example.com", "phone": None,
+            "created_at": "2024-01-01T00:00:00"}
+
+service = load_service("aggregation-service")
+
+
+def customer_handler(delay: float = 0.0, status: int = 200):
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        if status != 200:
+            return httpx.Response(status, json={"detail": "failed"})
+        return httpx.Response(200, json=dict(CUSTOMER, id=int(request.url.path.rsplit("/", 1)[1])))
+    return handle
+
+
+def product_handler(delay: float = 0.0, status: int = 200):
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        if status != 200:
+            return httpx.Response(status, json={"detail": "failed"})
+        ids = [int(i) for i in request.url.params["ids"].split(",")]
+        return httpx.Response(200, json={"items": [{"id": i, "price": "9.99"} for i in ids if i < 100],
+                                         "missing": [i for i in ids if i >= 100]})
+    return handle
+
+
+@pytest.fixture
+def client_for():
+    """TestClient with the upstreams answered by the given handlers; records the upstream requests"""
+    def build(customers=None, products=None, timeout: float = 1.0):
+        seen = []
+
+        def transport(handler):
+            async def record(request: httpx.Request) -> httpx.Response:
+                seen.append(request)
+                return await handler(request)
+            return httpx.MockTransport(record)
+
+        service.customer_service = Upstream("customer-service", "http://customers", timeout,
+                                            transport=transport(customers or customer_handler()))
+        service.product_service = Upstream("product-service", "http://products", timeout,
+                                           transport=transport(products or product_handler()))
+        return TestClient(service.app), seen
+    return build
+
+
+def test_composes_customer_and_products(client_for):
+    client, seen = client_for()
+    with client:
+        response = client.get("/aggregate/customers/7?product_ids=3,100,1", headers={"x-jwt-sub": "alice"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "customer": dict(CUSTOMER, id=7),
+        "products": {"items": [{"id": 3, "price": "9.99"}, {"id": 1, "price": "9.99"}], "missing": [100]},
+        "errors": [],
+    }
+    assert sorted(request.url.path for request in seen) == ["/customers/7", "/products"]
+    assert all(request.headers["x-jwt-sub"] == "alice" for request in seen)
+
+
+def test_upstreams_are_called_concurrently(client_for):
+    client, _ = client_for(customer_handler(delay=0.3), product_handler(delay=0.3))
+    with client:
+        client.get("/aggregate/customers/1?product_ids=1")
+        start = time.perf_counter()
+        response = client.get("/aggregate/customers/1?product_ids=1")
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    assert elapsed < 0.5
+
+
+def test_slow_upstream_times_out_into_partial_document(client_for):
+    client, _ = client_for(products=product_handler(delay=2.0), timeout=0.2)
+    with client:
+        start = time.perf_counter()
+        response = client.get("/aggregate/customers/1?product_ids=1,2")
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    body = response.json()
+    assert body["customer"]["id"] == 1 and body["products"] is None
+    assert body["errors"] == [{"upstream": "product-service", "error": "timed out after 0.2s", "status": None}]
+    assert elapsed < 1.0
+
+
+def test_failed_customer_service_keeps_products(client_for):
+    client, _ = client_for(customers=customer_handler(status=503))
+    with client:
+        response = client.get("/aggregate/customers/1?product_ids=1")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["customer"] is None and body["products"]["items"] == [{"id": 1, "price": "9.99"}]
+    assert body["errors"] == [{"upstream": "customer-service", "error": "returned 503", "status": 503}]
+
+
+def test_missing_customer_or_all_failed(client_for):
+    client, _ = client_for(customers=customer_handler(status=404))
+    with client:
+        assert client.get("/aggregate/customers/1?product_ids=1").status_code == 404
+
+    client, _ = client_for(customer_handler(status=500), product_handler(status=500))
+    with client:
+        response = client.get("/aggregate/customers/1?product_ids=1")
+    assert response.status_code == 502
+    assert [error["upstream"] for error in response.json()["detail"]["errors"]] == ["customer-service",
+                                                                                    "product-service"]
+
+
+def test_without_products_calls_only_customers(client_for):
+    client, seen = client_for()
+    with client:
+        response = client.get("/aggregate/customers/2")
+        assert client.get("/aggregate/customers/2?product_ids=1,x").status_code == 400
+    assert json.loads(response.content)["products"] == {"items": [], "missing": []}
+    assert [request.url.path for request in seen] == ["/customers/2"]
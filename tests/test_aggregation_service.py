@@ -0,0 +1,51 @@
+"""
+Integration tests for Aggregation Service
+"""
+import pytest
+import requests
+
+# Configuration
+GATEWAY_BASE_URL = "http://localhost:8080"
+
+class TestAggregationService:
+    """Test aggregation service endpoints"""
+
+    def test_health_check_via_gateway(self):
+        """Test health check through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/aggregate/health")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "healthy"
+        assert data["service"] == "aggregation-service"
+
+    def test_liveness_probe_via_gateway(self):
+        """Test liveness probe through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/aggregate/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "healthy", "service": "aggregation-service", "version": "1.0.0"}
+
+    def test_customer_view_via_gateway(self):
+        """Test composing a customer and products in one call"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/aggregate/customers/1?product_ids=2,1,999999")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["errors"] == []
+        assert data["customer"] == requests.get(f"{GATEWAY_BASE_URL}/customers/1").json()
+        assert [product["id"] for product in data["products"]["items"]] == [2, 1]
+        assert data["products"]["missing"] == [999999]
+
+    def test_customer_view_without_products(self):
+        """Test a view that asks for no products"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/aggregate/customers/1")
+        assert response.status_code == 200
+        assert response.json()["products"] == {"items": [], "missing": []}
+
+    def test_customer_view_not_found(self):
+        """Test that an unknown customer is a 404"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/aggregate/customers/999999?product_ids=1")
+        assert response.status_code == 404
+
+    def test_customer_view_invalid_product_ids(self):
+        """Test that malformed product ids are rejected"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/aggregate/customers/1?product_ids=1,abc")
+        assert response.status_code == 400
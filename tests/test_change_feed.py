@@ -0,0 +1,150 @@
+"""
+Tests for the change log behind /products/changes and /customers/changes
+
+Runs in-process against shared.changes and the product repository:
+compaction to one entry per record, bounded retention, resets, positions
+scoped to the log that issued them, the Server-Sent Events encoding, and that a poll's cost follows the number of
+changes rather than the catalog size.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from models.product import Product
+from repository import ProductRepository
+from shared.changes import ChangeLog, ChangesExpired, change_events, change_page
+
+
+def product(product_id: int, stock: int = 1) -> Product:
+    return Product.model_construct(
+        id=product_id, name=f"Product {product_id}", description="", price=Decimal("1.00"),
+        category="Feed", stock_quantity=stock, created_at=datetime.now(),
+    )
+
+
+def drain(log: ChangeLog, since: int, limit: int = 1000):
+    """Read every change after since, page by page"""
+    changes = []
+    while True:
+        page, since, has_more = log.read(since, limit)
+        changes.extend(page)
+        if not has_more:
+            return changes, since
+
+
+def test_poll_returns_latest_change_per_record():
+    repository = ProductRepository(product(i) for i in range(1, 6))
+    since = repository.changes.head
+    repository.set_stock(2, 0)
+    repository.update(product(3, stock=7))
+    repository.set_stock(2, 5)
+    repository.delete(4)
+
+    page = change_page(repository.changes, since, 10, repository.get)
+    assert [(item["op"], item["id"]) for item in page["items"]] == [("upsert", 3), ("upsert", 2), ("delete", 4)]
+    assert page["items"][1]["data"].stock_quantity == 5
+    assert page["next"] == repository.changes.head
+    assert not page["has_more"]
+    assert change_page(repository.changes, page["next"], 10, repository.get)["items"] == []
+
+
+def test_pages_resume_from_next():
+    log = ChangeLog()
+    log.record_many(range(1, 26))
+    log.record_many(range(1, 11))
+    changes, since = drain(log, 0, limit=7)
+    assert [record_id for _, record_id in changes] == list(range(11, 26)) + list(range(1, 11))
+    assert since == log.seq
+
+
+def test_retention_moves_floor():
+    log = ChangeLog(retention=1000)
+    log.record_many(range(10_000))
+    assert len(log) <= 2 * 1000
+    with pytest.raises(ChangesExpired):
+        log.read(0, 10)
+    changes, _ = drain(log, log.floor)
+    # Every change after the floor is still there, each record once
+    assert [record_id for _, record_id in changes] == list(range(10_000 - len(changes), 10_000))
+    assert len(changes) >= 1000
+
+
+def test_compaction_bounds_repeated_writes():
+    log = ChangeLog(retention=1000)
+    for _ in range(100):
+        log.record_many(range(50))
+    assert len(log._seqs) <= 2 * 1024
+    changes, _ = drain(log, 0)
+    assert sorted(record_id for _, record_id in changes) == list(range(50))
+
+
+def test_clear_and_foreign_positions_expire():
+    repository = ProductRepository(product(i) for i in range(1, 4))
+    since = repository.changes.seq
+    repository.clear()
+    with pytest.raises(ChangesExpired):
+        repository.changes.read(since, 10)
+    with pytest.raises(ChangesExpired):
+        repository.changes.read(repository.changes.seq + 1, 10)
+
+
+def test_positions_belong_to_their_log():
+    # Two workers (or a worker before and after a restart) with their own logs
+    first, second = ChangeLog(), ChangeLog()
+    first.record_many(range(1, 6))
+    second.record_many(range(1, 11))
+    since = first.position(3)
+    assert first.parse(since) == 3
+    # second's window covers seq 3, but its changes are not first's
+    with pytest.raises(ChangesExpired) as expired:
+        change_page(second, since, 10, lambda record_id: None)
+    assert second.parse(expired.value.floor) == second.floor
+    for malformed in ("3", "", "not a position!"):
+        with pytest.raises(ChangesExpired):
+            change_page(first, malformed, 10, lambda record_id: None)
+
+
+def test_poll_cost_follows_changes_not_catalog():
+    def poll_ms(catalog: int) -> float:
+        log = ChangeLog(retention=catalog)
+        log.record_many(range(catalog))
+        since = log.seq
+        log.record_many(range(100))
+        start = time.perf_counter()
+        for _ in range(20):
+            changes, _, _ = log.read(since, 1000)
+        assert len(changes) == 100
+        return (time.perf_counter() - start) / 20 * 1000
+
+    small, large = poll_ms(1_000), poll_ms(1_000_000)
+    assert large < small * 5 + 0.5
+
+
+def test_event_stream_follows_writes():
+    repository = ProductRepository(product(i) for i in range(1, 4))
+
+    async def run():
+        events = change_events(repository.changes, repository.changes.seq, repository.get, heartbeat=0.05)
+        assert await events.__anext__() == b": keep-alive\n\n"
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.01)
+        repository.set_stock(1, 9)
+        repository.delete(2)
+        chunk = await asyncio.wait_for(pending, timeout=1)
+        repository.clear()
+        reset = await events.__anext__()
+        with pytest.raises(StopAsyncIteration):
+            await events.__anext__()
+        return chunk, reset
+
+    chunk, reset = asyncio.run(run())
+    first, second = chunk.decode().strip().split("\n\n")
+    lines = first.split("\n")
+    assert repository.changes.parse(lines[0].removeprefix("id: ")) > 0 and lines[1] == "event: upsert"
+    assert json.loads(lines[2].removeprefix("data: "))["data"]["stock_quantity"] == 9
+    assert second.split("\n")[1] == "event: delete"
+    assert reset.startswith(b"event: reset\n")
@@ -1,6 +1,7 @@
 """
 Integration tests for Customer Service
 """
+import json
 import pytest
 import requests
 import time
@@ -19,6 +20,20 @@ class TestCustomerService:
         assert data["status"] == "healthy"
         assert data["service"] == "customer-service"
     
+    def test_liveness_probe_via_gateway(self):
+        """Test liveness probe through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "healthy", "service": "customer-service", "version": "1.0.0"}
+    
+    def test_readiness_probe_via_gateway(self):
+        """Test readiness probe through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/health/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "healthy"
+        assert data["customers"] > 0
+    
     def test_get_all_customers_via_gateway(self):
         """Test getting all customers through API Gateway"""
         response = requests.get(f"{GATEWAY_BASE_URL}/customers")
@@ -34,6 +49,80 @@ class TestCustomerService:
         assert "email" in customer
         assert "created_at" in customer
     
+    def test_metrics_via_gateway(self):
+        """Test Prometheus metrics are reported per route template"""
+        requests.get(f"{GATEWAY_BASE_URL}/customers/1")
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/metrics")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert 'route="/customers/{customer_id}"' in response.text
+        assert "http_request_duration_seconds_bucket" in response.text
+    
+    def test_export_customers_ndjson(self):
+        """Test streaming NDJSON export through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/export", stream=True)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.iter_lines() if line]
+        ids = [row["id"] for row in rows]
+        assert ids == sorted(ids)
+        assert len(ids) == len(requests.get(f"{GATEWAY_BASE_URL}/customers").json())
+    
+    def test_customer_changes_via_gateway(self):
+        """Test that a new customer shows up in the change feed"""
+        head = requests.get(f"{GATEWAY_BASE_URL}/customers/changes").json()
+        row = {"name": "Feed Reader", "email": f"feed.{int(time.time() * 1000)}@example.com"}
+        created = requests.post(f"{GATEWAY_BASE_URL}/customers/bulk", json=[row])
+        assert created.status_code == 200
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/changes?since={head['next']}")
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert [item["data"]["email"] for item in items] == [row["email"]]
+        assert items[0]["op"] == "upsert"
+    
+    def test_get_customers_not_modified_via_gateway(self):
+        """Test that a matching If-None-Match returns 304 with no body"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+    
+    def test_get_customers_paginated_via_gateway(self):
+        """Test cursor pagination with field projection through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers?limit=3&fields=id,name")
+        assert response.status_code == 200
+        first_page = response.json()
+        assert len(first_page) == 3
+        assert set(first_page[0]) == {"id", "name"}
+        cursor = response.headers["X-Next-Cursor"]
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers?limit=3&cursor={cursor}&fields=id")
+        assert response.status_code == 200
+        second_page = response.json()
+        assert second_page[0]["id"] > first_page[-1]["id"]
+    
+    def test_batch_get_customers_via_gateway(self):
+        """Test batch lookup by ids through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers?ids=2,1,999999,2")
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["id"] for item in data["items"]] == [2, 1]
+        assert data["missing"] == [999999]
+        
+        response = requests.post(f"{GATEWAY_BASE_URL}/customers/batch?fields=id", json={"ids": [1, 999999]})
+        assert response.status_code == 200
+        assert response.json() == {"items": [{"id": 1}], "missing": [999999]}
+    
+    def test_get_customers_invalid_fields(self):
+        """Test that unknown projection fields are rejected"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers?fields=password")
+        assert response.status_code == 400
+    
     def test_get_customer_by_id_via_gateway(self):
         """Test getting specific customer through API Gateway"""
         response = requests.get(f"{GATEWAY_BASE_URL}/customers/6")
@@ -49,6 +138,62 @@ class TestCustomerService:
         assert response.status_code == 404
         error = response.json()
         assert "Customer not found" in error["detail"]
+    
+    def test_bulk_upsert_customers_ndjson(self):
+        """Test bulk upsert from an NDJSON body"""
+        suffix = int(time.time() * 1000)
+        body = "\n".join([
+            f'{{"name": "Bulk One", "email": "bulk.one.{suffix}@example.com"}}',
+            f'{{"name": "Bulk Two", "email": "bulk.two.{suffix}@example.com"}}',
+        ])
+        response = requests.post(
+            f"{GATEWAY_BASE_URL}/customers/bulk",
+            data=body,
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        result = response.json()
+        assert result["created"] == 2
+        assert result["failed"] == 0
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/by-email/bulk.two.{suffix}@example.com")
+        assert response.status_code == 200
+    
+    def test_bulk_upsert_customers_duplicate_email(self):
+        """Test that a duplicate email rejects the whole batch by default"""
+        rows = [{"name": "Duplicate", "email": "john.doe@example.com"}]
+        response = requests.post(f"{GATEWAY_BASE_URL}/customers/bulk", json=rows)
+        assert response.status_code == 422
+        assert "already exists" in response.json()["detail"][0]["message"]
+    
+    def test_get_customer_by_email_via_gateway(self):
+        """Test getting customer by email through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/by-email/John.Doe@example.com")
+        assert response.status_code == 200
+        customer = response.json()
+        assert customer["id"] == 6
+        assert customer["email"] == "john.doe@example.com"
+    
+    def test_get_customer_by_nonexistent_email(self):
+        """Test getting customer by non-existent email"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/by-email/nobody@example.com")
+        assert response.status_code == 404
+        error = response.json()
+        assert "Customer not found" in error["detail"]
+    
+    def test_search_customers_via_gateway(self):
+        """Test searching customers by name and email prefix"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/search?q=john")
+        assert response.status_code == 200
+        assert response.json()[0]["email"] == "john.doe@example.com"
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/search?q=jane%20smi&fields=id,name")
+        assert response.status_code == 200
+        assert response.json() == [{"id": 7, "name": "Jane Smith"}]
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/customers/search?q=jan&prefix=false")
+        assert response.status_code == 200
+        assert response.json() == []
 
 @pytest.fixture(scope="session", autouse=True)
 def wait_for_services():
@@ -0,0 +1,99 @@
+"""
+Memory test for the streaming NDJSON product export
+
+Runs the export handler in-process against a large synthetic catalog and
+checks that every row is streamed out while memory stays flat: the peak of
+Python allocations (tracemalloc) during the export must stay under a small
+fraction of the exported bytes, which any buffering of the whole export
+exceeds at any catalog size. Peak RSS is checked too, against a fixed
+bound that matters at full scale: run with EXPORT_TEST_ROWS=1000000 for
+the 1M-row check (the default, 20,000 rows, keeps the suite fast).
+"""
+import asyncio
+import json
+import logging
+import os
+import resource
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+main = pytest.importorskip("main")
+from models.product import Product  # noqa: E402
+
+EXPORT_TEST_ROWS = int(os.getenv("EXPORT_TEST_ROWS", 20_000))
+# Allowed peak RSS growth while streaming
+MAX_RSS_GROWTH_BYTES = 64 * 1024 * 1024
+# Allowed peak of Python allocations while streaming, as a fraction of the exported bytes
+MAX_TRACED_FRACTION = 0.33
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@pytest.fixture(scope="module")
+def large_catalog():
+    """Replace the product catalog with synthetic rows for the duration of the module"""
+    logging.getLogger("product-service").setLevel(logging.WARNING)
+    original = main.products_db.list()
+    now = datetime.now()
+    main.products_db.clear()
+    main.products_db.upsert_many([
+        Product.model_construct(
+            id=i,
+            name=f"Product {i}",
+            description="Synthetic product for export tests",
+            price=Decimal("19.99"),
+            category=f"Category {i % 50}",
+            stock_quantity=i % 100,
+            created_at=now
+        )
+        for i in range(1, EXPORT_TEST_ROWS + 1)
+    ])
+    yield
+    main.products_db.clear()
+    main.products_db.upsert_many(original)
+
+
+async def consume_export():
+    """Drain the export stream, keeping only counters"""
+    response = await main.export_products()
+    assert response.media_type == "application/x-ndjson"
+    rows = 0
+    size = 0
+    last_line = b""
+    async for chunk in response.body_iterator:
+        rows += chunk.count(b"\n")
+        size += len(chunk)
+        last_line = chunk.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+    return rows, size, json.loads(last_line)
+
+
+def test_export_streams_all_rows_with_bounded_memory(large_catalog):
+    """Test that exporting the full catalog keeps peak RSS flat"""
+    baseline = peak_rss_bytes()
+    rows, _, last = asyncio.run(consume_export())
+    growth = peak_rss_bytes() - baseline
+
+    assert rows == EXPORT_TEST_ROWS
+    assert last["id"] == EXPORT_TEST_ROWS
+    assert last["price"] == "19.99"
+    assert growth < MAX_RSS_GROWTH_BYTES, f"Peak RSS grew by {growth / 2**20:.1f} MiB"
+
+
+def test_export_allocations_stay_flat(large_catalog):
+    """Test that the export never holds more than a small part of its output"""
+    tracemalloc.start()
+    try:
+        _, size, _ = asyncio.run(consume_export())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < size * MAX_TRACED_FRACTION, (
+        f"Peak allocations {peak / 2**20:.1f} MiB for a {size / 2**20:.1f} MiB export"
+    )
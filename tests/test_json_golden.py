@@ -0,0 +1,105 @@
+"""
+Golden-output test for the orjson response class
+
+ORJSONResponse must produce exactly the bytes FastAPI's default path
+(Pydantic JSON-mode serialization followed by JSONResponse) produced for the
+same models, so existing clients see no change.
+"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+
+import pytest
+
+from tests.conftest import load_service
+
+pytest.importorskip("orjson")
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from shared.responses import ORJSONResponse  # noqa: E402
+
+product_models = load_service("product-service", "models.product")
+customer_models = load_service("customer-service", "models.customer")
+
+DATETIMES = [
+    datetime(2024, 1, 2, 3, 4, 5),
+    datetime(2024, 1, 2, 3, 4, 5, 123456),
+    datetime(2024, 1, 2, 3, 4, 5, 120000),
+    datetime(2024, 1, 2, tzinfo=timezone.utc),
+    datetime(2024, 1, 2, 5, 30, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+    datetime(2024, 1, 2, tzinfo=timezone(timedelta(hours=-3, minutes=-30))),
+    datetime(2024, 1, 2, 23, 59, 59, 999999, tzinfo=timezone(timedelta(hours=5, minutes=45))),
+]
+PRICES = [Decimal("999.99"), Decimal("10.00"), Decimal("0"), Decimal("1E+2"), Decimal("-0.0000001"),
+          Decimal("12345678901234567890.123456789")]
+TEXTS = ["Laptop", "Café ☃", 'quote " and \\ slash', "tab\tnewline\n", "\u0000\u001f ", "😀"]
+
+
+def default_bytes(model, content) -> bytes:
+    """What FastAPI's default path produced for a response_model"""
+    return JSONResponse(content=TypeAdapter(model).dump_python(content, mode="json")).body
+
+
+def products():
+    return [
+        product_models.Product(
+            id=i,
+            name=TEXTS[i % len(TEXTS)],
+            description=TEXTS[(i + 1) % len(TEXTS)],
+            price=PRICES[i % len(PRICES)],
+            category="Electronics",
+            stock_quantity=i,
+            created_at=DATETIMES[i % len(DATETIMES)],
+        )
+        for i in range(36)
+    ]
+
+
+def customers():
+    return [
+        customer_models.Customer(
+            id=i,
+            name=TEXTS[i % len(TEXTS)],
+            email=f"user{i}@example.com",
+            phone=None if i % 2 else "+1 555 0100",
+            created_at=DATETIMES[i % len(DATETIMES)],
+        )
+        for i in range(12)
+    ]
+
+
+@pytest.mark.parametrize("item", products(), ids=lambda p: f"product-{p.id}")
+def test_single_product_matches_default(item):
+    expected = default_bytes(product_models.ProductResponse, item)
+    assert ORJSONResponse(item).body == expected
+
+
+@pytest.mark.parametrize("item", customers(), ids=lambda c: f"customer-{c.id}")
+def test_single_customer_matches_default(item):
+    expected = default_bytes(customer_models.CustomerResponse, item)
+    assert ORJSONResponse(item).body == expected
+
+
+def test_product_list_matches_default():
+    items = products()
+    expected = default_bytes(List[product_models.ProductResponse], items)
+    assert ORJSONResponse(items).body == expected
+
+
+def test_customer_list_matches_default():
+    items = customers()
+    expected = default_bytes(List[customer_models.CustomerResponse], items)
+    assert ORJSONResponse(items).body == expected
+
+
+def test_projected_dicts_match_default():
+    items = products()
+    fields = {"id", "price", "created_at"}
+    expected = JSONResponse(content=[p.model_dump(mode="json", include=fields) for p in items]).body
+    assert ORJSONResponse([p.model_dump(include=fields) for p in items]).body == expected
+
+
+def test_unsupported_type_raises():
+    with pytest.raises(TypeError):
+        ORJSONResponse({"value": object()})
@@ -1,6 +1,7 @@
 """
 Integration tests for Product Service
 """
+import json
 import pytest
 import requests
 
@@ -18,6 +19,20 @@ class TestProductService:
         assert data["status"] == "healthy"
         assert data["service"] == "product-service"
     
+    def test_liveness_probe_via_gateway(self):
+        """Test liveness probe through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "healthy", "service": "product-service", "version": "1.0.0"}
+    
+    def test_readiness_probe_via_gateway(self):
+        """Test readiness probe through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/health/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "healthy"
+        assert data["products"] > 0
+    
     def test_get_all_products_via_gateway(self):
         """Test getting all products through API Gateway"""
         response = requests.get(f"{GATEWAY_BASE_URL}/products")
@@ -36,6 +51,90 @@ class TestProductService:
         assert "stock_quantity" in product
         assert "created_at" in product
     
+    def test_metrics_via_gateway(self):
+        """Test Prometheus metrics are reported per route template"""
+        requests.get(f"{GATEWAY_BASE_URL}/products/1")
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/metrics")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert 'route="/products/{product_id}"' in response.text
+        assert "http_request_duration_seconds_bucket" in response.text
+    
+    def test_export_products_ndjson(self):
+        """Test streaming NDJSON export through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/export", stream=True)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.iter_lines() if line]
+        ids = [row["id"] for row in rows]
+        assert ids == sorted(ids)
+        assert len(ids) == len(requests.get(f"{GATEWAY_BASE_URL}/products").json())
+    
+    def test_product_changes_via_gateway(self):
+        """Test polling the change feed from its head and rejecting expired positions"""
+        head = requests.get(f"{GATEWAY_BASE_URL}/products/changes").json()
+        assert head["items"] == []
+        reservation = requests.post(f"{GATEWAY_BASE_URL}/products/1/reserve", json={"quantity": 1}).json()
+        requests.delete(f"{GATEWAY_BASE_URL}/products/reservations/{reservation['id']}")
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/changes?since={head['next']}")
+        assert response.status_code == 200
+        page = response.json()
+        assert [(item["op"], item["id"]) for item in page["items"]] == [("upsert", 1)]
+        assert page["next"] != head["next"]
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/changes?since=1")
+        assert response.status_code == 410
+    
+    def test_product_change_stream_via_gateway(self):
+        """Test that the SSE stream delivers a change made after it opened"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/changes/stream", stream=True, timeout=10)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/event-stream")
+        reservation = requests.post(f"{GATEWAY_BASE_URL}/products/2/reserve", json={"quantity": 1}).json()
+        requests.delete(f"{GATEWAY_BASE_URL}/products/reservations/{reservation['id']}")
+        lines = response.iter_lines(decode_unicode=True)
+        data = next(line for line in lines if line.startswith("data: "))
+        response.close()
+        assert json.loads(data[len("data: "):])["id"] == 2
+    
+    def test_get_products_not_modified_via_gateway(self):
+        """Test that a matching If-None-Match returns 304 with no body"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/products", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+    
+    def test_get_products_paginated_via_gateway(self):
+        """Test cursor pagination with field projection through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products?limit=2&fields=id,price")
+        assert response.status_code == 200
+        first_page = response.json()
+        assert len(first_page) == 2
+        assert set(first_page[0]) == {"id", "price"}
+        cursor = response.headers["X-Next-Cursor"]
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/products?limit=2&cursor={cursor}")
+        assert response.status_code == 200
+        second_page = response.json()
+        assert second_page[0]["id"] > first_page[-1]["id"]
+    
+    def test_batch_get_products_via_gateway(self):
+        """Test batch lookup by ids through API Gateway"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products?ids=2,1,999999,2")
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["id"] for item in data["items"]] == [2, 1]
+        assert data["missing"] == [999999]
+        
+        response = requests.post(f"{GATEWAY_BASE_URL}/products/batch?fields=id", json={"ids": [1, 999999]})
+        assert response.status_code == 200
+        assert response.json() == {"items": [{"id": 1}], "missing": [999999]}
+    
     def test_get_product_by_id_via_gateway(self):
         """Test getting specific product through API Gateway"""
         response = requests.get(f"{GATEWAY_BASE_URL}/products/1")
@@ -65,6 +164,109 @@ class TestProductService:
         assert isinstance(products, list)
         assert len(products) == 0
     
+    def test_filter_products_via_gateway(self):
+        """Test price, stock and category filters with price ordering"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products?category=electronics&max_price=800")
+        assert response.status_code == 200
+        products = response.json()
+        assert {"Smartphone"} <= {product["name"] for product in products}
+        for product in products:
+            assert product["category"].lower() == "electronics"
+            assert float(product["price"]) <= 800
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/products?in_stock=true&sort=price&limit=50")
+        assert response.status_code == 200
+        prices = [float(product["price"]) for product in response.json()]
+        assert prices == sorted(prices)
+    
+    def test_filter_products_invalid(self):
+        """Test that contradictory or unsupported filters are rejected"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products?min_price=10&max_price=1")
+        assert response.status_code == 400
+        response = requests.get(f"{GATEWAY_BASE_URL}/products?sort=name")
+        assert response.status_code == 422
+        response = requests.get(f"{GATEWAY_BASE_URL}/products?ids=1&category=Electronics")
+        assert response.status_code == 400
+    
+    def test_search_products_via_gateway(self):
+        """Test full-text and prefix search over product names and descriptions"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/search?q=coffee%20tim")
+        assert response.status_code == 200
+        assert [product["name"] for product in response.json()] == ["Coffee Maker"]
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/search?q=lapt&fields=id")
+        assert response.status_code == 200
+        assert {"id": 1} in response.json()
+        
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/search?q=nonexistentword")
+        assert response.status_code == 200
+        assert response.json() == []
+    
+    def test_search_products_requires_query(self):
+        """Test that search without q is rejected"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/search")
+        assert response.status_code == 422
+    
+    def test_get_categories(self):
+        """Test getting product counts per category"""
+        response = requests.get(f"{GATEWAY_BASE_URL}/products/categories")
+        assert response.status_code == 200
+        counts = {c["category"]: c["count"] for c in response.json()}
+        assert counts["Electronics"] >= 2
+        assert counts["Appliances"] >= 1
+    
+    def test_reserve_and_release_product(self):
+        """Test reserving stock for one product and releasing it"""
+        stock = requests.get(f"{GATEWAY_BASE_URL}/products/3").json()["stock_quantity"]
+        response = requests.post(f"{GATEWAY_BASE_URL}/products/3/reserve", json={"quantity": 2})
+        assert response.status_code == 201
+        reservation = response.json()
+        assert reservation["items"] == [{"product_id": 3, "quantity": 2}]
+        assert requests.get(f"{GATEWAY_BASE_URL}/products/3").json()["stock_quantity"] == stock - 2
+        
+        response = requests.delete(f"{GATEWAY_BASE_URL}/products/reservations/{reservation['id']}")
+        assert response.status_code == 204
+        assert requests.get(f"{GATEWAY_BASE_URL}/products/3").json()["stock_quantity"] == stock
+        response = requests.post(f"{GATEWAY_BASE_URL}/products/reservations/{reservation['id']}/confirm")
+        assert response.status_code == 404
+    
+    def test_reserve_products_all_or_nothing(self):
+        """Test that a batch reservation with one short item reserves nothing"""
+        before = [requests.get(f"{GATEWAY_BASE_URL}/products/{i}").json()["stock_quantity"] for i in (1, 2)]
+        items = [{"product_id": 1, "quantity": 1}, {"product_id": 2, "quantity": 1_000_000}]
+        response = requests.post(f"{GATEWAY_BASE_URL}/products/reservations", json={"items": items})
+        assert response.status_code == 409
+        after = [requests.get(f"{GATEWAY_BASE_URL}/products/{i}").json()["stock_quantity"] for i in (1, 2)]
+        assert after == before
+        
+        response = requests.post(f"{GATEWAY_BASE_URL}/products/999/reserve", json={"quantity": 1})
+        assert response.status_code == 404
+    
+    def test_bulk_upsert_products_partial(self):
+        """Test bulk upsert reporting per-row errors with partial=true"""
+        rows = [
+            {"name": "Desk", "description": "Standing desk", "price": "249.99",
+             "category": "Furniture", "stock_quantity": 10},
+            {"name": "Broken", "price": "not-a-price"},
+        ]
+        response = requests.post(f"{GATEWAY_BASE_URL}/products/bulk?partial=true", json=rows)
+        assert response.status_code == 200
+        result = response.json()
+        assert result["created"] == 1
+        assert result["failed"] == 1
+        assert result["errors"][0]["index"] == 1
+    
+    def test_bulk_upsert_products_all_or_nothing(self):
+        """Test that an invalid row rejects the whole batch by default"""
+        rows = [
+            {"name": "Chair", "description": "Office chair", "price": "99.99",
+             "category": "Furniture", "stock_quantity": 5},
+            {"name": "Broken"},
+        ]
+        response = requests.post(f"{GATEWAY_BASE_URL}/products/bulk", json=rows)
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["index"] == 1
+    
     def test_get_nonexistent_product(self):
         """Test getting non-existent product"""
         response = requests.get(f"{GATEWAY_BASE_URL}/products/999")
@@ -0,0 +1,212 @@
+"""
+Concurrency stress test for product stock reservations
+
+Runs many concurrent checkouts in-process against a ReservationManager
+whose database write sleeps for a random few milliseconds, so reservations
+interleave at every await. Checks that stock is never oversold, that every
+unit is accounted for after releases and expiry, and that a slow write on
+one product does not hold up reservations of unrelated products. Two
+managers sharing one SQLite database stand in for two workers.
+Set RESERVATION_TEST_TASKS to change the number of checkouts (default 2,000).
+"""
+import asyncio
+import os
+import tempfile
+import random
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from models.product import Product
+from repository import ProductRepository
+from repository import PRODUCTS_TABLE
+from reservations import LOCK_STRIPES, InsufficientStock, ReservationManager
+from shared.persistence import ConditionFailed, SQLiteBackend
+
+RESERVATION_TEST_TASKS = int(os.getenv("RESERVATION_TEST_TASKS", 2_000))
+PRODUCTS = 20
+STOCK = 50
+
+
+def catalog(stock: int = STOCK) -> ProductRepository:
+    now = datetime.now()
+    return ProductRepository(
+        Product.model_construct(
+            id=i, name=f"Product {i}", description="", price=Decimal("1.00"),
+            category="Stress", stock_quantity=stock, created_at=now,
+        )
+        for i in range(1, PRODUCTS + 1)
+    )
+
+
+def take(stored: dict, amounts: dict) -> dict:
+    """The database's conditional decrement, on a dict of stock levels"""
+    for product_id, amount in amounts.items():
+        if stored[product_id] < amount:
+            raise ConditionFailed(product_id, stored[product_id])
+    for product_id, amount in amounts.items():
+        stored[product_id] -= amount
+    return {product_id: stored[product_id] for product_id in amounts}
+
+
+def manager(repository: ProductRepository, max_delay: float = 0.002, **kwargs) -> ReservationManager:
+    rng = random.Random(7)
+    stored = {product.id: product.stock_quantity for product in repository}
+
+    async def persist(amounts):
+        await asyncio.sleep(rng.random() * max_delay)
+        return take(stored, amounts)
+    return ReservationManager(repository, persist, **kwargs)
+
+
+def total_stock(repository: ProductRepository) -> int:
+    return sum(product.stock_quantity for product in repository)
+
+
+def test_concurrent_reservations_never_oversell():
+    repository = catalog()
+    reservations = manager(repository)
+    rng = random.Random(42)
+    batches = [
+        {product_id: rng.randint(1, 3) for product_id in rng.sample(range(1, PRODUCTS + 1), rng.randint(1, 4))}
+        for _ in range(RESERVATION_TEST_TASKS)
+    ]
+
+    async def checkout(items):
+        try:
+            return await reservations.reserve(items)
+        except InsufficientStock:
+            return None
+
+    async def run():
+        return await asyncio.gather(*(checkout(items) for items in batches))
+
+    made = [reservation for reservation in asyncio.run(run()) if reservation is not None]
+    reserved = {}
+    for reservation in made:
+        for product_id, quantity in reservation.items.items():
+            reserved[product_id] = reserved.get(product_id, 0) + quantity
+
+    assert made, "no reservation succeeded"
+    assert len(made) < len(batches), "stock never ran out; raise RESERVATION_TEST_TASKS"
+    for product in repository:
+        assert product.stock_quantity >= 0
+        assert product.stock_quantity + reserved.get(product.id, 0) == STOCK
+    assert len(reservations) == len(made)
+
+
+def test_release_and_expiry_return_all_stock():
+    repository = catalog()
+    reservations = manager(repository)
+    rng = random.Random(1)
+
+    async def run():
+        made = await asyncio.gather(*(
+            reservations.reserve({rng.randint(1, PRODUCTS): 1}, ttl=60 if i % 2 else 0.01)
+            for i in range(PRODUCTS * STOCK // 2)
+        ))
+        confirmed = reservations.confirm(made[1].id)
+        await asyncio.sleep(0.02)
+        # Half of them expire; release the others (except the confirmed one) while the sweep runs
+        await asyncio.gather(
+            reservations.expire(),
+            *(reservations.release(r.id) for r in made if r.deadline > time.monotonic() and r is not confirmed),
+        )
+        return confirmed
+
+    confirmed = asyncio.run(run())
+    assert len(reservations) == 0
+    assert reservations.expired == PRODUCTS * STOCK // 4
+    assert total_stock(repository) == PRODUCTS * STOCK - 1
+    assert repository.get(next(iter(confirmed.items))).stock_quantity == STOCK - 1
+    with pytest.raises(KeyError):
+        reservations.confirm(confirmed.id)
+
+
+def test_failed_batch_reserves_nothing():
+    repository = catalog(stock=5)
+    reservations = manager(repository)
+    with pytest.raises(InsufficientStock):
+        asyncio.run(reservations.reserve({1: 2, 2: 6}))
+    with pytest.raises(KeyError):
+        asyncio.run(reservations.reserve({1: 2, PRODUCTS + 1: 1}))
+    assert total_stock(repository) == PRODUCTS * 5
+    assert len(reservations) == 0
+
+
+def test_unrelated_products_do_not_contend():
+    repository = catalog()
+    repository.upsert_many([repository.get(1).model_copy(update={"id": 1 + LOCK_STRIPES})])
+    slow_write = asyncio.Event()
+    stored = {product.id: product.stock_quantity for product in repository}
+
+    async def persist(amounts):
+        if 1 in amounts:
+            await slow_write.wait()
+        return take(stored, amounts)
+    reservations = ReservationManager(repository, persist)
+
+    async def run():
+        stuck = asyncio.create_task(reservations.reserve({1: 1}))
+        await asyncio.sleep(0)
+        # Product 2 is on another stripe: it must not wait for product 1's write
+        await asyncio.wait_for(reservations.reserve({2: 1}), timeout=1)
+        # Product 1 + LOCK_STRIPES shares product 1's stripe and does wait
+        blocked = asyncio.create_task(reservations.reserve({3: 1, 1 + LOCK_STRIPES: 1}))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        slow_write.set()
+        await asyncio.gather(stuck, blocked)
+
+    asyncio.run(run())
+    assert repository.get(1).stock_quantity == STOCK - 1
+    assert repository.get(2).stock_quantity == STOCK - 1
+
+
+def test_workers_sharing_a_database_never_oversell():
+    pytest.importorskip("aiosqlite")
+    rng = random.Random(3)
+    batches = [
+        {product_id: rng.randint(1, 3) for product_id in rng.sample(range(1, PRODUCTS + 1), rng.randint(1, 4))}
+        for _ in range(RESERVATION_TEST_TASKS // 4)
+    ]
+
+    async def run(path):
+        database = SQLiteBackend(path)
+        await database.connect()
+        await database.ensure_table(PRODUCTS_TABLE)
+        await database.upsert_many(PRODUCTS_TABLE, list(catalog()))
+
+        async def persist(amounts):
+            return await database.take_many(PRODUCTS_TABLE, "stock_quantity", amounts)
+        # Each worker has its own copy of the catalog, which goes stale as the other one writes
+        workers = [ReservationManager(catalog(), persist) for _ in range(2)]
+
+        async def checkout(i, items):
+            try:
+                return await workers[i % 2].reserve(items)
+            except InsufficientStock:
+                return None
+        made = [r for r in await asyncio.gather(*(checkout(i, items) for i, items in enumerate(batches))) if r]
+        # Stock released in one worker can be reserved in the other
+        released = next(r for r in made if workers[0].get(r.id))
+        await workers[0].release(released.id)
+        made.remove(released)
+        made.append(await workers[1].reserve(released.items))
+        stored = {product.id: product.stock_quantity for product in await database.fetch_all(PRODUCTS_TABLE)}
+        await database.close()
+        return made, stored
+
+    with tempfile.TemporaryDirectory() as directory:
+        made, stored = asyncio.run(run(os.path.join(directory, "products.db")))
+
+    reserved = {}
+    for reservation in made:
+        for product_id, quantity in reservation.items.items():
+            reserved[product_id] = reserved.get(product_id, 0) + quantity
+    assert len(made) < len(batches), "stock never ran out; raise RESERVATION_TEST_TASKS"
+    for product_id, stock in stored.items():
+        assert stock >= 0
+        assert stock + reserved.get(product_id, 0) == STOCK
@@ -0,0 +1,225 @@
+"""
+Tests for memory-mapped dataset snapshots
+
+Round-trips products and customers through shared.snapshot and checks
+that a repository opened over a snapshot answers reads, filters, search
+and writes exactly like one built from the same models.
+"""
+import asyncio
+import random
+import struct
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+import repository as product_repository
+from models.product import Product
+from repository import PRODUCTS_TABLE, ProductRepository
+from shared.persistence import Column, SQLiteBackend, Table, load_repository
+from shared.snapshot import MAGIC, IndexesNotReady, Snapshot, SnapshotRecords, open_snapshot, write_snapshot
+
+CATEGORIES = ["Electronics", "Appliances", "Books", "Garden"]
+
+
+def products(count: int):
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1, 12, 30)
+    return [
+        Product.model_construct(
+            id=i * 3,
+            name=f"Product {i} {rng.choice(['lamp', 'chair', 'kettle', 'Café'])}",
+            description=rng.choice(["", "Solid oak", "Stainless steel, 1.7 l"]),
+            price=Decimal(rng.randint(1, 100_000)).scaleb(-2),
+            category=rng.choice(CATEGORIES),
+            stock_quantity=rng.choice([0, rng.randint(1, 50)]),
+            created_at=start + timedelta(seconds=i, microseconds=i),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "products.snap")
+
+
+def test_round_trip_keeps_values_exactly(snapshot_path):
+    rows = products(50)
+    rows.append(rows[0].model_copy(update={"id": 1, "price": Decimal("10.500"), "name": "Ünïcode ✓"}))
+    assert write_snapshot(snapshot_path, PRODUCTS_TABLE, reversed(rows)) == 51
+    snapshot = Snapshot(snapshot_path, PRODUCTS_TABLE)
+    decoded = [snapshot.record(position) for position in range(len(snapshot))]
+    assert list(snapshot.ids) == sorted(row.id for row in rows)
+    assert [row.model_dump() for row in decoded] == [row.model_dump() for row in sorted(rows, key=lambda r: r.id)]
+    assert str(decoded[0].price) == "10.500"
+    snapshot.close()
+
+
+def test_nullable_and_aware_columns(tmp_path):
+    from pydantic import BaseModel
+    from typing import Optional
+
+    class Event(BaseModel):
+        id: int
+        note: Optional[str]
+        at: datetime
+
+    table = Table("events", Event, (Column("id", "INTEGER"), Column("note", "TEXT", nullable=True),
+                                     Column("at", "TIMESTAMP")))
+    aware = datetime(2024, 5, 1, 9, 0, tzinfo=timezone(timedelta(hours=2)))
+    path = str(tmp_path / "events.snap")
+    write_snapshot(path, table, [Event(id=1, note=None, at=aware), Event(id=2, note="", at=datetime(1960, 1, 1))])
+    snapshot = Snapshot(path, table)
+    first, second = snapshot.record(0), snapshot.record(1)
+    assert first.note is None and first.at == aware and first.at.tzinfo == timezone.utc
+    assert second.note == "" and second.at == datetime(1960, 1, 1)
+
+
+def test_mismatched_or_missing_snapshot(snapshot_path, tmp_path):
+    assert open_snapshot(str(tmp_path / "missing.snap"), PRODUCTS_TABLE) is None
+    write_snapshot(snapshot_path, PRODUCTS_TABLE, products(3))
+    other = Table("products", Product, PRODUCTS_TABLE.columns[:-1])
+    with pytest.raises(ValueError):
+        Snapshot(snapshot_path, other)
+    (tmp_path / "junk.snap").write_bytes(b"not a snapshot at all, really")
+    with pytest.raises(ValueError):
+        Snapshot(str(tmp_path / "junk.snap"), PRODUCTS_TABLE)
+    # Written by another version of the service: opened as no snapshot, so it is written again
+    assert open_snapshot(snapshot_path, other) is None
+    (tmp_path / "v1.snap").write_bytes(MAGIC + struct.pack("<IQI", 1, 0, 2) + b"[]")
+    assert open_snapshot(str(tmp_path / "v1.snap"), PRODUCTS_TABLE) is None
+
+
+def test_watermark_tracks_database_writes(snapshot_path, tmp_path):
+    pytest.importorskip("aiosqlite")
+    rows = products(20)
+
+    async def run():
+        database = SQLiteBackend(str(tmp_path / "products.db"))
+        await database.connect()
+        watermark = await load_repository(database, PRODUCTS_TABLE, ProductRepository(rows))
+        write_snapshot(snapshot_path, PRODUCTS_TABLE, rows, watermark)
+        unchanged = await database.data_version(PRODUCTS_TABLE)
+        await database.upsert_many(PRODUCTS_TABLE, [rows[0].model_copy(update={"name": "Renamed"})])
+        after_upsert = await database.data_version(PRODUCTS_TABLE)
+        await database.take_many(PRODUCTS_TABLE, "stock_quantity", {rows[1].id: -1})
+        after_take = await database.data_version(PRODUCTS_TABLE)
+        await database.close()
+        return watermark, unchanged, after_upsert, after_take
+
+    watermark, unchanged, after_upsert, after_take = asyncio.run(run())
+    assert Snapshot(snapshot_path, PRODUCTS_TABLE).watermark == watermark == unchanged
+    assert watermark < after_upsert < after_take
+    write_snapshot(snapshot_path, PRODUCTS_TABLE, rows)
+    assert Snapshot(snapshot_path, PRODUCTS_TABLE).watermark is None
+
+
+def test_records_overlay_tracks_writes(snapshot_path):
+    write_snapshot(snapshot_path, PRODUCTS_TABLE, products(10))
+    records = SnapshotRecords(Snapshot(snapshot_path, PRODUCTS_TABLE))
+    replacement = products(1)[0].model_copy(update={"id": 6, "name": "Replaced"})
+    records[6] = replacement
+    records[100] = replacement.model_copy(update={"id": 100})
+    assert records.pop(9).id == 9
+    assert records.pop(9) is None
+    assert records.pop(100).id == 100
+    records[9] = replacement.model_copy(update={"id": 9})
+    assert len(records) == 10
+    assert 9 in records and 100 not in records and 4 not in records
+    assert records[6].name == "Replaced"
+    assert [record_id for record_id, _ in records.items()] == [3 * i for i in range(1, 11)]
+    records.clear()
+    assert len(records) == 0 and records.get(3) is None
+
+
+def test_repository_over_snapshot_matches_in_memory(snapshot_path):
+    rows = products(500)
+    write_snapshot(snapshot_path, PRODUCTS_TABLE, rows)
+    mapped = ProductRepository.from_snapshot(Snapshot(snapshot_path, PRODUCTS_TABLE))
+    built = ProductRepository(rows)
+
+    def same(read):
+        assert [p.model_dump() for p in read(mapped)] == [p.model_dump() for p in read(built)]
+
+    same(lambda r: r.page(after_id=30, limit=20)[0])
+    # Writes before and after the lazy indexes are built
+    for repository in (mapped, built):
+        repository.set_stock(6, 0)
+        repository.upsert_many([rows[10].model_copy(update={"category": "Books", "price": Decimal("1.00")}),
+                                rows[0].model_copy(update={"id": 2000})])
+        repository.delete(9)
+    same(lambda r: r.find(category="books", in_stock=True, limit=30)[0])
+    same(lambda r: r.find(min_price=Decimal("10"), max_price=Decimal("200"), sort="price", limit=30)[0])
+    for repository in (mapped, built):
+        repository.update(rows[20].model_copy(update={"name": "Garden kettle"}))
+        repository.set_stock(12, 40)
+    same(lambda r: r.search("kettle", 50))
+    same(lambda r: r.list_by_category("Garden"))
+    same(lambda r: r.get_many([2000, 9, 63, 6])[0])
+    same(lambda r: r.page()[0])
+    assert mapped.category_counts() == built.category_counts()
+    assert len(mapped) == len(built) == 500
+
+
+def test_build_indexes_up_front(snapshot_path):
+    rows = products(300)
+    write_snapshot(snapshot_path, PRODUCTS_TABLE, rows)
+    mapped = ProductRepository.from_snapshot(Snapshot(snapshot_path, PRODUCTS_TABLE))
+    built = ProductRepository(rows)
+    mapped.build_indexes()
+    assert mapped._indexed and mapped._prices is not None
+    for repository in (mapped, built):
+        repository.set_stock(3, 0)
+        repository.upsert_many([rows[5].model_copy(update={"price": Decimal("0.01"), "category": "Books"})])
+    for query in (dict(category="books", in_stock=True), dict(min_price=Decimal("5"), sort="price")):
+        assert ([p.model_dump() for p in mapped.find(**query, limit=40)[0]]
+                == [p.model_dump() for p in built.find(**query, limit=40)[0]])
+    assert mapped.search("kettle", 20) == built.search("kettle", 20)
+
+
+@pytest.mark.parametrize("merge_rows", [1000, 1])
+def test_indexes_built_in_background_cover_writes(snapshot_path, monkeypatch, merge_rows):
+    # With merge_rows=1 the writes are merged into the price index in one pass
+    monkeypatch.setattr(product_repository, "PRICE_INDEX_MERGE_ROWS", merge_rows)
+    rows = products(300)
+    write_snapshot(snapshot_path, PRODUCTS_TABLE, rows)
+    mapped = ProductRepository.from_snapshot(Snapshot(snapshot_path, PRODUCTS_TABLE))
+    built = ProductRepository(rows)
+
+    def write(repository, id_offset):
+        repository.set_stock(3 + id_offset, 0)
+        repository.upsert_many([rows[5 + id_offset].model_copy(update={"price": Decimal("0.01"), "category": "Books"}),
+                                rows[0].model_copy(update={"id": 5000 + id_offset, "name": "New kettle"})])
+        repository.delete(rows[9 + id_offset].id)
+
+    build = mapped.begin_indexing()
+    assert not mapped.indexes_ready
+    with pytest.raises(IndexesNotReady):
+        mapped.find(category="books")
+    # Writes and lookups by id carry on while the build runs
+    write(mapped, 0)
+    indexes = build()
+    write(mapped, 30)
+    assert mapped.get(rows[20].id) == rows[20]
+    mapped.finish_indexing(indexes)
+    for offset in (0, 30):
+        write(built, offset)
+
+    assert mapped.indexes_ready
+    for query in (dict(category="books", in_stock=True), dict(min_price=Decimal("5"), sort="price"), dict(in_stock=False)):
+        assert ([p.model_dump() for p in mapped.find(**query, limit=40)[0]]
+                == [p.model_dump() for p in built.find(**query, limit=40)[0]])
+    assert mapped.search("kettle", 20) == built.search("kettle", 20)
+    assert mapped.category_counts() == built.category_counts()
+
+
+def test_abandoned_background_build(snapshot_path):
+    write_snapshot(snapshot_path, PRODUCTS_TABLE, products(50))
+    mapped = ProductRepository.from_snapshot(Snapshot(snapshot_path, PRODUCTS_TABLE))
+    build = mapped.begin_indexing()
+    mapped.finish_indexing(None)
+    assert build() is None
+    # Falls back to building on first use
+    assert mapped.find(category="books", limit=5)[0]
+    assert mapped.indexes_ready